@@ -0,0 +1,4 @@
+import logging
+
+# The modules log under "rfid", don't complain about missing handlers if the application doesn't configure logging (see rfid.logs)
+logging.getLogger('rfid').addHandler(logging.NullHandler())
@@ -0,0 +1,286 @@
+'''
+Created on Oct 18, 2026
+
+Benchmarks of the decoder, Network.ask and the Tracker that run without hardware (the readers
+are emulated by the ReaderNetworkSimulator). Run with:
+
+    python -m rfid.benchmark -o results.json -b baseline.json
+
+Every result is a flat name -> number entry. Names ending in PerSecond are better when higher,
+everything else (latencies in ms) is better when lower. When a baseline is given every result
+that got worse by more than the tolerance is reported as a regression and the exit status is 1.
+'''
+import argparse
+import contextlib
+import json
+import math
+import os
+import platform
+import random
+import struct
+import sys
+import tempfile
+import time
+
+from rfid.helpers import monotonic
+from rfid.decoder import Decoder,Packet,PacketDecodedListener
+
+TAG_PACKET = bytearray('552000000106212a2a3101114243900069'
+                       '94a21eacac000f2aef3300683220510100'
+                       '00110a0d32'.decode('hex'))
+
+class _Counter(PacketDecodedListener):
+    def __init__(self):
+        self.count = 0
+
+    def packetReady(self, event):
+        self.count += 1
+
+@contextlib.contextmanager
+def _quiet():
+    """ Hides everything printed while benchmarking """
+    stdout = sys.stdout
+    with open(os.devnull,'w') as devnull:
+        sys.stdout = devnull
+        try:
+            yield
+        finally:
+            sys.stdout = stdout
+
+def percentiles(samples,prefix):
+    """ Returns the 50th, 90th and 99th percentile and max of the samples (in seconds) in ms """
+    samples = sorted(samples)
+    if not samples:
+        return {}
+    at = lambda p:samples[min(len(samples)-1,int(p*len(samples)))]*1000
+    return {prefix+'.p50Ms':at(0.5),prefix+'.p90Ms':at(0.9),prefix+'.p99Ms':at(0.99),prefix+'.maxMs':samples[-1]*1000}
+
+def tagStream(frames,corruption=0,seed=0):
+    """ Returns a stream of tag packets from 3 nodes. With corruption, that fraction of the frames
+    gets a random byte changed and is followed by a few bytes of junk.
+    """
+    rnd = random.Random(seed)
+    stream = bytearray()
+    for i in range(frames):
+        pkt = bytearray(TAG_PACKET[:-1])
+        pkt[4] = 1+i%3
+        struct.pack_into('>I',pkt,22,1000+i%50)
+        pkt = Packet(pkt)
+        if corruption and rnd.random()<corruption:
+            pkt[rnd.randint(0,len(pkt)-1)] = rnd.randint(0,255)
+            pkt += bytearray(rnd.randint(0,255) for j in range(rnd.randint(1,8)))
+        stream += pkt
+    return stream
+
+def benchDecoder(frames=20000,corruption=0,chunkSize=4096):
+    """ Decoder throughput when fed chunkSize reads like the SerialPortMonitor does """
+    stream = tagStream(frames,corruption)
+    decoder = Decoder(inline=True)
+    counter = _Counter()
+    decoder.addPacketDecodedEventListener(counter)
+    t = monotonic()
+    for i in xrange(0,len(stream),chunkSize):
+        decoder.decode(stream[i:i+chunkSize])
+    t = monotonic()-t
+    return {'bytesPerSecond':len(stream)/t,'framesPerSecond':counter.count/t}
+
+def benchAsk(count=500):
+    """ Round trip time of Network.ask (a ping) to an emulated reader """
+    from rfid.network import Network
+    from rfid.simulator import ReaderNetworkSimulator
+    sim = ReaderNetworkSimulator(numReaders=1)
+    sim.start()
+    with _quiet():
+        nw = Network(0,None,port=sim.getPort(),baudrate=115200)
+    samples = []
+    try:
+        for i in range(count):
+            t = monotonic()
+            if nw.pingReader(1) is not None:
+                samples.append(monotonic()-t)
+    finally:
+        with _quiet():
+            nw.stop()
+        sim.stop()
+    results = percentiles(samples,'ask')
+    results['ask.lost'] = count-len(samples)
+    return results
+
+class _StubNetwork(object):
+    def __init__(self):
+        self._decoder = Decoder(inline=True)
+
+    def getDecoder(self):
+        return self._decoder
+
+    def startAutoPolling(self,**kwargs):
+        pass
+
+    def stopAutoPolling(self,**kwargs):
+        pass
+
+def _rssi(a,n,p,q,rnd):
+    d = max(0.1,sum((i-j)**2 for i,j in zip(p,q))**0.5)
+    return int(a-10*n*math.log10(d)+rnd.gauss(0,2))
+
+def makeTracker(gridSize=20,numReaders=3,numTags=1,seed=0):
+    """ Returns a Tracker with numReaders readers around a gridSize x gridSize grid, two reference
+    tags and numTags tracked tags (ids 1000...) that all have a full window of measurements.
+    """
+    from rfid import tracker as tr
+    rnd = random.Random(seed)
+    with _quiet():
+        t = tr.Tracker(_StubNetwork())
+        grid = tr.Grid()
+        grid.x = grid.y = gridSize
+        grid.N = gridSize*gridSize
+        t.grid = grid
+        refs = {1:(gridSize/4.0,gridSize/2.0,3),2:(3*gridSize/4.0,gridSize/2.0,3)}
+        t.readers = {}
+        for i in range(1,numReaders+1):
+            position = (rnd.uniform(0,gridSize),rnd.uniform(0,gridSize),7.5)
+            t.readers[i] = tr.Reader(tracker=t,network=t.network,id=i,position=position,refTagId=1+i%2)
+        t.tags = {}
+        for tagId,position in refs.items():
+            t.tags[tagId] = tr.Tag(tracker=t,id=tagId,reference=True,position=position)
+        for i in range(numTags):
+            t.tags[1000+i] = tr.Tag(tracker=t,id=1000+i)
+            t.tags[1000+i].position = (rnd.uniform(0,gridSize),rnd.uniform(0,gridSize),3)
+        for tag in t.tags.values():
+            for reader in t.readers.values():
+                for j in range(tr.Config.windowSize):
+                    tag.addMeas(_rssi(120,2,reader.position,tag.position,rnd),reader.id)
+        for i in range(numTags):
+            t.tags[1000+i].position = None
+    return t
+
+def benchEstimateArea(gridSizes=(10,20,40),readerCounts=(3,6),tagCounts=(1,20),repeat=3):
+    """ Time for Tracker.estimateArea to estimate every tracked tag once, for every combination of
+    grid size, reader and tag count. The estimates share the reference tags' calibration, so this 
+    shows how the cost grows with the number of tags.
+    """
+    results = {}
+    for gridSize in gridSizes:
+        for numReaders in readerCounts:
+            for numTags in tagCounts:
+                t = makeTracker(gridSize,numReaders,numTags)
+                tagIds = range(1000,1000+numTags)
+                samples = []
+                with _quiet():
+                    for i in range(repeat):
+                        start = monotonic()
+                        for tagId in tagIds:
+                            t.estimateArea(tagId,t.tags[tagId].meas[1]['mean'])
+                        samples.append(monotonic()-start)
+                name = 'estimateArea.grid%s.readers%s.tags%s.ms'%(gridSize,numReaders,numTags)
+                results[name] = min(samples)*1000
+    return results
+
+def benchEndToEnd(duration=5):
+    """ Time from a tag packet being decoded to the Tracker's new estimate of the tag's position,
+    with the tracker's readers and reference tags emulated by the simulator. The tag needs a full
+    window of measurements before the first estimate, so this takes a few seconds to warm up.
+    """
+    from rfid.network import Network
+    from rfid.simulator import ReaderNetworkSimulator,SimulatedTag
+    from rfid.tracker import Tracker
+    sim = ReaderNetworkSimulator(numReaders=3,seed=0)
+    with _quiet():
+        nw = Network(0,None,port=sim.getPort(),baudrate=115200)
+        t = Tracker(nw)
+    fd,t.log_file = tempfile.mkstemp(suffix='.csv')
+    os.close(fd)
+    for reader in t.readers.values():
+        sim.readers[reader.id].position = reader.position
+    for tag in t.getReferenceTags().values():
+        sim.addTag(SimulatedTag(tag.id,tag.position,interval=0.4))
+    sim.addTag(SimulatedTag(1000,(5,15,3),interval=0.4))
+    sim.start()
+
+    samples = []
+    estimated = [] # Tags estimateArea ran for while processing the current event
+    estimateArea = t.estimateArea
+    def markedEstimateArea(tagId,rssi):
+        estimateArea(tagId=tagId,rssi=rssi)
+        estimated.append(tagId)
+    t.estimateArea = markedEstimateArea
+    processEvent = t.processEvent
+    def timedProcessEvent(event):
+        del estimated[:]
+        processEvent(event)
+        if 1000 in estimated: # Only the packets that led to a new estimate
+            samples.append(time.time()-event.getTime())
+    t.processEvent = timedProcessEvent
+    try:
+        with _quiet():
+            t.start()
+            time.sleep(duration)
+            t.stop()
+    finally:
+        with _quiet():
+            nw.stop()
+        sim.stop()
+        os.remove(t.log_file)
+    return percentiles(samples,'endToEnd')
+
+def runAll(quick=False):
+    """ Runs every benchmark and returns the flat dict of results """
+    results = {}
+    frames = quick and 2000 or 20000
+    for name,corruption in (('clean',0),('corrupted',0.05)):
+        for key,value in benchDecoder(frames,corruption).items():
+            results['decoder.%s.%s'%(name,key)] = value
+    results.update(benchAsk(quick and 50 or 500))
+    if quick:
+        results.update(benchEstimateArea(gridSizes=(10,),readerCounts=(3,),tagCounts=(1,),repeat=1))
+    else:
+        results.update(benchEstimateArea())
+    results.update(benchEndToEnd(quick and 5 or 10))
+    return results
+
+def isHigherBetter(name):
+    return name.endswith('PerSecond')
+
+def compare(results,baseline,tolerance=0.2):
+    """ Returns (name,baseline,result,relative change,regressed) for every result in the baseline.
+    The change is positive when the result got better.
+    """
+    rows = []
+    for name in sorted(results):
+        if name not in baseline or not baseline[name]:
+            continue
+        change = (results[name]-baseline[name])/float(baseline[name])
+        if not isHigherBetter(name):
+            change = -change
+        rows.append((name,baseline[name],results[name],change,change<-tolerance))
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks the decoder, Network.ask and the Tracker")
+    parser.add_argument('-o','--output',help="save the results to this JSON file")
+    parser.add_argument('-b','--baseline',help="compare against the results in this JSON file")
+    parser.add_argument('-t','--tolerance',type=float,default=0.2,help="allowed relative slowdown (default 0.2)")
+    parser.add_argument('-q','--quick',action='store_true',help="smaller runs for a quick check")
+    args = parser.parse_args(argv)
+
+    results = runAll(args.quick)
+    if args.output:
+        with open(args.output,'w') as f:
+            json.dump({'time':time.time(),'platform':platform.platform(),'python':platform.python_version(),
+                       'results':results},f,indent=2,sort_keys=True)
+
+    if not args.baseline:
+        for name in sorted(results):
+            print "%-50s %14.3f"%(name,results[name])
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)['results']
+    regressions = 0
+    for name,old,new,change,regressed in compare(results,baseline,args.tolerance):
+        regressions += regressed
+        print "%-50s %14.3f %14.3f %+7.1f%%%s"%(name,old,new,change*100,regressed and "  REGRESSION" or "")
+    print "%s regressions"%regressions
+    return regressions and 1 or 0
+
+if __name__ == "__main__":
+    sys.exit(main())
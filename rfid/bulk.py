@@ -0,0 +1,126 @@
+'''
+Created on Oct 18, 2026
+
+Finds and checks all of the packets in a large capture of the serial stream at once
+instead of feeding it through the Decoder a chunk at a time.
+'''
+import mmap
+import numpy as np
+
+from rfid.decoder import Packet,Decoder
+from rfid.tag import READING_DTYPE
+
+def mapFile(path):
+    """ Memory-maps a raw capture of the serial stream so it can be scanned without reading it into memory """
+    with open(path,'rb') as f:
+        return mmap.mmap(f.fileno(),0,access=mmap.ACCESS_READ)
+
+def _findFramesInBlock(buf,start,stop):
+    """ Finds the packets starting in buf[start:stop], the bytes after stop may only be used to
+    complete a packet. Returns (offsets,valid,end) where end is the position the next block
+    should start at.
+    """
+    n = len(buf)
+    starts = start+np.flatnonzero((buf[start:stop]==0xAA)|(buf[start:stop]==0x55))
+
+    # header and length bytes, 3 id bytes, cmd, and checksum = 7 bytes, + data bytes
+    lengths = buf[np.minimum(starts+1,n-1)]
+    ends = starts+7+lengths.astype(np.int64)
+    complete = (starts+1<n) & (ends<=n)
+
+    # XOR of buf[a:b] is xor[b]^xor[a], the checksum covers everything between the header and the checksum
+    first = starts.min() if len(starts) else start
+    last = min(n,ends.max()) if len(ends) else start
+    xor = np.zeros(last-first+1,dtype=np.uint8)
+    np.bitwise_xor.accumulate(buf[first:last],out=xor[1:])
+    cs = np.where(complete,np.minimum(ends,n)-1,first)
+    valid = complete & ((xor[cs-first]^xor[np.minimum(starts+1,last)-first]) == buf[cs])
+
+    # A header byte inside of a valid packet is just data, the same as it is for the Decoder.
+    # A valid packet can only be overlapped by one that was valid too, so first take the ones
+    # that start after every earlier valid packet ended, then walk through the (rare) rest in order.
+    vi = np.flatnonzero(valid)
+    vs,ve = starts[vi],ends[vi]
+    prevEnd = np.zeros(len(ve),dtype=np.int64)
+    if len(ve):
+        prevEnd[1:] = np.maximum.accumulate(ve)[:-1]
+    accepted = vs>=prevEnd
+    if not accepted.all():
+        prevCleanEnd = np.zeros(len(ve),dtype=np.int64)
+        prevCleanEnd[1:] = np.maximum.accumulate(np.where(accepted,ve,0))[:-1]
+        end = 0
+        for k in np.flatnonzero(~accepted):
+            if vs[k]>=max(prevCleanEnd[k],end):
+                accepted[k] = True
+            if accepted[k]:
+                end = max(end,ve[k])
+    vs,ve = vs[accepted],ve[accepted]
+
+    # Drop the header bytes that are inside of an accepted packet
+    inside = np.zeros(len(starts),dtype=bool)
+    if len(vs):
+        i = np.searchsorted(vs,starts,side='right')-1
+        j = np.maximum(i,0)
+        inside = (i>=0) & (starts>vs[j]) & (starts<ve[j])
+    keep = ~inside
+    valid = np.zeros(len(starts),dtype=bool)
+    valid[vi[accepted]] = True
+
+    end = max(stop,ve[-1]) if len(ve) else stop
+    return starts[keep],valid[keep],end
+
+def findFrames(data,blockSize=1<<26):
+    """ Finds all of the packets in data at once using NumPy.
+
+    data can be anything that supports the buffer interface (str, bytearray, mmap, numpy array).
+
+    Returns (offsets,valid) where offsets are the positions of each header byte that was not part of
+    a valid packet and valid is a mask that is True where the packet at that offset is complete and has a matching
+    checksum. The length of the packet at an offset is 7+data[offset+1]. Offsets where valid is False are
+    the same places the Decoder would log a checksum failure or wait for more data.
+
+    The data is scanned in blocks of blockSize bytes to limit the memory used by the intermediate arrays.
+    """
+    buf = np.frombuffer(data,dtype=np.uint8)
+    offsets,valid = [],[]
+    i = 0
+    while i<len(buf):
+        stop = min(len(buf),i+blockSize)
+        o,v,i = _findFramesInBlock(buf[:stop+Decoder.MAX_PACKET_SIZE],i,stop)
+        offsets.append(o)
+        valid.append(v)
+    if not offsets:
+        return np.zeros(0,dtype=np.int64),np.zeros(0,dtype=bool)
+    return np.concatenate(offsets),np.concatenate(valid)
+
+def getPackets(data,offsets,valid):
+    """ Returns a generator of the valid Packets found by findFrames """
+    buf = np.frombuffer(data,dtype=np.uint8)
+    for o in offsets[valid]:
+        yield Packet(buf[o:o+7+buf[o+1]].tostring())
+
+def getTagReadings(data,offsets,valid,time=0):
+    """ Returns a READING_DTYPE array with the tag transmissions of the valid packets found by findFrames.
+    time is used for the time of every reading (a capture doesn't have the time of each packet).
+    """
+    buf = np.frombuffer(data,dtype=np.uint8)
+    o = offsets[valid]
+    o = o[(buf[o]==0x55) & (buf[o+5]==0x06) & (buf[o+1]>=Packet.TAG_DATA_LENGTH)]
+    
+    def field(offset,size=1):
+        v = np.zeros(len(o),dtype=np.uint32)
+        for i in range(size):
+            v = (v<<8)|buf[o+offset+i]
+        return v
+    
+    readings = np.zeros(len(o),dtype=READING_DTYPE)
+    readings['tagId'] = field(22,4)
+    readings['siteCode'] = field(19,3)
+    readings['age'] = field(15,4)
+    readings['time'] = time
+    readings['rssi'] = buf[o+28]
+    readings['readerRssi'] = buf[o+34]
+    readings['nodeId'] = buf[o+4]
+    readings['counter'] = buf[o+10]&0x7F
+    readings['alarmByte'] = buf[o+31]
+    return readings
@@ -0,0 +1,213 @@
+'''
+Created on Oct 18, 2026
+
+Records the raw serial stream and plays it back through the Decoder and Tracker without hardware.
+
+A capture file is one or more sessions, each a header followed by one record per chunk read
+from the serial port:
+    header: 'RFIDCAP1' | wall clock time (double) | monotonic time (double)
+    record: monotonic time (double) | length (uint32) | data
+All numbers are little endian. The wall clock and monotonic times in the header are taken
+at the same moment so the record times can be converted to wall clock time. A new session
+starts every time a CaptureWriter opens the file, since the monotonic clock may have been
+reset in between (eg. by a reboot). The magic can't be mistaken for a record as no monotonic
+time reads as 'RFIDCAP1'.
+'''
+import mmap
+import os
+import struct
+import threading
+import time
+
+from rfid.helpers import monotonic
+from rfid.serial_port_monitor import SerialEvent
+from rfid.decoder import Decoder
+
+MAGIC = 'RFIDCAP1'
+HEADER = struct.Struct('<8sdd')
+RECORD = struct.Struct('<dI')
+
+class CaptureWriter(object):
+    """ Appends raw chunks of the serial stream to a capture file, starting a new session.
+
+    Give one to a SerialPortMonitor (or Network) with the capture kwarg to record everything it reads.
+    A record that was only partly written at the end of an existing file is cut off first so the
+    new session can be read.
+    """
+    def __init__(self,path):
+        if os.path.exists(path) and os.path.getsize(path):
+            capture = CaptureFile(path)
+            end = capture.getValidLength()
+            capture.close()
+            if end<os.path.getsize(path):
+                with open(path,'r+b') as f:
+                    f.truncate(end)
+        self._file = open(path,'ab')
+        self._lock = threading.Lock()
+        self._file.write(HEADER.pack(MAGIC,time.time(),monotonic()))
+
+    def write(self,data,timestamp=None):
+        """ Appends a chunk that was read at the monotonic time timestamp (now if None) """
+        if timestamp is None:
+            timestamp = monotonic()
+        with self._lock:
+            self._file.write(RECORD.pack(timestamp,len(data)))
+            self._file.write(data)
+
+    def flush(self):
+        with self._lock:
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+class CaptureFile(object):
+    """ Reads a capture file by memory-mapping it. An empty file is an empty capture, then 
+    wallTime and monotonicTime are None.
+    """
+    def __init__(self,path):
+        self._map = None
+        self.wallTime = self.monotonicTime = None # Of the first session
+        if os.path.getsize(path) == 0:
+            return # Can't mmap an empty file
+        with open(path,'rb') as f:
+            self._map = mmap.mmap(f.fileno(),0,access=mmap.ACCESS_READ)
+        if len(self._map)<HEADER.size or HEADER.unpack_from(self._map,0)[0] != MAGIC:
+            self._map.close()
+            raise ValueError("%s is not a capture file"%path)
+        magic,self.wallTime,self.monotonicTime = HEADER.unpack_from(self._map,0)
+        self._end = None
+
+    def records(self):
+        """ Yields (session,monotonic time,data) for every record, where session is the (wall clock
+        time,monotonic time) of the header of the session the record is in. A record that was only
+        partly written (eg. if the program was killed) ends the capture.
+        """
+        m = self._map
+        if m is None:
+            return
+        i = 0
+        n = len(m)
+        session = None
+        while True:
+            if m[i:i+len(MAGIC)] == MAGIC and i+HEADER.size<=n:
+                magic,wallTime,monotonicTime = HEADER.unpack_from(m,i)
+                session = (wallTime,monotonicTime)
+                i += HEADER.size
+                continue
+            if i+RECORD.size>n:
+                break
+            timestamp,length = RECORD.unpack_from(m,i)
+            if i+RECORD.size+length>n:
+                break
+            i += RECORD.size
+            yield session,timestamp,m[i:i+length]
+            i += length
+        self._end = i
+
+    def __iter__(self):
+        """ Yields (monotonic time,data) for every record, the times of the later sessions are
+        moved to the first session's monotonic clock by their wall clock times.
+        """
+        for (wallTime,monotonicTime),timestamp,data in self.records():
+            yield timestamp+(wallTime-self.wallTime)-(monotonicTime-self.monotonicTime),data
+
+    def getValidLength(self):
+        """ The size of the file up to the end of the last complete record """
+        if self._map is None:
+            return 0
+        for record in self.records():
+            pass
+        return self._end
+
+    def toWallTime(self,timestamp):
+        return self.wallTime+timestamp-self.monotonicTime
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+
+class CaptureReplay(threading.Thread):
+    """ Plays a capture back to SerialPortListeners in place of a SerialPortMonitor.
+
+    With a speed of None the chunks are sent as fast as possible, otherwise the original gaps
+    between chunks are kept, divided by speed (1.0 is real time). The time between the sessions
+    of a capture (when nothing was recorded) is skipped.
+    """
+    def __init__(self,path,speed=None):
+        threading.Thread.__init__(self)
+        self._capture = CaptureFile(path)
+        self._speed = speed
+        self._listeners = []
+        self._running = False
+        self._finished = threading.Event()
+
+    def addSerialEventListener(self, listener):
+        self._listeners.append( listener )
+
+    def removeSerialEventListener(self, listener):
+        self._listeners.remove( listener )
+
+    def getConnection(self):
+        return None
+
+    def run(self):
+        """ Replays the whole capture, this can also be called directly to replay on the current thread """
+        self._running = True
+        start = None
+        current = None
+        for session,timestamp,data in self._capture.records():
+            if not self._running:
+                break
+            if self._speed is not None:
+                if start is None or session is not current:
+                    start = (monotonic(),timestamp)
+                    current = session
+                wait = start[0]+(timestamp-start[1])/self._speed-monotonic()
+                if wait>0:
+                    time.sleep(wait)
+            self._fireEvent(SerialEvent(self,bytearray(data),None),'dataReceived')
+        self._finished.set()
+
+    def waitUntilFinished(self,timeout=None):
+        return self._finished.wait(timeout)
+
+    def _fireEvent(self, event,method):
+        for listener in self._listeners:
+            getattr(listener,method)(event)
+
+    def stop(self):
+        self._running = False
+        if self.is_alive():
+            self.join()
+        self._capture.close()
+
+class CaptureNetwork(object):
+    """ Stands in for a Network when replaying a capture so it can be given to a Tracker.
+    Commands can't be sent, the polling methods do nothing.
+    """
+    def __init__(self,path,networkId=0,speed=None):
+        self.networkId = networkId
+        self._monitor = CaptureReplay(path,speed)
+        self._decoder = Decoder(inline=True)
+        self._monitor.addSerialEventListener(self._decoder)
+
+    def getId(self):
+        return self.networkId
+
+    def getMonitor(self):
+        return self._monitor
+
+    def getDecoder(self):
+        return self._decoder
+
+    def startAutoPolling(self,**kwargs):
+        """ Starts the replay """
+        self._monitor.start()
+
+    def stopAutoPolling(self,**kwargs):
+        pass
+
+    def stop(self):
+        self._monitor.stop()
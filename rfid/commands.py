@@ -0,0 +1,77 @@
+'''
+Created on Oct 18, 2026
+
+The wire format of every L-RX201 command in one table. Each Command knows how to
+encode its command packet and decode the data of its packets, so the Reader and
+Packet.getDecoding don't have to write it out by hand.
+'''
+import struct
+
+from rfid.decoder import Packet
+
+def _lookup(valueMap,value):
+    try:
+        return "%s-%s"%(value,valueMap[value])
+    except (KeyError,IndexError):
+        return "%s-Unknown"%value
+
+class Command(object):
+    """ The wire format of a reader command.
+
+    request is the struct format of the data of the command packet (PC->Reader) and reply
+    is the format of the data of the response packet (PC<-Reader), both big endian. describe
+    makes the readable dict used by Packet.getDecoding from the unpacked values.
+    """
+    def __init__(self,opcode,request='',reply=None,describe=None):
+        self.opcode = opcode
+        self.name = Packet.CMD_MAP[opcode]
+        self.request = struct.Struct('>'+request)
+        self.reply = struct.Struct('>'+(request if reply is None else reply))
+        self.describe = describe
+
+    def pack(self,networkId,readerId,nodeId,*args):
+        """ Returns the bytes of the command packet, without the checksum """
+        data = self.request.pack(*args)
+        return bytearray([0xAA,len(data),networkId,readerId,nodeId,self.opcode])+data
+
+    def encode(self,networkId,readerId,nodeId,*args):
+        """ Returns the command Packet """
+        return Packet(self.pack(networkId,readerId,nodeId,*args))
+
+    def decode(self,packet):
+        """ Returns the unpacked values of the packet's data """
+        layout = packet.getHeader()==0xAA and self.request or self.reply
+        if packet.getDataLength()!=layout.size:
+            # The readers echo the data of some commands, so try the other direction too
+            layout = layout is self.request and self.reply or self.request
+        return layout.unpack_from(packet,6)
+
+    def __repr__(self):
+        return "Command(0x%02X,%s)"%(self.opcode,self.name)
+
+COMMANDS = dict((c.opcode,c) for c in [
+    Command(0x00),
+    Command(0x01),
+    Command(0x02),
+    Command(0x03,reply='B',describe=lambda v,p:{'Error Number':_lookup(Packet.PING_ERROR_MAP,v[0])}),
+    Command(0x04,'B',describe=lambda v,p:{'ID':v[0]}),
+    Command(0x05,'B',describe=lambda v,p:{'ID':v[0]}),
+    # A reader with an empty tag table answers with just the error number
+    Command(0x06,reply='%ds'%Packet.TAG_DATA_LENGTH,describe=lambda v,p:p.getDataLength()==1 and
+            {'Error Number':_lookup(Packet.PING_ERROR_MAP,p.getData()[0])} or p._decodeTagPacket()),
+    Command(0x07,'B',describe=lambda v,p:{'RSSI':v[0]}),
+    Command(0x08,reply='B',describe=lambda v,p:{'RSSI':v[0]}),
+    Command(0x09,'3B',describe=lambda v,p:{'Site1':v[0],'Site2':v[1],'Site3':v[2]}),
+    Command(0x0A,reply='3B',describe=lambda v,p:{'Site1':v[0],'Site2':v[1],'Site3':v[2]}),
+    Command(0x0B,'B',describe=lambda v,p:{'Gain':_lookup(Packet.RECEIVER_GAIN_MAP,v[0])}),
+    Command(0x0C,reply='B',describe=lambda v,p:{'Gain':_lookup(Packet.RECEIVER_GAIN_MAP,v[0])}),
+    Command(0x0D,'B',describe=lambda v,p:{'Status':_lookup(Packet.ALARM_STATUS_MAP,v[0])}),
+    Command(0x0E,reply='B',describe=lambda v,p:{'Status':_lookup(Packet.ALARM_STATUS_MAP,v[0])}),
+    Command(0x0F,reply='H',describe=lambda v,p:{'Count':v[0]}),
+    Command(0x10,reply='B',describe=lambda v,p:{'Voltage':v[0]/10.0}),
+    Command(0x11),
+    Command(0x12,reply='B',describe=lambda v,p:{'Noise':v[0]}),
+    Command(0xFE,'B'),
+    Command(0xFF,reply='4B',describe=lambda v,p:{'Controller Firmware Version':v[0]/10.0,'RF Module Firmware Version':v[1]/10.0,
+                                                 'Controller Hardware Version':v[2]/10.0,'RF Module Hardware Version':v[3]/10.0}),
+])
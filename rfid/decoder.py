@@ -3,15 +3,45 @@ Created on Jan 27, 2013
 
 @author: jrm5555@psu.edu & bdf5047@psu.edu
 '''
+import logging
 import threading
 import time
 import Queue
-from datetime import datetime
+import operator
+import struct
 
 from rfid.serial_port_monitor import SerialPortListener
+from rfid.tag import TagReading
+from rfid.dispatch import BoundedQueue,Overflow
+from rfid.metrics import getRegistry
+
+log = logging.getLogger(__name__)
+
+_framesDecoded = getRegistry().counter('rfid_frames_decoded_total','Frames with a valid checksum','command')
+_checksumFailures = getRegistry().counter('rfid_checksum_failures_total','Frames discarded because the checksum failed')
+_resyncs = getRegistry().counter('rfid_decoder_resyncs_total','Times the decoder skipped unexpected bytes to find the next header')
+_queueDepth = getRegistry().gauge('rfid_queue_depth','Items waiting in a queue','queue')
+_queueDropped = getRegistry().callbackCounter('rfid_queue_dropped_total','Items dropped because a queue was full','queue')
+
+_commands = None
+
+def _getCommands():
+    """ rfid.commands.COMMANDS, it can't be imported at the top since rfid.commands imports Packet """
+    global _commands
+    if _commands is None:
+        from rfid.commands import COMMANDS
+        _commands = COMMANDS
+    return _commands
+
+def calcChecksum(data,start,end):
+    """ XOR of data[start:end]
+    CHECKSUM = [Length] XOR [Network ID] XOR [Receiver ID ] XOR [Node ID ] XOR [Command] XOR [Data]
+    """
+    return reduce(operator.xor,data[start:end],0)
 
 class Packet(bytearray):
     BAUDRATES = {0:115200,1:57600,2:38800,3:19200,4:9600}
+    BAUDRATE_CODES = dict((v,k) for k,v in BAUDRATES.items()) # baud rate -> the code sent with Set Baud Rate
     
     ALARM_STATUS_MAP = {
         0:"Report all tags",
@@ -40,8 +70,8 @@ class Packet(bytearray):
         0x04:"Set Network ID",
         0x05:"Set Reader ID",
         0x06:"Get Tag Packet",
-        0x07:"Get RSSI Value",
-        0x08:"Set RSSI Value",
+        0x07:"Set RSSI Value",
+        0x08:"Get RSSI Value",
         0x09:"Set Site Code",
         0x0A:"Get Site Code",
         0x0B:"Set Receiver Gain",
@@ -82,8 +112,12 @@ class Packet(bytearray):
         0x33:"Not fused, programmable",
     }
     
+    # Length of the data of a Get Tag Packet response
+    TAG_DATA_LENGTH = 0x20
+    
     def __init__(self,*params):
         super(Packet,self).__init__(*params)
+        self._decoding = None # Cached by getDecoding, packets should not be changed after they are decoded
         
         if len(self) != (7 + self.getDataLength()):
             self._hasChecksum = False
@@ -115,12 +149,40 @@ class Packet(bytearray):
         return self[6:i]
     
     def setChecksum(self):
-        checksum = 0x00
         if self._hasChecksum: self.pop() 
-        for i in range(1,len(self)): # skip the header and checksum byte
-            checksum ^= self[i] # CHECKSUM = [Length] XOR [Network ID] XOR [Receiver ID ] XOR [Node ID ] XOR [Command] XOR [Data]
-        self.append(checksum)
+        self.append(calcChecksum(self,1,len(self))) # skip the header byte
         self._hasChecksum = True
+        self._decoding = None
+    
+    #=============================== Tag Packet Fields ===============================================
+    # These read single fields of a Get Tag Packet response straight from the bytes without decoding
+    # the whole packet. The offsets are the data offsets in _decodeTagPacket + 6 for the packet header.
+    # =================================================================================================
+    def isTagPacket(self):
+        """ True if this is a Get Tag Packet response containing a tag transmission """
+        return self[0]==0x55 and self[5]==0x06 and self[1]>=Packet.TAG_DATA_LENGTH
+    
+    def getTagId(self):
+        return struct.unpack_from('>I',self,22)[0]
+    
+    def getTagSiteCode(self):
+        return (self[19]<<16)+(self[20]<<8)+self[21]
+    
+    def getTagCounter(self):
+        return self[10]&0x7F
+    
+    def getTagAge(self):
+        return struct.unpack_from('>I',self,15)[0]
+    
+    def getRssi(self):
+        """ RSSI of the tag transmission """
+        return self[28]
+    
+    def getTagAlarmByte(self):
+        return self[31]
+    
+    def getReaderRssi(self):
+        return self[34]
     
     def _decodeTagPacket(self):
         """
@@ -181,7 +243,14 @@ class Packet(bytearray):
         return {'tag':d}
     
     def getDecoding(self):
-        """ Makes a readable version of the binary data """
+        """ Makes a readable version of the binary data. It is only made once and then shared
+        by everything that asks for it so don't modify it.
+        """
+        if self._decoding is None:
+            self._decoding = self._decode()
+        return self._decoding
+    
+    def _decode(self):
         d = {'Network Id':self.getNetworkId(),'Reader Id':self.getReaderId(),'Node Id':self.getNodeId(),} 
         if self.getHeader() == 0xAA:
             d['type'] = "Command"
@@ -194,64 +263,23 @@ class Packet(bytearray):
         except:
             d['cmd'] = "Unknown"
         if self.getDataLength()>0:
-            c = self.getCommand()
-            data = self.getData()
-            
-            if c==0x03: # Ping Command
-                try:
-                    repr = Packet.PING_ERROR_MAP[data[0]]
-                except:
-                    repr = "Unknown"
-                d['data'] = {'Error Number':"%s-%s"%(data[0],repr)}
-            
-            elif (c==0x04 or c==0x05): # Set Network/Reader ID
-                d['data'] = {'ID':data[0]}
-            
-            elif c==0x06: # Get Tag Packet
-                d['data'] = self._decodeTagPacket()
-                
-            elif (c==0x07 or c==0x08): #RSSI Value Commands
-                d['data'] = {'RSSI':data[0]}
-                
-            elif (c==0x09 or c==0x0A): # Site Code Commands
-                d['data'] = {'Site1':data[0],'Site2':data[1],'Site3':data[2]}
-            
-            elif (c==0x0B or c==0x0C): # Receiver Gain Command Commands
-                try:
-                    repr = Packet.RECEIVER_GAIN_MAP[data[0]]
-                except:
-                    repr = "Unknown"
-                d['data'] = {'Gain':"%s-%s"%(data[0],repr)}
-            
-            elif (c==0x0D or c==0x0E): # Alarm Tag Filter Status Commands
-                try:
-                    repr = Packet.ALARM_STATUS_MAP[data[0]]
-                except:
-                    repr = "Unknown"
-                d['data'] = {'Status':"%s-%s"%(data[0],repr)}
-            
-            elif c==0x0F: # Get Invalid Tag Count
-                d['data'] = {'Count':(data[0]<<8)+data[1]}
-            
-            elif c==0x10: # Get Power Supply Voltage
-                d['data'] = {'Voltage':data[0]/10.0}
-                
-            elif c==0x12: # Get Environmental Noise Level Value
-                d['data'] = {'Noise':data[0]}
-                
-            elif c==0xFF: # Get Version Info
-                d['data'] = {'Controller Firmware Version':data[0]/10.0,'RF Module Firmware Version':data[1]/10.0,'Controller Hardware Version':data[2]/10.0,'RF Module Hardware Version':data[3]/10.0}
-                
-            else:
+            command = _getCommands().get(self.getCommand())
+            if command is None or command.describe is None:
                 d['data'] = "Not implemented!"
+            else:
+                try:
+                    d['data'] = command.describe(command.decode(self),self)
+                except (struct.error,IndexError):
+                    d['data'] = "Invalid - %s"%str(self.getData()).encode('hex')
             
         return d
     
     def pretty(self):
+        cmd = Packet.CMD_MAP.get(self.getCommand(),"Unknown")
         if (self.getHeader()==0xAA):
-            return "[PC->Reader][Node:%s][CMD:%s]"%(self.getNodeId(),self.getDecoding()['cmd'])
+            return "[PC->Reader][Node:%s][CMD:%s]"%(self.getNodeId(),cmd)
         else: 
-            return "[PC<-Reader][Node:%s][RSP:%s]"%(self.getNodeId(),self.getDecoding()['cmd'])
+            return "[PC<-Reader][Node:%s][RSP:%s]"%(self.getNodeId(),cmd)
     
     def __repr__(self):
         # TODO: Make this look cool
@@ -264,14 +292,104 @@ class PacketDecodedEvent:
             self._eventSource = eventSource
             self._packet = Packet(byteArray)
             self._time = time.time()
+            self._reading = None
     
     def getPacket(self):
         """ Get the packet's data """
         return self._packet
     
+    def getHeader(self):
+        return self.getPacket().getHeader()
+    
+    def getNetworkId(self):
+        return self.getPacket().getNetworkId()
+    
+    def getNodeId(self):
+        return self.getPacket().getNodeId()
+    
+    def getCommand(self):
+        return self.getPacket().getCommand()
+    
+    def getTagReading(self):
+        """ Get the TagReading if the packet is a tag transmission, otherwise None """
+        if self._reading is None and self._packet.isTagPacket():
+            self._reading = TagReading.fromPacket(self._packet,self._time)
+        return self._reading
+    
     def getTime(self):
         """ Get time at which the packet was received"""
         return self._time
+    
+    def getReaderKey(self):
+        """ The reader that sent the packet, a NetworkPool's events add the port to make it unique """
+        return self.getNodeId()
+    
+    def isLastInGroup(self):
+        """ False if more copies of the same tag transmission from other readers follow, see rfid.dedupe """
+        return True
+    
+    def keep(self):
+        """ Returns an event that stays valid after packetReady returns, listeners that hold on to 
+        events (eg. queue them) must keep them since the decoder reuses the event, see FrameEvent.
+        """
+        return self
+
+class FrameEvent(PacketDecodedEvent):
+    """ A PacketDecodedEvent that reads the frame straight out of the decoder's buffer instead
+    of copying it, the Packet is only created if getPacket is called.
+    
+    The decoder reuses the same event for every frame, so the event is only valid during
+    packetReady. A listener that holds on to it after packetReady returns (eg. queues it for 
+    another thread) must keep() it and hold the kept event instead.
+    """
+    def __init__(self, eventSource):
+        self._eventSource = eventSource
+        self._set(None,0,0,0)
+    
+    def _set(self,buf,start,end,time):
+        # Swapped in one assignment so another thread never sees the buffer of one and the offsets of another
+        self._frame = (buf,start,end)
+        self._time = time
+        self._packet = None
+        self._reading = None
+    
+    def keep(self):
+        """ Returns a PacketDecodedEvent with a copy of the frame """
+        buf,start,end = self._frame
+        event = PacketDecodedEvent(self._eventSource,memoryview(buf)[start:end])
+        event._time = self._time
+        event._reading = self._reading
+        return event
+    
+    def getPacket(self):
+        packet = self._packet
+        if packet is None:
+            buf,start,end = self._frame
+            packet = self._packet = Packet(buf[start:end])
+        return packet
+    
+    def getHeader(self):
+        buf,start,end = self._frame
+        return buf[start]
+    
+    def getNetworkId(self):
+        buf,start,end = self._frame
+        return buf[start+2]
+    
+    def getNodeId(self):
+        buf,start,end = self._frame
+        return buf[start+4]
+    
+    def getCommand(self):
+        buf,start,end = self._frame
+        return buf[start+5]
+    
+    def getTagReading(self):
+        if self._reading is None:
+            buf,i,end = self._frame
+            if buf[i]==0x55 and buf[i+5]==0x06 and buf[i+1]>=Packet.TAG_DATA_LENGTH:
+                self._reading = TagReading.fromBuffer(buf,i,self._time)
+        return self._reading
             
 class PacketDecodedListener:
     def packetReady(self, event):
@@ -308,108 +426,136 @@ class WaitForReplyListener(threading.Thread,PacketDecodedListener):
             
 class Decoder(SerialPortListener,threading.Thread):
     """ Decodes the serial port response.. should fire events when packet is decoded."""
-    def __init__(self):
+    # Largest packet that can be on the wire: header, length, 3 id bytes, cmd and checksum + 255 data bytes
+    MAX_PACKET_SIZE = 7+0xFF
+    
+    def __init__(self,inline=False,maxsize=1000,overflow=Overflow.BLOCK):
+        """ If inline is True the data is decoded on the thread that received it (the 
+        SerialPortMonitor) instead of being queued for this thread, and the thread is not used.
+        
+        Otherwise up to maxsize chunks of data are queued (0 is unbounded), when the queue is full
+        overflow decides whether the SerialPortMonitor waits (and the serial port buffers the data) 
+        or chunks are dropped, see Overflow. The packets in a dropped chunk are lost.
+        """
         threading.Thread.__init__(self)
-        self.queue = Queue.Queue() # Holds all of the incoming data until this thread can decode it
-        self.packets = [bytearray()] # holds the decoded packets
+        valid = [Overflow.BLOCK,Overflow.DROP_OLDEST,Overflow.DROP_NEWEST]
+        assert overflow in valid,"overflow must be in %s, given %s"%(valid,overflow)
+        self.queue = BoundedQueue(maxsize,overflow) # Holds all of the incoming data until this thread can decode it
+        if not inline:
+            _queueDepth.set(self.getQueueDepth,self._metricsLabel())
+            _queueDropped.set(self.getDroppedCount,self._metricsLabel())
+        self._inline = inline
+        self._buffer = bytearray() # Holds the start of a packet that has not been completely received yet
+        self._event = FrameEvent(self) # Reused for every packet
         self._listeners = [] # TODO: when a packet is decoded fire an event
-        self._bytesLeft = 0 # Track whether or not we're in the middle of a packet's data section
+        self._readingListeners = [] # Get TagReadings instead of packets for tag transmissions
     
     def doesChecksumMatch(self,packet):
         """ Checks that the checksum is correct for the packet. Returns a boolean checksum matched"""
-        checksum = 0x00 
-        for i in range(1,len(packet)-1): # skip the header and checksum byte
-            checksum ^= packet[i] # CHECKSUM = [Length] XOR [Network ID] XOR [Receiver ID ] XOR [Node ID ] XOR [Command] XOR [Data]
-            
-        return checksum == packet[-1]#,"Warning - Discarding packet, checksum was incorrect %s != %s"%(checksum,packet[-1])) 
+        return calcChecksum(packet,1,len(packet)-1) == packet[-1]
     
-    def decode(self,data,retries=100):
-        if len(data)<1:
-            return
-        if len(self.packets[-1])==0:
-            # Look for a new packet header
-            i1 = data.find('\xAA')
-            i2 = data.find('\x55')
-            
-            if i1 != -1 and (i2 == -1 or i1<i2):
-                # We found a command packet
-                if i1 != 0: 
-                    self.log("[DEBUG] Out of sync! Unexpected Data: %s"%(str(data[0:i1]).encode('hex')))
-                    data = data[i1:] # This should be the new packet start
-            elif i2 != -1 and (i1 == -1 or i2<i1):
-                # We found a response packet
-                if i2 != 0: 
-                    self.log( "[DEBUG] Out of sync! Unexpected Data: %s"%(str(data[0:i2]).encode('hex')))
-                    data = data[i2:] # This should be the new packet start
-            else:
-                return#raise RuntimeError("Decoder error! This should never get executed!")
-            
-            self.packets[-1].append(data.pop(0))
-            # Back to the top
-            self.decode(data,retries)
+    def _findHeader(self,data,start):
+        """ Returns the index of the next command or response header at or after start, or -1 """
+        i1 = data.find('\xAA',start)
+        i2 = data.find('\x55',start)
+        if i1 == -1 or (i2 != -1 and i2<i1):
+            return i2
+        return i1
+    
+    def decode(self,data,received=None):
+        """ Frames all of the packets in data and fires a packetReady event for each one.
         
-        elif len(self.packets[-1])==1:
-            # This byte should be the packet length
-            self.packets[-1].append(data.pop(0))
-            self._bytesLeft = 5+self.packets[-1][1] # have header and length bytes, need 3 id bytes, cmd, and checksum = 5 bytes, + data bytes
-            #self.decode(data)
-            
+        Works in a single pass over the buffer. The bytes of a packet that is not
+        complete yet are kept for the next call, so the buffer never holds more than 
+        one partial packet (MAX_PACKET_SIZE bytes) between calls.
         
-        # The previous packet still needs more bytes to be complete
-        while self._bytesLeft>0 and len(data)>0:
-            self.packets[-1].append(data.pop(0))   
-            self._bytesLeft -=1
+        received - time.time() at which data was read from the port, it's the time of every
+            packet completed by data. Defaults to now.
+        """
+        buf = self._buffer
+        buf.extend(data)
+        n = len(buf)
+        i = 0 # Start of the bytes that have not been framed yet
+        now = time.time() if received is None else received
+        while i<n:
+            start = self._findHeader(buf,i)
+            if start == -1:
+                if log.isEnabledFor(logging.DEBUG):
+                    log.debug("Out of sync! Unexpected Data: %s",str(buf[i:n]).encode('hex'))
+                _resyncs.inc()
+                i = n
+                break
+            if start != i:
+                if log.isEnabledFor(logging.DEBUG):
+                    log.debug("Out of sync! Unexpected Data: %s",str(buf[i:start]).encode('hex'))
+                _resyncs.inc()
+                i = start
+            
+            if n-start<2:
+                break # Wait for the length byte
+            end = start+7+buf[start+1] # header and length bytes, 3 id bytes, cmd, and checksum = 7 bytes, + data bytes
+            if end>n:
+                break # Wait for the rest of the packet
             
-        # If the previous packet has all of it's bytes, start a new one
-        if len(self.packets[-1])>6 and self._bytesLeft==0:
-            # TODO: fire an event saying a packet is decoded!
-            if self.doesChecksumMatch(self.packets[-1]):
-                """
-                if (self.packets[-1][0] == 0xAA):
-                    print "[%s][Decoder][CMD]%s"%(time.strftime('%x %X'),str(self.packets[-1]).encode('hex'))
-                    pass
-                elif (self.packets[-1][0] == 0x55):
-                    print "[%s][Decoder][RSP]%s"%(time.strftime('%x %X'),str(self.packets[-1]).encode('hex'))
-                    pass
-                else:
-                    raise RuntimeError("Decoded an unknown packet type! %s"%self.packets[-1][0].__repr__())
-                """
-                self._fireEvent(PacketDecodedEvent(self,self.packets[-1]), 'packetReady')
+            if calcChecksum(buf,start+1,end-1) == buf[end-1]:
+                _framesDecoded.inc(label=buf[start+5])
+                if self._readingListeners and buf[start]==0x55 and buf[start+5]==0x06 and buf[start+1]>=Packet.TAG_DATA_LENGTH:
+                    reading = TagReading.fromBuffer(buf,start,now)
+                    for listener in self._readingListeners:
+                        listener.tagRead(reading)
+                if self._listeners:
+                    self._fireFrame(buf,start,end,now)
+                i = end
             else:
-                self.log( '[DEBUG] Checksum failed! Discarding packet.')             
-            # Start a new packet!
-            self.packets.append(bytearray())
+                # The header was either corrupt or just a data byte, resync on the next header
+                log.debug('Checksum failed! Discarding packet.')
+                _checksumFailures.inc()
+                i = start+1
         
-        retries -=1
-        if retries>0:
-            self.decode(data,retries)
-        else:
-            self.log('[DEBUG] Recursion limit exceeded! Discarding packet!')
-            self.packets.append(bytearray())
-            #self.decode(data)
-            
+        # Only keep the partial packet
+        del buf[:i]
         
     
-    
     def run(self):
         while True:
             event = self.queue.get(block=True)
             if event == 'shutdown':
-                print self, 'shutting down'
+                log.info("%s shutting down",self)
                 return
             #print "[%s][Decoder][RAW]%s"%(time.strftime('%x %X'),str(event.getData()).encode('hex'))
-            self.decode(event.getData())
+            self.decode(event.getData(),event.getTime())
             
             
     def stop(self):
-        self.queue.put("shutdown")
+        if self._inline:
+            return
+        self.queue.put("shutdown",force=True)
         self.join()
+        _queueDepth.remove(self._metricsLabel())
+        _queueDropped.remove(self._metricsLabel())
+    
+    def isInline(self):
+        return self._inline
+    
+    def _metricsLabel(self):
+        return "decoder-%s"%self.getName()
+    
+    def getQueueDepth(self):
+        """ Number of chunks of data waiting to be decoded """
+        return self.queue.qsize()
+    
+    def getDroppedCount(self):
+        """ Number of chunks of data dropped because the queue was full """
+        return self.queue.getDroppedCount()
         
     def dataReceived(self, event):
         """
         So if I have a list of data... is it easier to wait for it? or search backwards and decode that way?
         """
-        self.queue.put(event,False)
+        if self._inline:
+            self.decode(event.getData(),event.getTime())
+        else:
+            self.queue.put(event)
         
     def addPacketDecodedEventListener(self, listener):
         self._listeners.append( listener )
@@ -417,10 +563,23 @@ class Decoder(SerialPortListener,threading.Thread):
     def removePacketDecodedEventListener(self, listener):
             self._listeners.remove( listener )
     
+    def addTagReadingListener(self, listener):
+        """ The listener's tagRead is called with a TagReading for every tag transmission, 
+        without a Packet being made for it if there are no PacketDecodedListeners.
+        """
+        self._readingListeners.append( listener )
+        
+    def removeTagReadingListener(self, listener):
+        self._readingListeners.remove( listener )
+    
+    def _fireFrame(self,buf,start,end,time):
+        """ Fires packetReady with the reused FrameEvent for buf[start:end], see FrameEvent.keep """
+        event = self._event
+        event._set(buf,start,end,time)
+        self._fireEvent(event,'packetReady')
+    
     def _fireEvent(self, event,method):
         #print "%s event fired"%method
         for listener in self._listeners:
             getattr(listener,method)(event)
-            
-    def log(self,msg,tag="Decoder"):
-        print "[%s][%s]%s"%(datetime.now().strftime("%H:%M:%S.%f"),tag,msg)
+
@@ -0,0 +1,185 @@
+'''
+Created on Oct 18, 2026
+
+Drops repeated copies of tag transmissions before they reach the tracker and groups the
+copies of one transmission that were heard by different readers:
+
+    dedupe = Deduplicator(nw)
+    tracker = Tracker(dedupe)
+
+A transmission is identified by the tag id and the counter the tag sends with it. The same
+(tag id, counter, reader) is only passed on once every ttl seconds. The copies heard by other
+readers within groupWindow seconds of the first are held and then passed on together with the
+same ObservationGroup, and only the last one of the group says isLastInGroup(), so the tracker
+estimates the position once per transmission with every reader's RSSI instead of once per copy.
+'''
+import logging
+import threading
+from collections import deque
+
+from rfid.decoder import PacketDecodedListener
+from rfid.metrics import getRegistry
+from rfid.timer import getTimer
+
+log = logging.getLogger(__name__)
+
+_duplicates = getRegistry().counter('rfid_duplicates_dropped_total','Tag packets dropped because the same reader already passed on the transmission')
+_groups = getRegistry().counter('rfid_observation_groups_total','Tag transmissions passed on by the deduplicator')
+
+class ObservationGroup(object):
+    """ The copies of one tag transmission heard by different readers """
+    def __init__(self,tagId,counter,time):
+        self.tagId = tagId
+        self.counter = counter
+        self.time = time # When the first copy was received
+        self.readings = {} # reader key -> TagReading
+
+    def getReaderKeys(self):
+        return self.readings.keys()
+
+    def getRssi(self):
+        """ Returns a dict of reader key -> RSSI """
+        return dict((key,reading.rssi) for key,reading in self.readings.items())
+
+    def __len__(self):
+        return len(self.readings)
+
+    def __repr__(self):
+        return "ObservationGroup(tag=%s,counter=%s,rssi=%s)"%(self.tagId,self.counter,self.getRssi())
+
+class ObservationEvent(object):
+    """ A tag packet event that is part of an ObservationGroup """
+    def __init__(self,event,group,last):
+        self._event = event
+        self._group = group
+        self._last = last
+
+    def getPacket(self):
+        return self._event.getPacket()
+
+    def getTagReading(self):
+        return self._event.getTagReading()
+
+    def getTime(self):
+        return self._event.getTime()
+
+    def getReaderKey(self):
+        return self._event.getReaderKey()
+
+    def getGroup(self):
+        return self._group
+
+    def isLastInGroup(self):
+        return self._last
+
+    def keep(self):
+        return self # Made from a kept event
+
+class Deduplicator(PacketDecodedListener):
+    """ Passes on the packets decoded by the network (a Network or NetworkPool) without the repeated
+    tag transmissions. Stands in for the network when given to a Tracker. Packets that aren't
+    tag transmissions are passed on right away.
+
+    ttl is how long a (tag id, counter, reader) is remembered, it should be less than 128 of the
+    tags' transmission intervals since the counter wraps around. The copies of a transmission
+    are held for groupWindow seconds, with 0 they are passed on right away each in its own group.
+    Held events are passed on from the timer's thread so the listeners should be quick (the
+    Tracker only queues them).
+    """
+    def __init__(self,network,ttl=1.0,groupWindow=0.05,timer=None):
+        self.network = network
+        self._ttl = ttl
+        self._groupWindow = groupWindow
+        self._timer = timer or getTimer()
+        self._listeners = []
+        self._seen = {} # (tag id,counter,reader key) -> time it expires
+        self._expiry = deque() # (time it expires,key) in the order they were added
+        self._open = {} # (tag id,counter) -> (ObservationGroup,[events]) waiting for groupWindow
+        self._lock = threading.Lock()
+        self._duplicates = 0
+        self._groups = 0
+        network.getDecoder().addPacketDecodedEventListener(self)
+
+    def getDecoder(self):
+        """ The deduplicator fires the events itself, so Tracker(dedupe) listens to them """
+        return self
+
+    def getId(self):
+        return self.network.getId()
+
+    def getReaders(self):
+        return self.network.getReaders()
+
+    def startAutoPolling(self,**kwargs):
+        return self.network.startAutoPolling(**kwargs)
+
+    def stopAutoPolling(self,**kwargs):
+        return self.network.stopAutoPolling(**kwargs)
+
+    def getDuplicateCount(self):
+        """ Number of tag packets that were dropped """
+        return self._duplicates
+
+    def getGroupCount(self):
+        """ Number of transmissions passed on """
+        return self._groups
+
+    def getSeenCount(self):
+        """ Number of (tag id, counter, reader) remembered """
+        return len(self._seen)
+
+    def addPacketDecodedEventListener(self, listener):
+        self._listeners.append( listener )
+
+    def removePacketDecodedEventListener(self, listener):
+        self._listeners.remove( listener )
+
+    def _fireEvent(self, event):
+        for listener in self._listeners:
+            listener.packetReady(event)
+
+    def _evict(self,now):
+        expiry,seen = self._expiry,self._seen
+        while expiry and expiry[0][0]<=now:
+            t,key = expiry.popleft()
+            if seen.get(key)==t:
+                del seen[key]
+
+    def packetReady(self, event):
+        reading = event.getTagReading()
+        if reading is None:
+            self._fireEvent(event)
+            return
+        now = event.getTime()
+        key = (reading.tagId,reading.counter,event.getReaderKey())
+        transmission = key[:2]
+        with self._lock:
+            self._evict(now)
+            if key in self._seen:
+                self._duplicates += 1
+                _duplicates.inc()
+                return
+            self._seen[key] = now+self._ttl
+            self._expiry.append((now+self._ttl,key))
+
+            opened = self._open.get(transmission)
+            if opened is None:
+                opened = self._open[transmission] = (ObservationGroup(reading.tagId,reading.counter,now),[])
+                if self._groupWindow:
+                    self._timer.schedule(self._groupWindow,self._release,transmission)
+            group,events = opened
+            group.readings[key[2]] = reading
+            events.append(event.keep())
+        if not self._groupWindow:
+            self._release(transmission)
+
+    def _release(self,transmission):
+        """ Passes on the copies of the transmission """
+        with self._lock:
+            group,events = self._open.pop(transmission)
+            self._groups += 1
+        _groups.inc()
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("%s",group)
+        for i,event in enumerate(events):
+            self._fireEvent(ObservationEvent(event,group,i==len(events)-1))
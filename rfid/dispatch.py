@@ -0,0 +1,162 @@
+'''
+Created on Oct 18, 2026
+
+Bounded queues with an explicit overload policy, and delivering events to a slow listener on its 
+own thread so it can't hold up the thread that fires them (eg. the Decoder framing packets and 
+handing replies to Network.ask).
+'''
+import logging
+import threading
+from collections import deque
+
+log = logging.getLogger(__name__)
+
+class Overflow:
+    BLOCK = 'block' # Wait for the consumer to catch up (this stalls the producer)
+    DROP_OLDEST = 'drop-oldest' # Throw away the oldest queued item to make room
+    DROP_NEWEST = 'drop-newest' # Throw away the new item
+    LATEST = 'latest' # Replace the queued item with the same key, otherwise drop the oldest
+
+class BoundedQueue(object):
+    """ A FIFO queue holding at most maxsize items (0 is unbounded) that handles a full queue 
+    according to overflow (see Overflow) and counts the items it dropped.
+    
+    For Overflow.LATEST, key(item) returns the key of an item or None if it must not be replaced, 
+    a newer item takes the place of the queued one so it's not delayed any further.
+    """
+    def __init__(self,maxsize=0,overflow=Overflow.BLOCK,key=None):
+        valid = [Overflow.BLOCK,Overflow.DROP_OLDEST,Overflow.DROP_NEWEST,Overflow.LATEST]
+        assert overflow in valid,"overflow must be in %s, given %s"%(valid,overflow)
+        assert overflow != Overflow.LATEST or key is not None,"the latest overflow needs a key"
+        self.maxsize = maxsize
+        self._overflow = overflow
+        self._key = key
+        self._items = deque() # [key,item] entries
+        self._latest = {} # key -> queued entry
+        self._dropped = 0
+        self._maxDepth = 0
+        self._lock = threading.Lock()
+        self._notEmpty = threading.Condition(self._lock)
+        self._notFull = threading.Condition(self._lock)
+
+    def getOverflow(self):
+        return self._overflow
+
+    def qsize(self):
+        return len(self._items)
+
+    def getDroppedCount(self):
+        return self._dropped
+
+    def getMaxDepth(self):
+        """ The most items that have been queued at once """
+        return self._maxDepth
+
+    def put(self,item,force=False):
+        """ Queues the item. If force is True it's queued even if the queue is full (eg. to stop the consumer) """
+        with self._lock:
+            if not force and self.maxsize>0 and len(self._items)>=self.maxsize:
+                if self._overflow == Overflow.BLOCK:
+                    while len(self._items)>=self.maxsize:
+                        self._notFull.wait()
+                elif self._overflow == Overflow.DROP_NEWEST:
+                    self._dropped += 1
+                    return
+                else:
+                    self._dropped += 1
+                    if self._overflow == Overflow.LATEST:
+                        key = self._key(item)
+                        entry = self._latest.get(key)
+                        if entry is not None:
+                            entry[1] = item
+                            return
+                    self._remove(self._items.popleft())
+            key = None
+            if self._overflow == Overflow.LATEST:
+                key = self._key(item)
+            entry = [key,item]
+            self._items.append(entry)
+            if key is not None:
+                self._latest[key] = entry
+            self._maxDepth = max(self._maxDepth,len(self._items))
+            self._notEmpty.notify()
+
+    def get(self,block=True):
+        """ Removes and returns the oldest item, waiting for one if block is True (raises IndexError if empty otherwise) """
+        with self._lock:
+            while block and not self._items:
+                self._notEmpty.wait()
+            entry = self._items.popleft()
+            self._remove(entry)
+            self._notFull.notify()
+            return entry[1]
+
+    def _remove(self,entry):
+        if entry[0] is not None and self._latest.get(entry[0]) is entry:
+            del self._latest[entry[0]]
+
+class QueuedListener(threading.Thread):
+    """ Wraps a SerialPortListener, PacketDecodedListener and/or TagReadingListener so its events are
+    put in a bounded queue and delivered by a worker thread. Register the QueuedListener in place
+    of the listener:
+
+        decoder.addPacketDecodedEventListener(QueuedListener(Logger(),maxsize=1000))
+
+    When the queue is full, overflow decides what happens (see Overflow). Dropped events are counted.
+    """
+    def __init__(self,listener,maxsize=1000,overflow=Overflow.DROP_OLDEST):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        valid = [Overflow.BLOCK,Overflow.DROP_OLDEST,Overflow.DROP_NEWEST]
+        assert overflow in valid,"overflow must be in %s, given %s"%(valid,overflow)
+        assert maxsize>0,"maxsize must be positive, given %s"%maxsize
+        self._listener = listener
+        self.queue = BoundedQueue(maxsize,overflow)
+        self._delivered = 0
+        self.start()
+
+    def getListener(self):
+        return self._listener
+
+    def getOverflow(self):
+        return self.queue.getOverflow()
+
+    def getQueueDepth(self):
+        return self.queue.qsize()
+
+    def getDroppedCount(self):
+        return self.queue.getDroppedCount()
+
+    def getDeliveredCount(self):
+        return self._delivered
+
+    def dataReceived(self, event):
+        self.queue.put(('dataReceived',event))
+
+    def dataSent(self, event):
+        self.queue.put(('dataSent',event))
+
+    def packetReady(self, event):
+        # The decoder reuses its events, a queued one has to be kept (see FrameEvent)
+        keep = getattr(event,'keep',None)
+        self.queue.put(('packetReady',keep() if keep is not None else event))
+
+    def tagRead(self, reading):
+        self.queue.put(('tagRead',reading))
+
+    def run(self):
+        while True:
+            item = self.queue.get(block=True)
+            if item == 'shutdown':
+                return
+            method,event = item
+            try:
+                getattr(self._listener,method)(event)
+            except:
+                log.exception("%s failed handling %s",self._listener,method)
+            self._delivered += 1
+
+    def stop(self):
+        """ Delivers everything queued and stops the worker """
+        self.queue.put("shutdown",force=True)
+        self.join()
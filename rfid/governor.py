@@ -0,0 +1,201 @@
+'''
+Created on Oct 18, 2026
+
+Keeps the tag traffic within what the bus and the host can handle by having the readers filter
+more when they can't keep up, and less again once they can:
+
+    governor = TrafficGovernor(nw,maxRate=200,queues=[tracker],siteCode=(1,2,3))
+    governor.start()
+
+Every period seconds the load is worked out from the rate of tag packets and the depth of the
+queues. Above high load the readers sending the most packets get their RSSI rejection threshold
+raised by step (so they drop the weakest, furthest tags) and the site code filter is pushed to
+every reader. Below low load the thresholds are lowered again by step, but never below the
+threshold a reader had when the governor started (eg. the one it was provisioned with). Every
+change is logged and kept in getChanges() so the accuracy given up for throughput can be audited.
+'''
+import logging
+import threading
+import time
+
+from rfid.decoder import PacketDecodedListener
+from rfid.metrics import getRegistry
+
+log = logging.getLogger(__name__)
+
+_load = getRegistry().gauge('rfid_governor_load','Load worked out by the traffic governor, 1 is saturated')
+_threshold = getRegistry().gauge('rfid_governor_rssi_threshold','RSSI rejection threshold the governor gave each reader','reader')
+
+class FilterChange(object):
+    """ A change the governor made to a reader's filters """
+    def __init__(self,time,readerKey,setting,old,new,load,rate):
+        self.time = time
+        self.readerKey = readerKey
+        self.setting = setting
+        self.old = old
+        self.new = new
+        self.load = load
+        self.rate = rate # The reader's tag packets per second
+        self.confirmed = None # True once the reader replied, False if it didn't
+
+    def __repr__(self):
+        return "FilterChange(reader=%s,%s %s->%s,load=%.2f,rate=%.1f)"%(self.readerKey,self.setting,self.old,self.new,self.load,self.rate)
+
+class TrafficGovernor(threading.Thread,PacketDecodedListener):
+    """ Raises and lowers the readers' RSSI rejection thresholds with the load.
+
+    The load is the larger of the tag packets per second over maxRate and the depth of the fullest
+    of queues (objects with getQueueDepth, eg. a Tracker or Decoder) over maxDepth. The readers are
+    the network's (those found by the last rescan, or a NetworkPool's), the rates are counted by the
+    events' reader keys. If siteCode is given (the 3 site code bytes) it's pushed to the readers
+    the first time the load is high.
+    
+    The readers' thresholds are read with getRssiValue the first time they're needed, unless they
+    are given in thresholds (a dict of reader key -> RSSI threshold). A reader is never set below
+    its starting threshold or minRssi, whichever is higher. A reader that doesn't reply is left
+    alone until it does.
+    """
+    def __init__(self,network,maxRate=200,queues=(),maxDepth=1000,period=5,high=0.8,low=0.4,
+                 step=5,minRssi=0,maxRssi=200,siteCode=None,timeout=0.5,thresholds=None):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        assert low<high,"low must be less than high, given %s and %s"%(low,high)
+        self._network = network
+        self._maxRate = maxRate
+        self._queues = list(queues)
+        self._maxDepth = maxDepth
+        self._period = period
+        self._high = high
+        self._low = low
+        self._step = step
+        self._minRssi = minRssi
+        self._maxRssi = maxRssi
+        self._siteCode = siteCode and tuple(siteCode)
+        self._siteCodePushed = False
+        self._timeout = timeout
+        self._counts = {} # reader key -> tag packets since the last update
+        self._thresholds = {} # reader key -> RSSI threshold given to the reader
+        self._floors = {} # reader key -> lowest threshold the reader may be given
+        self._changes = []
+        self._lastUpdate = time.time()
+        self._load = 0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        for key,rssi in (thresholds or {}).items():
+            self._addReader(key,rssi)
+        _load.set(self.getLoad)
+        network.getDecoder().addPacketDecodedEventListener(self)
+
+    def packetReady(self, event):
+        if event.getTagReading() is None:
+            return
+        key = event.getReaderKey()
+        with self._lock:
+            self._counts[key] = self._counts.get(key,0)+1
+
+    def getReaders(self):
+        """ Returns a dict of reader key -> Reader """
+        readers = self._network.getReaders()
+        if isinstance(readers,dict):
+            return readers
+        return dict((r.getNodeId(),r) for r in readers)
+
+    def getLoad(self):
+        return self._load
+
+    def getThreshold(self,readerKey):
+        """ The RSSI threshold the governor gave the reader, or the one it started with """
+        return self._thresholds.get(readerKey)
+
+    def _addReader(self,key,rssi):
+        self._thresholds[key] = rssi
+        self._floors[key] = max(self._minRssi,rssi)
+        _threshold.set(lambda key=key,thresholds=self._thresholds:thresholds.get(key),key) # Not self so the registry doesn't keep the governor alive
+
+    def _readThresholds(self,readers):
+        """ Reads the thresholds of the readers the governor doesn't know yet, returns the readers
+        it knows the thresholds of.
+        """
+        new = [(key,reader.getRssiValue(timeout=self._timeout,wait=False))
+               for key,reader in readers.items() if key not in self._thresholds]
+        for key,future in new:
+            rssi = future.result()
+            if rssi is None:
+                log.warning("Reader %s didn't send its RSSI threshold, leaving it alone",key)
+                continue
+            log.info("Reader %s RSSI threshold is %s",key,rssi)
+            self._addReader(key,rssi)
+        return dict((key,reader) for key,reader in readers.items() if key in self._thresholds)
+
+    def getChanges(self):
+        """ Returns the FilterChanges made so far, oldest first """
+        return list(self._changes)
+
+    def _change(self,key,setting,old,new,rate,send):
+        change = FilterChange(time.time(),key,setting,old,new,self._load,rate)
+        self._changes.append(change)
+        log.info("Reader %s %s %s -> %s (load %.2f, %.1f tags/s)",key,setting,old,new,self._load,rate)
+        def done(future):
+            change.confirmed = future.result() is not None
+            if not change.confirmed:
+                log.warning("Reader %s didn't confirm %s",key,change)
+        send(timeout=self._timeout,wait=False).addDoneCallback(done)
+
+    def update(self):
+        """ Works out the load since the last update and changes the readers' filters if needed.
+        Called every period seconds by the thread. Returns the load.
+        """
+        now = time.time()
+        elapsed = max(now-self._lastUpdate,1e-6)
+        self._lastUpdate = now
+        with self._lock:
+            counts,self._counts = self._counts,{}
+        rates = dict((key,count/elapsed) for key,count in counts.items())
+        depth = max([q.getQueueDepth() for q in self._queues] or [0])
+        self._load = max(sum(rates.values())/self._maxRate,float(depth)/self._maxDepth)
+        readers = self.getReaders()
+
+        if self._load>self._high:
+            if self._siteCode is not None and not self._siteCodePushed:
+                self._siteCodePushed = True
+                for key,reader in readers.items():
+                    self._change(key,'siteCode',None,self._siteCode,rates.get(key,0),
+                                 lambda reader=reader,**kw:reader.setSiteCode(*self._siteCode,**kw))
+            # The readers sending more than their share of the traffic filter more
+            share = sum(rates.values())/max(1,len(readers))
+            for key,reader in self._readThresholds(readers).items():
+                old = self.getThreshold(key)
+                new = max(old,min(self._maxRssi,old+self._step))
+                if rates.get(key,0)>=share and new!=old:
+                    self._setThreshold(key,reader,old,new,rates.get(key,0))
+        elif self._load<self._low:
+            # Only the readers the governor knows the thresholds of can have been raised
+            for key,reader in readers.items():
+                if key not in self._thresholds:
+                    continue
+                old = self.getThreshold(key)
+                new = max(self._floors[key],old-self._step)
+                if new!=old:
+                    self._setThreshold(key,reader,old,new,rates.get(key,0))
+        return self._load
+
+    def _setThreshold(self,key,reader,old,new,rate):
+        self._thresholds[key] = new
+        self._change(key,'rssi',old,new,rate,lambda **kw:reader.setRssiValue(new,**kw))
+
+    def run(self):
+        self._lastUpdate = time.time()
+        while not self._stopped.wait(self._period):
+            try:
+                self.update()
+            except:
+                log.exception("Failed to update the filters")
+
+    def stop(self):
+        self._stopped.set()
+        if self.is_alive():
+            self.join()
+        self._network.getDecoder().removePacketDecodedEventListener(self)
+        _load.remove()
+        for key in self._thresholds:
+            _threshold.remove(key)
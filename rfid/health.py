@@ -0,0 +1,189 @@
+'''
+Created on Oct 18, 2026
+
+Polls the supply voltage, invalid tag count and RF noise of every reader in the background and
+keeps a fixed size time series of them per reader:
+
+    poller = HealthPoller(nw,interval=60,budget=0.02)
+    poller.start()
+    ...
+    samples = poller.getSeries(1).getSamples() # HEALTH_DTYPE array, oldest first
+
+The poller only uses about budget of the bus time. It measures how long each reader's commands
+take and waits long enough afterwards to stay within the budget, and it sends them in the gaps
+between the packets of auto polling so tag traffic isn't held up.
+'''
+import logging
+import threading
+import time
+
+import numpy as np
+
+from rfid.decoder import PacketDecodedListener
+from rfid.metrics import getRegistry
+
+log = logging.getLogger(__name__)
+
+_voltage = getRegistry().gauge('rfid_reader_supply_volts','Last supply voltage of each reader','reader')
+_noise = getRegistry().gauge('rfid_reader_noise_rssi','Last RF white noise result of each reader','reader')
+_busTime = getRegistry().counter('rfid_health_bus_seconds_total','Time spent waiting on the replies to health commands')
+
+# A sample of a reader's health, the values a reader didn't reply with are NaN
+HEALTH_DTYPE = np.dtype([
+    ('time','<f8'),
+    ('voltage','<f4'), # Volts
+    ('invalidTags','<f4'), # Invalid tag messages since the last sample
+    ('noise','<f4'), # Last RF white noise result, as an RSSI value
+    ('rtt','<f4'), # Seconds from sending the commands until the last reply
+])
+
+class HealthSeries(object):
+    """ A ring buffer of the last size health samples of a reader """
+    def __init__(self,size=1440):
+        self._data = np.zeros(size,dtype=HEALTH_DTYPE)
+        self._next = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self,time,voltage=None,invalidTags=None,noise=None,rtt=None):
+        nan = float('nan')
+        self._data[self._next] = (time,
+                                  nan if voltage is None else voltage,
+                                  nan if invalidTags is None else invalidTags,
+                                  nan if noise is None else noise,
+                                  nan if rtt is None else rtt)
+        self._next = (self._next+1)%len(self._data)
+        self._count = min(self._count+1,len(self._data))
+
+    def getSamples(self):
+        """ Returns a copy of the samples, oldest first """
+        if self._count<len(self._data):
+            return self._data[:self._count].copy()
+        return np.concatenate((self._data[self._next:],self._data[:self._next]))
+
+    def getLast(self):
+        """ Returns the newest sample or None """
+        if not self._count:
+            return None
+        return self._data[self._next-1].copy()
+
+class HealthPoller(threading.Thread,PacketDecodedListener):
+    """ Polls the health of the network's readers (those found by the last rescan, unless a list of
+    readers is given) every interval seconds.
+
+    budget is the fraction of the bus time the poller may use. Before sending it waits until no
+    packet has been received for quietGap seconds, or for at most maxWait seconds when the bus is
+    never quiet. Each command waits up to timeout seconds for its reply. The version information
+    doesn't change so it is only asked for once per reader.
+    """
+    def __init__(self,network,interval=60,budget=0.05,quietGap=0.005,maxWait=0.5,timeout=0.5,size=1440,readers=None):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        assert 0<budget<=1,"budget must be in (0,1], given %s"%budget
+        self._network = network
+        self._interval = interval
+        self._budget = budget
+        self._quietGap = quietGap
+        self._maxWait = maxWait
+        self._timeout = timeout
+        self._size = size
+        self._readers = readers
+        self._series = {} # node id -> HealthSeries
+        self._versions = {} # node id -> version information dict
+        self._lastTraffic = 0
+        self._busTime = 0
+        self._started = None
+        self._stopped = threading.Event()
+        network.getDecoder().addPacketDecodedEventListener(self)
+
+    def packetReady(self, event):
+        self._lastTraffic = event.getTime()
+
+    def getReaders(self):
+        if self._readers is not None:
+            return self._readers
+        return self._network.getReaders()
+
+    def getSeries(self,nodeId):
+        """ Returns the HealthSeries of the reader, None if it wasn't polled yet """
+        return self._series.get(nodeId)
+
+    def getVersion(self,nodeId):
+        """ Returns the reader's version information (see Reader.getVersionInformation) """
+        return self._versions.get(nodeId)
+
+    def getBusTime(self):
+        """ Total seconds spent waiting on replies """
+        return self._busTime
+
+    def getBudgetUsed(self):
+        """ Fraction of the time since the poller started that was spent waiting on replies """
+        if self._started is None:
+            return 0
+        return self._busTime/max(time.time()-self._started,1e-9)
+
+    def _waitForQuiet(self):
+        """ Waits for a gap in the traffic of at least quietGap """
+        deadline = time.time()+self._maxWait
+        while not self._stopped.is_set():
+            now = time.time()
+            gap = now-self._lastTraffic
+            if gap>=self._quietGap or now>=deadline:
+                return
+            self._stopped.wait(min(self._quietGap-gap,deadline-now))
+
+    def pollReader(self,reader):
+        """ Sends the health commands to the reader at once and records their replies,
+        returns the seconds it took
+        """
+        kwargs = {'timeout':self._timeout,'wait':False}
+        nodeId = reader.getNodeId()
+        self._waitForQuiet()
+        sent = time.time()
+        futures = [reader.getSupplyVoltage(**kwargs),reader.getNumInvalidTags(**kwargs),reader.getRfWhiteNoiseResult(**kwargs)]
+        if nodeId not in self._versions:
+            futures.append(reader.getVersionInformation(**kwargs))
+        voltage,invalidTags,noise = [f.result() for f in futures[:3]]
+        if len(futures)>3 and futures[3].result() is not None:
+            self._versions[nodeId] = futures[3].result()
+        replied = [f.getTime() for f in futures if f.result() is not None]
+        rtt = replied and max(replied)-sent or None
+        busy = max(f.getTime() for f in futures)-sent
+
+        if voltage is not None:
+            voltage = voltage/10.0
+        if nodeId not in self._series:
+            self._series[nodeId] = HealthSeries(self._size)
+            _voltage.set(lambda s=self._series[nodeId]:s.getLast()['voltage'],nodeId)
+            _noise.set(lambda s=self._series[nodeId]:s.getLast()['noise'],nodeId)
+        self._series[nodeId].append(sent,voltage,invalidTags,noise,rtt)
+        if not replied:
+            log.warning("Reader %s didn't reply to the health commands",nodeId)
+        elif log.isEnabledFor(logging.DEBUG):
+            log.debug("Reader %s voltage=%s invalid tags=%s noise=%s rtt=%s",nodeId,voltage,invalidTags,noise,rtt)
+        self._busTime += busy
+        _busTime.inc(busy)
+        return busy
+
+    def run(self):
+        self._started = time.time()
+        while not self._stopped.is_set():
+            start = time.time()
+            for reader in list(self.getReaders()):
+                if self._stopped.is_set():
+                    break
+                busy = self.pollReader(reader)
+                # Stay idle long enough that the time spent on the bus is budget of the total
+                self._stopped.wait(busy*(1-self._budget)/self._budget)
+            self._stopped.wait(max(0,start+self._interval-time.time()))
+
+    def stop(self):
+        self._stopped.set()
+        if self.is_alive():
+            self.join()
+        self._network.getDecoder().removePacketDecodedEventListener(self)
+        for nodeId in self._series:
+            _voltage.remove(nodeId)
+            _noise.remove(nodeId)
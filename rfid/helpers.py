@@ -4,5 +4,27 @@ Created on Jan 27, 2013
 @author: jrm5555@psu.edu
 
 '''
+import time
 
-
+try:
+    monotonic = time.monotonic
+except AttributeError:
+    # Python 2 doesn't have a monotonic clock, use clock_gettime(CLOCK_MONOTONIC) where it's available
+    try:
+        import ctypes,ctypes.util
+        
+        class _timespec(ctypes.Structure):
+            _fields_ = [('tv_sec',ctypes.c_long),('tv_nsec',ctypes.c_long)]
+        
+        _librt = ctypes.CDLL(ctypes.util.find_library('rt') or ctypes.util.find_library('c'),use_errno=True)
+        _clock_gettime = _librt.clock_gettime
+        _clock_gettime.argtypes = [ctypes.c_int,ctypes.POINTER(_timespec)]
+        
+        def monotonic():
+            """ Seconds from an arbitrary start that never go backwards, for measuring time between events """
+            t = _timespec()
+            if _clock_gettime(1,ctypes.byref(t)) != 0: # 1 = CLOCK_MONOTONIC
+                raise OSError(ctypes.get_errno(),"clock_gettime failed")
+            return t.tv_sec+t.tv_nsec*1e-9
+    except (OSError,AttributeError,TypeError):
+        monotonic = time.time
@@ -0,0 +1,80 @@
+'''
+Created on Oct 18, 2026
+
+Every module logs to a logger under "rfid" (eg. "rfid.decoder", "rfid.tracker"). Nothing is
+shown until the application configures logging, the quickest way is:
+
+    from rfid.logs import setup
+    setup(logging.INFO)
+
+Messages are formatted only if their level is enabled, so DEBUG messages on the hot paths cost
+a level check when they're off. With queued=True the records are written by a worker thread so
+the I/O doesn't slow down the decoder or the tracker.
+'''
+import logging
+import sys
+import threading
+
+from rfid.dispatch import BoundedQueue,Overflow
+
+FORMAT = '[%(asctime)s.%(msecs)03d][%(name)s][%(levelname)s] %(message)s'
+DATE_FORMAT = '%H:%M:%S'
+
+class QueueHandler(logging.Handler):
+    """ Queues the records for a worker thread that passes them on to handler.
+
+    The message is formatted on the thread that logged it (so the record doesn't hold on to
+    arguments that may change) but the handler's I/O happens on the worker. When more than
+    maxsize records are waiting, overflow decides if the logging thread waits or records are
+    dropped, see Overflow.
+    """
+    def __init__(self,handler,maxsize=10000,overflow=Overflow.DROP_NEWEST):
+        logging.Handler.__init__(self)
+        self._handler = handler
+        self.queue = BoundedQueue(maxsize,overflow)
+        self._worker = threading.Thread(target=self._run,name="QueueHandler")
+        self._worker.daemon = True
+        self._worker.start()
+
+    def getDroppedCount(self):
+        return self.queue.getDroppedCount()
+
+    def emit(self,record):
+        try:
+            record.msg = record.getMessage()
+            record.args = None
+            if record.exc_info:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+                record.exc_info = None
+            self.queue.put(record)
+        except:
+            self.handleError(record)
+
+    def _run(self):
+        while True:
+            record = self.queue.get()
+            if record == 'shutdown':
+                return
+            self._handler.handle(record)
+
+    def close(self):
+        """ Writes everything queued, stops the worker and closes the handler """
+        if self._worker.is_alive():
+            self.queue.put('shutdown',force=True)
+            self._worker.join()
+        self._handler.close()
+        logging.Handler.close(self)
+
+def setup(level=logging.INFO,stream=None,queued=True):
+    """ Shows the rfid messages of at least the given level on stream (stdout by default),
+    written from a worker thread if queued is True. Returns the handler that was added to the
+    "rfid" logger, remove and close it to undo this.
+    """
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(logging.Formatter(FORMAT,DATE_FORMAT))
+    if queued:
+        handler = QueueHandler(handler)
+    logger = logging.getLogger('rfid')
+    logger.setLevel(level)
+    logger.addHandler(handler)
+    return handler
@@ -0,0 +1,288 @@
+'''
+Created on Oct 18, 2026
+
+Counters, gauges and latency histograms for every stage of the pipeline (serial port, decoder,
+replies and tracker). Read them with getRegistry().snapshot() or export them in the Prometheus
+text format with writeFile or a MetricsServer:
+
+    server = MetricsServer(port=9100)
+    server.start() # curl http://localhost:9100/metrics
+
+A metric can have one label, eg. frames decoded per command. Counters and histograms can be
+updated from any thread (eg. the decoders of a NetworkPool's ports), each one has a lock.
+'''
+import BaseHTTPServer
+import bisect
+import os
+import threading
+import weakref
+
+# Latency buckets in seconds, from 100 us to 10 s
+DEFAULT_BUCKETS = (0.0001,0.00025,0.0005,0.001,0.0025,0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10)
+
+def _labels(metric,label,extra=''):
+    parts = []
+    if label is not None:
+        parts.append('%s="%s"'%(metric.label,label))
+    if extra:
+        parts.append(extra)
+    return parts and '{%s}'%','.join(parts) or ''
+
+class Counter(object):
+    """ A count that only goes up, per label value if the counter has a label """
+    kind = 'counter'
+
+    def __init__(self,name,help,label=None):
+        self.name = name
+        self.help = help
+        self.label = label
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self,amount=1,label=None):
+        with self._lock:
+            self._values[label] = self._values.get(label,0)+amount
+
+    def get(self,label=None):
+        return self._values.get(label,0)
+
+    def snapshot(self):
+        if self.label is None:
+            return self.get()
+        with self._lock:
+            return dict(self._values)
+
+    def samples(self):
+        """ Yields (name,labels,value) for the Prometheus export """
+        with self._lock:
+            values = sorted(self._values.items())
+        for label,value in values:
+            yield self.name,_labels(self,label),value
+
+class _FunctionMetric(object):
+    """ A value that is read when the metrics are collected, from a function per label """
+
+    def __init__(self,name,help,label=None):
+        self.name = name
+        self.help = help
+        self.label = label
+        self._functions = {} # label -> (weakref to the method's object or None,function)
+        self._lock = threading.Lock()
+
+    def set(self,function,label=None):
+        """ function() returns the current value. The object of a bound method is only held
+        through a weakref, so an object that is never stopped isn't kept alive by the registry
+        and its value goes away with it.
+        """
+        obj = getattr(function,'im_self',None)
+        entry = (None,function) if obj is None else (weakref.ref(obj),function.im_func)
+        with self._lock:
+            self._functions[label] = entry
+
+    def remove(self,label=None):
+        with self._lock:
+            self._functions.pop(label,None)
+
+    def _read(self,labels=None):
+        """ Returns [(label,value)] sorted by label, forgetting the methods whose object is gone """
+        with self._lock:
+            items = sorted(self._functions.items())
+        values = []
+        for label,entry in items:
+            if labels is not None and label not in labels:
+                continue
+            ref,function = entry
+            if ref is None:
+                values.append((label,function()))
+                continue
+            obj = ref()
+            if obj is None:
+                with self._lock:
+                    if self._functions.get(label) is entry:
+                        del self._functions[label]
+                continue
+            values.append((label,function(obj)))
+        return values
+
+    def get(self,label=None):
+        values = self._read((label,))
+        return values and values[0][1] or 0
+
+    def snapshot(self):
+        if self.label is None:
+            return self.get()
+        return dict(self._read())
+
+    def samples(self):
+        for label,value in self._read():
+            yield self.name,_labels(self,label),value
+
+class Gauge(_FunctionMetric):
+    """ A value that is read when the metrics are collected, from a function (eg. a queue's depth) """
+    kind = 'gauge'
+
+class CallbackCounter(_FunctionMetric):
+    """ A count that only goes up but is kept somewhere else (eg. the items a queue dropped), it's
+    read from a function when the metrics are collected and exported as a counter
+    """
+    kind = 'counter'
+
+class Histogram(object):
+    """ Counts observations (eg. latencies in seconds) in cumulative buckets """
+    kind = 'histogram'
+
+    def __init__(self,name,help,label=None,buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.buckets = tuple(sorted(buckets))
+        self._values = {} # label -> [count per bucket...,count above the last bucket,sum]
+        self._lock = threading.Lock()
+
+    def observe(self,value,label=None):
+        i = bisect.bisect_left(self.buckets,value)
+        with self._lock:
+            values = self._values.get(label)
+            if values is None:
+                values = self._values[label] = [0]*(len(self.buckets)+2)
+            values[i] += 1
+            values[-1] += value
+
+    def getCount(self,label=None):
+        values = self._values.get(label)
+        return values and sum(values[:-1]) or 0
+
+    def getSum(self,label=None):
+        values = self._values.get(label)
+        return values and values[-1] or 0
+
+    def getPercentile(self,p,label=None):
+        """ Returns the upper bound of the bucket holding the p (0-1) percentile, None if there are no
+        observations and inf if it's above the last bucket
+        """
+        values = self._values.get(label)
+        if not values:
+            return None
+        target = p*sum(values[:-1])
+        total = 0
+        for bound,count in zip(self.buckets+(float('inf'),),values[:-1]):
+            total += count
+            if total>=target and count:
+                return bound
+        return float('inf')
+
+    def snapshot(self):
+        snap = lambda label:{'count':self.getCount(label),'sum':self.getSum(label),
+                             'p50':self.getPercentile(0.5,label),'p99':self.getPercentile(0.99,label)}
+        if self.label is None:
+            return snap(None)
+        with self._lock:
+            labels = list(self._values)
+        return dict((label,snap(label)) for label in labels)
+
+    def samples(self):
+        with self._lock:
+            items = sorted((label,list(values)) for label,values in self._values.items())
+        for label,values in items:
+            total = 0
+            for bound,count in zip(self.buckets,values):
+                total += count
+                yield self.name+'_bucket',_labels(self,label,'le="%s"'%repr(float(bound))),total
+            yield self.name+'_bucket',_labels(self,label,'le="+Inf"'),total+values[-2]
+            yield self.name+'_sum',_labels(self,label),values[-1]
+            yield self.name+'_count',_labels(self,label),total+values[-2]
+
+class Registry(object):
+    """ Holds the metrics by name. The counter, gauge, callbackCounter and histogram methods return
+    the existing metric with the name or create it.
+    """
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self,cls,name,*args,**kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name,*args,**kwargs)
+            assert isinstance(metric,cls),"%s is a %s"%(name,metric.kind)
+            return metric
+
+    def counter(self,name,help,label=None):
+        return self._get(Counter,name,help,label)
+
+    def gauge(self,name,help,label=None):
+        return self._get(Gauge,name,help,label)
+
+    def callbackCounter(self,name,help,label=None):
+        return self._get(CallbackCounter,name,help,label)
+
+    def histogram(self,name,help,label=None,buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram,name,help,label,buckets)
+
+    def get(self,name):
+        return self._metrics.get(name)
+
+    def snapshot(self):
+        """ Returns a dict of every metric's current value(s) """
+        return dict((name,metric.snapshot()) for name,metric in self._metrics.items())
+
+    def toPrometheus(self):
+        """ Returns the metrics in the Prometheus text exposition format """
+        lines = []
+        for name,metric in sorted(self._metrics.items()):
+            lines.append('# HELP %s %s'%(name,metric.help))
+            lines.append('# TYPE %s %s'%(name,metric.kind))
+            for sample,labels,value in metric.samples():
+                lines.append('%s%s %s'%(sample,labels,repr(float(value))))
+        return '\n'.join(lines)+'\n'
+
+_registry = Registry()
+
+def getRegistry():
+    """ The registry the rfid modules report to """
+    return _registry
+
+def writeFile(path,registry=None):
+    """ Writes the metrics in the Prometheus text format to path (eg. for the node exporter's
+    textfile collector). The file is replaced in one step so it's never read half written.
+    """
+    registry = registry or _registry
+    tmp = path+'.tmp'
+    with open(tmp,'w') as f:
+        f.write(registry.toPrometheus())
+    os.rename(tmp,path)
+
+class _MetricsHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/','/metrics'):
+            self.send_error(404)
+            return
+        body = self.server.registry.toPrometheus()
+        self.send_response(200)
+        self.send_header('Content-Type','text/plain; version=0.0.4')
+        self.send_header('Content-Length',str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self,format,*args):
+        pass
+
+class MetricsServer(threading.Thread):
+    """ Serves the metrics at http://host:port/metrics. Use port 0 to pick a free port (see getPort) """
+    def __init__(self,port=9100,host='127.0.0.1',registry=None):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self._server = BaseHTTPServer.HTTPServer((host,port),_MetricsHandler)
+        self._server.registry = registry or _registry
+
+    def getPort(self):
+        return self._server.server_address[1]
+
+    def run(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self.join()
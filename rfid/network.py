@@ -4,11 +4,19 @@ Created on Jan 26, 2013
 @author: jrm5555@psu.edu & bdf5047@psu.edu
 '''
 #!/usr/bin/env python
+import logging
 import time
+from collections import deque
 from datetime import datetime
 from rfid.serial_port_monitor import SerialPortMonitor,SerialPortListener
 from rfid.reader import Reader
-from rfid.decoder import Decoder,Packet,WaitForReplyListener,PacketDecodedListener
+from rfid.decoder import Decoder,Packet,PacketDecodedListener
+from rfid.reply import ReplyDispatcher
+from rfid.dispatch import QueuedListener,Overflow
+from rfid.commands import COMMANDS
+from rfid.writer import SerialWriter
+
+log = logging.getLogger(__name__)
 
 class Logger(PacketDecodedListener,SerialPortListener):
     def dataReceived(self, event):
@@ -25,14 +33,38 @@ class Network():
     _monitor = None
     _decoder = None
     _logger = None
+    _replies = None
+    _scanResults = {}
     
     def __init__(self,networkId,logger=Logger(),*params,**kwargs):
+        """ The params and kwargs are passed to the SerialPortMonitor. If the inlineDecoding
+        kwarg is True packets are decoded on the monitor's thread instead of the decoder's.
+        
+        The logger gets its events through a QueuedListener so printing can't slow down decoding, 
+        the loggerQueueSize kwarg sets how many events it can fall behind before the oldest are 
+        dropped (None calls the logger directly).
+        
+        The decoderQueueSize and decoderOverflow kwargs bound the decoder's queue, see Decoder.
+        
+        Everything is written by a SerialWriter, the frameGap kwarg is the least time in seconds 
+        between frames (default 2 ms) for the readers to turn the RS-485 bus around.
+        """
         self.setId(networkId)
+        inline = kwargs.pop('inlineDecoding',False)
+        loggerQueueSize = kwargs.pop('loggerQueueSize',1000)
+        decoderQueueSize = kwargs.pop('decoderQueueSize',1000)
+        decoderOverflow = kwargs.pop('decoderOverflow',Overflow.BLOCK)
+        frameGap = kwargs.pop('frameGap',0.002)
         self._monitor = SerialPortMonitor(*params,**kwargs)
-        self._decoder = Decoder()
+        self._writer = SerialWriter(self._monitor.getConnection(),gap=frameGap)
+        self._decoder = Decoder(inline=inline,maxsize=decoderQueueSize,overflow=decoderOverflow)
+        self._replies = ReplyDispatcher()
+        self._decoder.addPacketDecodedEventListener(self._replies)
         
         # Start the logger
         self._logger = logger
+        if loggerQueueSize and isinstance(logger,(SerialPortListener,PacketDecodedListener)):
+            self._logger = QueuedListener(logger,maxsize=loggerQueueSize)
         if isinstance(logger,SerialPortListener):
             self.getMonitor().addSerialEventListener(self._logger)
         if isinstance(logger,PacketDecodedListener):
@@ -41,7 +73,9 @@ class Network():
        # Start monitoring 
         self.getMonitor().addSerialEventListener(self._decoder)
         self.getMonitor().start()
-        self.getDecoder().start()
+        self._writer.start()
+        if not self.getDecoder().isInline():
+            self.getDecoder().start()
         
         
         
@@ -54,27 +88,83 @@ class Network():
     def getId(self):
         return self.networkId
     
-    def rescan(self):
-        """Rescan the network for readers """
-        print "Pinging readers..."
+    def rescan(self,window=8,timeout=0.1,nodeIds=range(1,254),stopAtGap=False):
+        """Rescan the network for readers 
+        
+        Keeps up to window pings in flight at once instead of pinging one node at a time. The ping 
+        timeout starts at timeout and then follows the measured reply times (the same way TCP sets 
+        its retransmit timeout), and the pings are spaced so about one reply comes back per ping sent.
+        The timeout never drops below the time window pings and their replies take on the wire at the
+        current baud rate, since that many can be ahead of a reply on a slow bus.
+        Every node in nodeIds is pinged unless stopAtGap is True, then the scan stops at the first 
+        node that doesn't reply and the replies of the nodes after it are ignored.
+        
+        Returns a dict of node id to the ping error code of every node that replied, see Packet.PING_ERROR_MAP. 
+        """
+        log.info("Pinging readers...")
         self.breakAutoPolling()
         self._readers = []
-        for i in range(1,254):
-            rspPkt = self.pingReader(i,timeout=0.1)
-            time.sleep(0.5)
-            if rspPkt is not None:
-                if rspPkt.getData()[0] == 0x00: # No errors encountered
-                    self._readers.append(Reader(network=self,id=rspPkt.getReaderId()))
-                    print "Found reader at node %s"%i
-                else:
-                    try:
-                        erNo = Packet.PING_ERROR_MAP[rspPkt.getData()[0]]
-                    except:
-                        erNo = "Unknown"
-                    print "Reader %s returned %s-%s"%(rspPkt.getReaderId(),rspPkt.getData()[0],erNo)
+        self._scanResults = {}
+        nodes = iter(nodeIds)
+        pending = deque() # (nodeId,time sent,future) in the order they were sent
+        srtt,rttvar = None,None
+        # A ping is 7 bytes and its reply 8, each byte is 10 bits on the wire
+        floor = max(0.01,window*(7+8)*10.0/self.getBaudRate())
+        rto = max(floor,timeout)
+        gap = 0
+        lastSent = 0
+        scanning = True
+        while True:
+            while scanning and len(pending)<window:
+                try:
+                    i = next(nodes)
+                except StopIteration:
+                    scanning = False
+                    break
+                wait = lastSent+gap-time.time()
+                if wait>0:
+                    time.sleep(wait)
+                lastSent = time.time()
+                pending.append((i,lastSent,self.pingReader(i,timeout=rto,wait=False)))
+            if not pending:
+                break
+            
+            i,sent,future = pending.popleft()
+            rspPkt = future.result()
+            if rspPkt is None:
+                if stopAtGap:
+                    # The pings still in flight were sent to the nodes after the gap
+                    scanning = False
+                    pending.clear()
+                continue
+            
+            # Adapt the timeout and spacing to how fast the readers reply
+            rtt = future.getTime()-sent
+            if srtt is None:
+                srtt,rttvar = rtt,rtt/2
             else:
-                break 
-        print "Found %s readers."%len(self._readers)
+                rttvar = 0.75*rttvar+0.25*abs(srtt-rtt)
+                srtt = 0.875*srtt+0.125*rtt
+            rto = max(floor,min(timeout,srtt+4*rttvar))
+            gap = srtt/window
+            
+            self._scanResults[i] = rspPkt.getData()[0]
+            if rspPkt.getData()[0] == 0x00: # No errors encountered
+                self._readers.append(Reader(network=self,id=rspPkt.getNodeId()))
+                log.info("Found reader at node %s",i)
+            else:
+                try:
+                    erNo = Packet.PING_ERROR_MAP[rspPkt.getData()[0]]
+                except:
+                    erNo = "Unknown"
+                log.warning("Reader %s returned %s-%s",rspPkt.getReaderId(),rspPkt.getData()[0],erNo)
+        self._readers.sort(key=lambda r:r.getNodeId())
+        log.info("Found %s readers.",len(self._readers))
+        return self._scanResults
+    
+    def getScanResults(self):
+        """ Returns the ping error code of every node that replied to the last rescan """
+        return self._scanResults
             
     def getMonitor(self):
         return self._monitor
@@ -90,21 +180,30 @@ class Network():
     def getConnection(self):
         return self.getMonitor().getConnection()
     
-    def send(self,data):
-        """ Sends a packet and doesn't wait for any response """
+    def getWriter(self):
+        return self._writer
+    
+    def send(self,data,priority=None,callback=None):
+        """ Queues a packet to be sent and doesn't wait for any response, see SerialWriter.write """
         #print "Sent %s"%(str(data).encode('hex'))
-        return self.getConnection().write(data)
+        self._writer.write(data,priority,callback)
     
-    def ask(self,packet,replyCmd=None,timeout=1):
-        """ Sends the packet and listens for a response"""
+    def ask(self,packet,replyCmd=None,timeout=1,wait=True,priority=None):
+        """ Sends the packet and listens for a response
+        
+        Returns the reply Packet or None if there was no reply within the timeout. If wait is False 
+        this returns a ReplyFuture right after sending so many commands can be in flight at once.
+        """
         if (replyCmd is None): replyCmd = packet.getCommand()
-        l = WaitForReplyListener(replyCmd,timeout)
-        self._decoder.addPacketDecodedEventListener(l)
-        l.start()
-        self.send(packet)
-        l.join()
-        self._decoder.removePacketDecodedEventListener(l)
-        return l.reply
+        nodeId = packet.getNodeId()
+        if nodeId in (0x00,0xFF): 
+            nodeId = None # Addressed by reader id or broadcast, the reply can come from any node
+        # The timeout starts once the packet was written, not while it waits behind others
+        future = self._replies.expect(packet.getNetworkId(),nodeId,replyCmd,timeout,started=False)
+        self.send(packet,priority,lambda:self._replies.startTimeout(future))
+        if not wait:
+            return future
+        return future.result()
     
     def reset(self,**kwargs):
         """Reset the entire reader network
@@ -114,7 +213,8 @@ class Network():
         non-queried tag transmissions received by the reader (and still in memory) will be lost.
         """
         self.breakAutoPolling()
-        return self.ask(Packet([0xAA,0x00,self.getId(),0x00,0xFF,0x00]),timeout=30)
+        kwargs.setdefault('timeout',30)
+        return self.ask(COMMANDS[0x00].encode(self.getId(),0x00,0xFF),**kwargs)
         
     def pingReader(self,nodeId=None,readerId=None,**kwargs):
         """ Interrogate a single reader on a reader network 
@@ -122,17 +222,19 @@ class Network():
         This command can be used to test if a specific reader, within the reader network, is still active and responding.
         """
         if nodeId is not None:
-            return self.ask(Packet([0xAA,0x00,self.getId(),0x00,nodeId,0x03]),**kwargs)
+            return self.ask(COMMANDS[0x03].encode(self.getId(),0x00,nodeId),**kwargs)
         elif readerId is not None:
-            return self.ask(Packet([0xAA,0x00,self.getId(),readerId,0x00,0x03]),**kwargs)
+            return self.ask(COMMANDS[0x03].encode(self.getId(),readerId,0x00),**kwargs)
         
     def breakAutoPolling(self):
         """ 
         Breaking the polling sequence does not alter the Auto Polling Flag in the Data EEPROM, but
         only suspends polling. After a physical reset, this system will start polling again unless the auto
         polling is disabled with the appropriate command.
+        
+        The burst isn't sent again if one is already waiting to be sent or nothing was sent since the last one.
         """
-        return self.send(bytearray(400*[0xFF,'*']))
+        return self._writer.writeBreak()
     
     def startAutoPolling(self,**kwargs):
         """ Select the Automatic polling mode
@@ -145,7 +247,7 @@ class Network():
         This only works for nodeID 1, so it is a network method.
         """
         
-        return self.ask(Packet([0xAA,0x00,self.getId(),0x00,0x01,0x01]),**kwargs)
+        return self.ask(COMMANDS[0x01].encode(self.getId(),0x00,0x01),**kwargs)
         
     
     def stopAutoPolling(self,**kwargs):
@@ -156,10 +258,76 @@ class Network():
         advantage of giving the controller (PC) total control over the network traffic.
         """
         self.breakAutoPolling()
-        return self.ask(Packet([0xAA,0x00,self.getId(),0x00,0x01,0x02]),**kwargs)
+        return self.ask(COMMANDS[0x02].encode(self.getId(),0x00,0x01),**kwargs)
+    
+    def getBaudRate(self):
+        return self.getMonitor().getBaudRate()
+    
+    def setBaudRate(self,baudrate,at=None,settle=0.05):
+        """ Broadcasts the Set Baud Rate command and switches the port to the new rate
+        
+        The readers switch without a reply that can be relied on, so the command is only sent. It's 
+        sent at each of the rates in at (just the current rate by default) so readers that were
+        left on another rate get it too, waiting settle seconds after each one. 
+        """
+        assert baudrate in Packet.BAUDRATE_CODES, "baudrate must be in %s, got %s"%(Packet.BAUDRATE_CODES.keys(), baudrate)
+        monitor = self.getMonitor()
+        self.breakAutoPolling()
+        for rate in at or [monitor.getBaudRate()]:
+            if rate != monitor.getBaudRate():
+                self._writer.flush()
+                monitor.setBaudRate(rate)
+            self.send(COMMANDS[0xFE].encode(self.getId(),0x00,0xFF,Packet.BAUDRATE_CODES[baudrate]))
+            self._writer.flush()
+            time.sleep(settle)
+        monitor.setBaudRate(baudrate)
+        time.sleep(settle)
+    
+    def _findLostReaders(self,readers,timeout,attempts):
+        """ Pings the readers, returns the node ids of the ones that didn't reply """
+        lost = [r.getNodeId() for r in readers]
+        for i in range(attempts):
+            futures = [(nodeId,self.pingReader(nodeId,timeout=timeout,wait=False)) for nodeId in lost]
+            lost = [nodeId for nodeId,future in futures if future.result() is None]
+            if not lost:
+                break
+        return lost
+    
+    def negotiateBaudRate(self,baudrates=None,timeout=0.2,attempts=2,settle=0.05):
+        """ Moves the network to the fastest baud rate every reader works at
+        
+        Starting with the fastest of baudrates (Packet.BAUDRATES by default) that is faster than the 
+        current rate, the rate is broadcast, the port switched and every reader pinged (attempts times, 
+        waiting up to timeout for each reply). If any reader is lost the next slower rate is tried, 
+        broadcast at every rate tried so far so the readers that switched and the ones that didn't
+        both get it, down to the rate the network started at. 
+        
+        The readers are the ones found by the last rescan (a rescan is done if there weren't any).
+        Returns the baud rate the network ended up at.
+        """
+        readers = self.getReaders() or self.getReaders(rescan=True)
+        original = self.getBaudRate()
+        rates = sorted([r for r in (baudrates or Packet.BAUDRATES.values()) if r>original],reverse=True)
+        used = [original]
+        for rate in rates+[original]:
+            if rate==original and len(used)==1:
+                break # Never left the original rate
+            self.setBaudRate(rate,at=used,settle=settle)
+            if rate not in used:
+                used.append(rate)
+            lost = self._findLostReaders(readers,timeout,attempts)
+            if not lost:
+                log.info("Network %s is running at %s baud",self.getId(),rate)
+                return rate
+            log.warning("Readers %s didn't reply at %s baud",lost,rate)
+        log.warning("Network %s stayed at %s baud",self.getId(),original)
+        return original
     
     def stop(self):
+        self._writer.stop()
         self.getMonitor().stop()
         self._decoder.stop()
+        if isinstance(self._logger,QueuedListener):
+            self._logger.stop()
     
 
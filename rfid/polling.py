@@ -0,0 +1,148 @@
+'''
+Created on Oct 18, 2026
+
+Fetches the tags from the readers' tag tables in manual polling mode. Get Tag Packet commands
+go to several readers at once instead of one round trip at a time, and each reader is polled
+as often as it has tags to give:
+
+    nw.stopAutoPolling()
+    scheduler = PollingScheduler(nw)
+    scheduler.start()
+
+The replies are tag packets like the ones of auto polling, so the Decoder's listeners (eg. a
+Tracker) get them as usual.
+'''
+import heapq
+import itertools
+import logging
+import threading
+import time
+import Queue
+
+from rfid.metrics import getRegistry
+
+log = logging.getLogger(__name__)
+
+_polls = getRegistry().counter('rfid_polls_total','Get Tag Packet commands sent by the polling scheduler by result','result')
+
+class ReaderPollState(object):
+    """ How often a reader is polled and what it returned """
+    def __init__(self,reader,interval):
+        self.reader = reader
+        self.interval = interval # Seconds to wait after a reply before polling again
+        self.due = 0 # When to poll next
+        self.polls = 0
+        self.tags = 0
+        self.empty = 0
+        self.timeouts = 0
+        self.rate = 0.0 # Smoothed tags per second
+        self.last = None # When the last reply came
+
+    def getNodeId(self):
+        return self.reader.getNodeId()
+
+    def __repr__(self):
+        return "ReaderPollState(node=%s,interval=%.3f,polls=%s,tags=%s,rate=%.1f)"%(
+            self.getNodeId(),self.interval,self.polls,self.tags,self.rate)
+
+class PollingScheduler(threading.Thread):
+    """ Polls the tag tables of the network's readers (those found by the last rescan, unless a list
+    of readers is given) with up to window Get Tag Packet commands in flight, one per reader.
+
+    A reader that returned a tag is polled again after minInterval since its table probably has
+    more. Every "Tag Table underflow" reply or timeout doubles the reader's interval up to
+    maxInterval, so idle readers hardly use the bus and busy ones get most of it. Each command
+    waits up to timeout seconds for its reply.
+    """
+    def __init__(self,network,readers=None,window=8,timeout=0.2,minInterval=0,maxInterval=1.0,backoff=2):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        assert backoff>1,"backoff must be > 1, given %s"%backoff
+        self._network = network
+        self._readers = readers
+        self._window = window
+        self._timeout = timeout
+        self._minInterval = minInterval
+        self._maxInterval = maxInterval
+        self._backoff = backoff
+        self._states = {} # node id -> ReaderPollState
+        self._replies = Queue.Queue() # (state,future) of the commands that got a reply or timed out
+        self._running = False
+
+    def getState(self,nodeId):
+        return self._states.get(nodeId)
+
+    def getStates(self):
+        return self._states.values()
+
+    def getStats(self):
+        """ Returns the totals of every reader's ReaderPollState """
+        states = self._states.values()
+        return dict((name,sum(getattr(s,name) for s in states)) for name in ('polls','tags','empty','timeouts'))
+
+    def _poll(self,state):
+        state.polls += 1
+        future = state.reader.getTagPacket(timeout=self._timeout,wait=False)
+        future.addDoneCallback(lambda f:self._replies.put((state,f)))
+
+    def _replied(self,state,future):
+        """ Adapts the reader's interval to the reply """
+        reply = future.result()
+        now = time.time()
+        if reply is not None and reply.isTagPacket():
+            state.tags += 1
+            state.interval = self._minInterval
+            result = 'tag'
+        else:
+            if reply is None:
+                state.timeouts += 1
+                result = 'timeout'
+            else:
+                state.empty += 1 # Tag Table underflow error
+                result = 'empty'
+            state.interval = min(self._maxInterval,max(state.interval,0.001)*self._backoff)
+        _polls.inc(label=result)
+        elapsed = now-state.last if state.last else 0
+        if elapsed>0:
+            # Smoothed over about a second
+            weight = min(1.0,elapsed)
+            state.rate = (1-weight)*state.rate+weight*(result=='tag' and 1 or 0)/elapsed
+        state.last = now
+        state.due = now+state.interval
+
+    def run(self):
+        readers = self._readers if self._readers is not None else self._network.getReaders()
+        order = itertools.count()
+        due = [] # (time,order,state) of the readers without a command in flight
+        for reader in readers:
+            state = self._states[reader.getNodeId()] = ReaderPollState(reader,self._minInterval)
+            heapq.heappush(due,(0,next(order),state))
+        inflight = 0
+        self._running = True
+        log.info("Polling %s readers",len(self._states))
+        while self._running:
+            now = time.time()
+            while inflight<self._window and due and due[0][0]<=now:
+                t,i,state = heapq.heappop(due)
+                self._poll(state)
+                inflight += 1
+            wait = 0.1 # Wake up now and then to check if stopped
+            if due and inflight<self._window:
+                wait = min(wait,max(0,due[0][0]-now))
+            try:
+                item = self._replies.get(timeout=wait)
+            except Queue.Empty:
+                continue
+            if item == 'shutdown':
+                break
+            state,future = item
+            inflight -= 1
+            self._replied(state,future)
+            heapq.heappush(due,(state.due,next(order),state))
+        log.info("Stopped polling %s",self.getStats())
+
+    def stop(self):
+        self._running = False
+        self._replies.put('shutdown')
+        if self.is_alive():
+            self.join()
@@ -0,0 +1,198 @@
+'''
+Created on Oct 18, 2026
+
+Runs several reader networks (eg. RS-485 segments on separate USB-serial ports) at once and
+merges their packets into one stream ordered by arrival time, so a single Tracker can use the
+readers of every port:
+
+    pool = NetworkPool(['/dev/ttyUSB0','/dev/ttyUSB1'],baudrate=115200)
+    tracker = Tracker(pool,readers=...)
+
+Node ids are only unique on one port, so the events of the merged stream return (port,node id)
+from getReaderKey(). The Tracker's readers are looked up by that key, so give it a layout with
+keys like ('/dev/ttyUSB1',2) when tracking with a pool:
+
+    tracker = Tracker(pool,readers={('/dev/ttyUSB0',1):((9,11,7.5),993680),
+                                    ('/dev/ttyUSB1',1):((9,19,7.5),994031)})
+'''
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+from rfid.decoder import PacketDecodedListener
+from rfid.network import Network
+
+log = logging.getLogger(__name__)
+
+class PoolEvent(object):
+    """ A PacketDecodedEvent from one of the pool's ports """
+    def __init__(self,event,port):
+        self._event = event
+        self._port = port
+
+    def getPacket(self):
+        return self._event.getPacket()
+
+    def getTagReading(self):
+        return self._event.getTagReading()
+
+    def getTime(self):
+        return self._event.getTime()
+
+    def getPort(self):
+        return self._port
+
+    def getReaderKey(self):
+        """ The reader that sent the packet, unique across the pool's ports """
+        return (self._port,self._event.getNodeId())
+
+    def isLastInGroup(self):
+        return self._event.isLastInGroup()
+
+    def keep(self):
+        return self # Made from a kept event
+
+class ReorderBuffer(threading.Thread):
+    """ Holds items for window seconds after their timestamp and then releases them in timestamp
+    order to callback(item) on this thread. If more than maxsize items are held the oldest is
+    released early. An item that arrives after a later one was already released is released
+    right away and counted as late.
+    """
+    def __init__(self,callback,window=0.05,maxsize=10000):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self._callback = callback
+        self._window = window
+        self._maxsize = maxsize
+        self._heap = [] # (timestamp,sequence,item)
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._running = True
+        self._released = 0 # Timestamp of the last item released
+        self._late = 0
+
+    def getPendingCount(self):
+        return len(self._heap)
+
+    def getLateCount(self):
+        return self._late
+
+    def put(self,timestamp,item):
+        with self._condition:
+            heapq.heappush(self._heap,(timestamp,next(self._sequence),item))
+            self._condition.notify()
+
+    def run(self):
+        while True:
+            with self._condition:
+                while True:
+                    if self._heap:
+                        wait = self._heap[0][0]+self._window-time.time()
+                        if wait<=0 or len(self._heap)>self._maxsize or not self._running:
+                            break
+                    elif not self._running:
+                        return
+                    else:
+                        wait = None
+                    self._condition.wait(wait)
+                timestamp,i,item = heapq.heappop(self._heap)
+            if timestamp<self._released:
+                self._late += 1
+            else:
+                self._released = timestamp
+            try:
+                self._callback(item)
+            except:
+                log.exception("Failed to release %s",item)
+
+    def stop(self):
+        """ Releases everything held and stops """
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        self.join()
+
+class _PortListener(PacketDecodedListener):
+    def __init__(self,pool,port):
+        self._pool = pool
+        self._port = port
+
+    def packetReady(self, event):
+        # The time is when the monitor read the data, not when the decoder thread got to it
+        self._pool._buffer.put(event.getTime(),PoolEvent(event.keep(),self._port))
+
+class NetworkPool(object):
+    """ A Network on each of the ports, each with its own monitor and decoder thread.
+
+    Listeners added with addPacketDecodedEventListener get the PoolEvents of every port merged
+    in arrival order, delayed by up to reorderWindow seconds so packets decoded on different
+    threads can be put back in order. The pool stands in for a Network when given to a Tracker.
+    The kwargs are passed to every Network (eg. baudrate).
+    """
+    def __init__(self,ports,networkId=0,reorderWindow=0.05,maxPending=10000,**kwargs):
+        self.networkId = networkId
+        self._listeners = []
+        self._buffer = ReorderBuffer(self._fireEvent,reorderWindow,maxPending)
+        self._buffer.start()
+        self._networks = {}
+        for port in ports:
+            nw = Network(networkId,None,port=port,**kwargs)
+            nw.getDecoder().addPacketDecodedEventListener(_PortListener(self,port))
+            self._networks[port] = nw
+
+    def getId(self):
+        return self.networkId
+
+    def getNetworks(self):
+        """ Returns a dict of port -> Network """
+        return self._networks
+
+    def getNetwork(self,port):
+        return self._networks[port]
+
+    def getDecoder(self):
+        """ The pool fires the merged events itself, so Tracker(pool) listens to them """
+        return self
+
+    def getPendingCount(self):
+        """ Number of events held in the reorder buffer """
+        return self._buffer.getPendingCount()
+
+    def getLateCount(self):
+        """ Number of events that arrived too late to be put in order """
+        return self._buffer.getLateCount()
+
+    def addPacketDecodedEventListener(self, listener):
+        self._listeners.append( listener )
+
+    def removePacketDecodedEventListener(self, listener):
+        self._listeners.remove( listener )
+
+    def _fireEvent(self, event):
+        for listener in self._listeners:
+            listener.packetReady(event)
+
+    def rescan(self,**kwargs):
+        """ Rescans every port, returns a dict of port -> Network.rescan results """
+        return dict((port,nw.rescan(**kwargs)) for port,nw in self._networks.items())
+
+    def getReaders(self):
+        """ Returns a dict of (port,node id) -> Reader for the readers found by the last rescans """
+        readers = {}
+        for port,nw in self._networks.items():
+            for reader in nw.getReaders():
+                readers[(port,reader.getNodeId())] = reader
+        return readers
+
+    def startAutoPolling(self,**kwargs):
+        return dict((port,nw.startAutoPolling(**kwargs)) for port,nw in self._networks.items())
+
+    def stopAutoPolling(self,**kwargs):
+        return dict((port,nw.stopAutoPolling(**kwargs)) for port,nw in self._networks.items())
+
+    def stop(self):
+        for nw in self._networks.values():
+            nw.stop()
+        self._buffer.stop()
@@ -0,0 +1,199 @@
+'''
+Created on Oct 18, 2026
+
+Configures many readers at once. The current settings of every reader are read back first
+and only the ones that differ are set, with up to window commands in flight on the network
+at a time instead of waiting on each reader in turn:
+
+    config = ReaderConfig(rssi=0x40,siteCode=(1,2,3),gain=GainMode.HIGH)
+    results = provision(nw.getReaders(),config)
+    failed = [r for r in results.values() if not r.isOk()]
+
+The readers can't be asked for their reader id, so a readerId is always set and reported as
+unverified rather than changed.
+'''
+import logging
+from collections import deque
+
+from rfid.reader import GainMode,AlarmTagFilter,CMDPacket
+
+log = logging.getLogger(__name__)
+
+class Setting(object):
+    """ How to read and change one reader setting. get(reader,**kwargs) and set(reader,value,**kwargs)
+    call the Reader methods with wait=False and return ReplyFutures. get is None if the setting 
+    can't be read back.
+    """
+    def __init__(self,name,get,set):
+        self.name = name
+        self.get = get
+        self.set = set
+
+    def isReadable(self):
+        return self.get is not None
+
+def _setReaderId(reader,id,**kwargs):
+    """ Reader.setReaderId records the new id before it's sent and skips ids it already has, which would
+    keep a retry from being sent. The id is only recorded once the reader replied.
+    """
+    future = reader.ask(CMDPacket(reader,0x05,id),**kwargs)
+    def done(future):
+        if future.result() is not None:
+            reader.reader_id = id
+    future.addDoneCallback(done)
+    return future
+
+SETTINGS = [
+    Setting('readerId',None,_setReaderId),
+    Setting('rssi',lambda r,**kw:r.getRssiValue(**kw),lambda r,v,**kw:r.setRssiValue(v,**kw)),
+    Setting('siteCode',lambda r,**kw:r.getSiteCode(**kw),lambda r,v,**kw:r.setSiteCode(*v,**kw)),
+    Setting('gain',lambda r,**kw:r.getReceiverGain(**kw),lambda r,v,**kw:r.setReceiverGain(v,**kw)),
+    Setting('alarmFilter',lambda r,**kw:r.getAlarmFilter(**kw),lambda r,v,**kw:r.setAlarmFilter(v,**kw)),
+]
+
+class ReaderConfig(object):
+    """ The settings a reader should have, the ones left as None are not changed.
+    siteCode is the 3 site code bytes, eg. (1,2,3).
+    """
+    def __init__(self,readerId=None,rssi=None,siteCode=None,gain=None,alarmFilter=None):
+        if siteCode is not None:
+            siteCode = tuple(siteCode)
+            assert len(siteCode)==3,"siteCode must be 3 bytes, given %s"%(siteCode,)
+        valid = [GainMode.HIGH,GainMode.LOW,None]
+        assert gain in valid,"gain must be in %s, given %s"%(valid,gain)
+        valid = [AlarmTagFilter.ALL,AlarmTagFilter.WITH_ALARM,AlarmTagFilter.WITHOUT_ALARM,None]
+        assert alarmFilter in valid,"alarmFilter must be in %s, given %s"%(valid,alarmFilter)
+        self.readerId = readerId
+        self.rssi = rssi
+        self.siteCode = siteCode
+        self.gain = gain
+        self.alarmFilter = alarmFilter
+
+    def getSettings(self):
+        """ Returns a list of (Setting,value) for the settings that are given """
+        return [(s,getattr(self,s.name)) for s in SETTINGS if getattr(self,s.name) is not None]
+
+    def __repr__(self):
+        return "ReaderConfig(%s)"%",".join("%s=%s"%(s.name,v) for s,v in self.getSettings())
+
+class ProvisionResult(object):
+    """ What provision did to one reader """
+    def __init__(self,reader):
+        self.reader = reader
+        self.previous = {} # name -> value read back before anything was set
+        self.changed = {} # name -> value that was set
+        self.unverified = {} # name -> value that was set but can't be read back
+        self.unchanged = [] # names of the settings that already had the right value
+        self.failed = {} # name -> reason
+
+    def getNodeId(self):
+        return self.reader.getNodeId()
+
+    def isOk(self):
+        return not self.failed
+
+    def __repr__(self):
+        return "ProvisionResult(node=%s,changed=%s,unverified=%s,unchanged=%s,failed=%s)"%(
+            self.getNodeId(),self.changed,self.unverified,self.unchanged,self.failed)
+
+def _normalize(value):
+    """ Site codes are read back as a bytearray """
+    if isinstance(value,bytearray):
+        return tuple(value)
+    return value
+
+def pipeline(requests,window=16):
+    """ Runs requests, a list of (key,function) where function() sends a command and returns a
+    ReplyFuture, keeping up to window of them in flight. Returns a dict of key -> result (None if
+    the command timed out).
+    """
+    results = {}
+    pending = deque()
+    requests = iter(requests)
+    sending = True
+    while True:
+        while sending and len(pending)<window:
+            try:
+                key,function = next(requests)
+            except StopIteration:
+                sending = False
+                break
+            pending.append((key,function()))
+        if not pending:
+            return results
+        key,future = pending.popleft()
+        results[key] = future.result()
+
+def provision(readers,config,window=16,timeout=0.5,retries=1,verify=True):
+    """ Gives every reader the settings of config, or of config[reader] if config is a dict of
+    Reader (or node id) -> ReaderConfig.
+
+    The settings are read back first and only the ones that differ are set (the ones that can't be 
+    read back are always set, and reported in unverified instead of changed). A set
+    command that gets no reply is sent again up to retries times. If verify is True the settings
+    that were changed are read back again to check they took. Up to window commands are sent
+    without waiting for a reply, each one waits up to timeout seconds.
+
+    Returns a dict of node id -> ProvisionResult.
+    """
+    if isinstance(config,dict):
+        configs = dict((r,config.get(r,config.get(r.getNodeId()))) for r in readers)
+    else:
+        configs = dict((r,config) for r in readers)
+    results = dict((r,ProvisionResult(r)) for r in readers)
+    wanted = dict((r,c.getSettings()) for r,c in configs.items() if c is not None)
+
+    # Read back the current values
+    reads = [((r,s.name),lambda r=r,s=s:s.get(r,timeout=timeout,wait=False))
+             for r,settings in wanted.items() for s,v in settings if s.isReadable()]
+    current = pipeline(reads,window)
+
+    # Only set what differs, a value that couldn't be read is set anyway
+    todo = []
+    for r,settings in wanted.items():
+        result = results[r]
+        for s,value in settings:
+            now = _normalize(current.get((r,s.name)))
+            if now is not None:
+                result.previous[s.name] = now
+            if now == value:
+                result.unchanged.append(s.name)
+            else:
+                todo.append((r,s,value))
+
+    for attempt in range(retries+1):
+        replies = pipeline([((r,s.name),lambda r=r,s=s,v=v:s.set(r,v,timeout=timeout,wait=False))
+                            for r,s,v in todo],window)
+        retry = []
+        for r,s,value in todo:
+            if replies[(r,s.name)] is None:
+                retry.append((r,s,value))
+            elif s.isReadable():
+                results[r].changed[s.name] = value
+            else:
+                results[r].unverified[s.name] = value
+        todo = retry
+        if not todo:
+            break
+    for r,s,value in todo:
+        results[r].failed[s.name] = "No reply"
+
+    if verify:
+        checks = [((r,s.name),lambda r=r,s=s:s.get(r,timeout=timeout,wait=False))
+                  for r,settings in wanted.items() for s,v in settings if s.name in results[r].changed]
+        for (r,name),value in pipeline(checks,window).items():
+            result = results[r]
+            value = _normalize(value)
+            if value is None:
+                result.failed[name] = "No reply when verifying"
+            elif value != result.changed[name]:
+                result.failed[name] = "Read back %s"%(value,)
+            if name in result.failed:
+                del result.changed[name]
+
+    for result in results.values():
+        if result.isOk():
+            log.info("%s",result)
+        else:
+            log.warning("%s",result)
+    return dict((r.getNodeId(),result) for r,result in results.items())
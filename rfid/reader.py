@@ -9,6 +9,8 @@ import logging
 logger = logging.getLogger(__name__)
 
 from rfid.decoder import Packet
+from rfid.commands import COMMANDS
+from rfid.reply import ReplyFuture
 
 class GainMode:
     HIGH = 1 # Long range reader
@@ -20,21 +22,9 @@ class AlarmTagFilter:
     WITHOUT_ALARM = 2 # Status = 2 - Report only tags without any Alarm condition
 
 class CMDPacket(Packet):
-    """Automatically determines the Packet size, and sets the ID's. """
-    def __init__(self,reader,cmd,data=None):
-        l = 0
-        if data is not None:
-            try:
-                l = len(data)
-            except:
-                l = 1
-            
-        if l>0:
-            print "Has Data"
-            super(CMDPacket,self).__init__([0xAA,l,reader.getNetworkId(),reader.getReaderId(),reader.getNodeId(),cmd,data])
-        else:
-            print "No Data"
-            super(CMDPacket,self).__init__([0xAA,l,reader.getNetworkId(),reader.getReaderId(),reader.getNodeId(),cmd])
+    """Builds the command packet from its layout in COMMANDS, and sets the ID's. """
+    def __init__(self,reader,cmd,*args):
+        super(CMDPacket,self).__init__(COMMANDS[cmd].pack(reader.getNetworkId(),reader.getReaderId(),reader.getNodeId(),*args))
 
 class Reader:
     # Reader properties
@@ -58,6 +48,33 @@ class Reader:
     
     def ask(self,*args,**kwagrs):
         return self.network.ask(*args,**kwagrs)
+    
+    def _request(self,packet,parse=None,**kwargs):
+        """ Asks and returns parse(reply), or None if there was no reply. 
+        
+        Every command method takes a wait kwarg, when it is False a ReplyFuture of the 
+        parsed reply is returned instead of blocking.
+        """
+        reply = self.ask(packet,**kwargs)
+        if isinstance(reply,ReplyFuture):
+            return reply.then(parse)
+        if reply is not None and parse is not None:
+            return parse(reply)
+        return reply
+    
+    def _query(self,cmd,parse=None,**kwargs):
+        """ Sends a command without data and returns the values of the reply decoded using its 
+        layout in COMMANDS (or parse(values) if given). A single value is returned by itself.
+        """
+        command = COMMANDS[cmd]
+        def decode(pkt):
+            values = command.decode(pkt)
+            if parse is not None:
+                return parse(values)
+            if len(values)==1:
+                return values[0]
+            return values
+        return self._request(CMDPacket(self,cmd),decode,**kwargs)
         
     def getReaderId(self):
         return self.reader_id
@@ -74,7 +91,7 @@ class Reader:
     
     def setNetworkId(self,id,**kwargs):
         """ Assign a Network ID to a reader """
-        return self.ask(CMDPacket(self,cmd=0x04,data=id),**kwargs)
+        return self.ask(CMDPacket(self,0x04,id),**kwargs)
     
     def setReaderId(self,id,**kwargs):
         """ Assign a Reader ID to a reader 
@@ -84,7 +101,7 @@ class Reader:
         """
         if id != self.getReaderId():
             self.reader_id = id
-            return self.ask(CMDPacket(self,cmd=0x05,data=id),**kwargs)
+            return self.ask(CMDPacket(self,0x05,id),**kwargs)
         
     def getTagPacket(self,**kwargs):
         """ Receive a single tag transmission from a reader 
@@ -94,7 +111,7 @@ class Reader:
         pass on the tag information once it has been validated
         """
         # TODO: decode the response
-        return self.ask(CMDPacket(self,cmd=0x06),**kwargs)
+        return self.ask(CMDPacket(self,0x06),**kwargs)
     
     def setRssiValue(self,rssi,**kwargs):
         """ Assign a RSSI rejection value to a reader 
@@ -103,7 +120,7 @@ class Reader:
         less than the uploaded value. An uploaded RSSI value of 0 will disable the filtering and subsequently pass
         all tag messages onto the controller.
         """
-        return self.ask(CMDPacket(self,cmd=0x07,data=rssi),**kwargs)
+        return self.ask(CMDPacket(self,0x07,rssi),**kwargs)
     
     def getRssiValue(self,**kwargs):
         """ Query a reader for the onboard RSSI rejection value 
@@ -113,9 +130,7 @@ class Reader:
         turned value of 0 means that the RSSI filtering is disabled. This enables the reader to do filtering (instead of
         the controller) and thus reduce network traffic.
         """
-        pkt =  self.ask(CMDPacket(self,cmd=0x08),**kwargs)
-        if pkt is not None:
-            return pkt.getData()[0]
+        return self._query(0x08,**kwargs)
     
     def setSiteCode(self,site1,site2,site3,**kwargs):
         """ Assign an acceptance Site Code value to the reader 
@@ -126,7 +141,7 @@ class Reader:
         the amount of traffic on the network. An uploaded site code value of 0 will disable the site code filtering of the
         reader and subsequently enable the reader to pass all received tag messages onto the controller.
         """
-        return self.ask(CMDPacket(self,cmd=0x09,data=bytearray([site1,site2,site3])),**kwargs)
+        return self.ask(CMDPacket(self,0x09,site1,site2,site3),**kwargs)
     
     def getSiteCode(self,**kwargs):
         """ Query the reader for the acceptance Site Code value
@@ -134,21 +149,17 @@ class Reader:
         This command queries the reader on what site code filtering is being done on that specific reader. A returned
         value of 0 means that the site code filtering is disabled. 
         """
-        pkt = self.ask(CMDPacket(self,cmd=0x0A),**kwargs)
-        if pkt is not None:
-            return pkt.getData()
+        return self._query(0x0A,bytearray,**kwargs)
         
     def setReceiverGain(self,gain,**kwargs):
         """ Enable the reader for: Short range / Long range reader. """
         valid = [GainMode.HIGH,GainMode.LOW]
         assert gain in valid,"gain must be in %s, given %s"%(valid,gain)
-        return self.ask(CMDPacket(self,cmd=0x0B,data=gain),**kwargs)
+        return self.ask(CMDPacket(self,0x0B,gain),**kwargs)
     
     def getReceiverGain(self,**kwargs):
         """ Query the state of the reader: Short range / Long range """
-        pkt = self.ask(CMDPacket(self,cmd=0x0C),**kwargs)
-        if pkt is not None:
-            return pkt.getData()[0]
+        return self._query(0x0C,**kwargs)
         
     def setAlarmFilter(self,status,**kwargs):
         """ Assign a certain filter setting to the reader 
@@ -161,7 +172,7 @@ class Reader:
         """
         valid = [AlarmTagFilter.ALL,AlarmTagFilter.WITH_ALARM,AlarmTagFilter.WITHOUT_ALARM]
         assert status in valid,"status must be in %s, given %s"%(valid,status)
-        return self.ask(CMDPacket(self,cmd=0x0D,data=status),**kwargs)
+        return self.ask(CMDPacket(self,0x0D,status),**kwargs)
     
     def getAlarmFilter(self,**kwargs):
         """ Query the filter setting on the reader 
@@ -169,9 +180,7 @@ class Reader:
         This command will retrieve the alarm filter settings on the reader. An alarm filter value of 0 means that the
         filter option has been disabled.
         """
-        pkt = self.ask(CMDPacket(self,cmd=0x0E),**kwargs)
-        if pkt is not None:
-            return pkt.getData()[0]
+        return self._query(0x0E,**kwargs)
     
     def getNumInvalidTags(self,**kwargs):
         """ Interrogate the reader for the amount of invalid message readings 
@@ -181,14 +190,10 @@ class Reader:
         Combining this command with the RF white noise calculation command can result in the reader
         being used as an effective in-field diagnostic tool.
         """
-        pkt = self.ask(CMDPacket(self,cmd=0x0F),**kwargs)
-        if pkt is not None:
-            return (pkt.getData()[0]<<8)+pkt.getData()[1]
+        return self._query(0x0F,**kwargs)
     
     def getSupplyVoltage(self,**kwargs):
-        pkt = self.ask(CMDPacket(self,cmd=0x10),**kwargs)
-        if pkt is not None:
-            return pkt.getData()[0]
+        return self._query(0x10,**kwargs)
         
     def startRfWhiteNoiseCalculation(self,**kwargs):
         """ Enable the reader for evaluation mode. (40 second delay on reader) 
@@ -199,7 +204,7 @@ class Reader:
         tags transmissions. If a command is send to the reader, during the evaluation period, the calculation will be
         aborted and the reader will reset. After the 40 second time period the reader will continue with normal operation.
         """
-        return self.ask(CMDPacket(self,cmd=0x11),**kwargs)
+        return self.ask(CMDPacket(self,0x11),**kwargs)
     
     def getRfWhiteNoiseResult(self,**kwargs):
         """ Query the white noise level on 433 MHz 
@@ -210,9 +215,7 @@ class Reader:
         
         return noise
         """
-        pkt = self.ask(CMDPacket(self,cmd=0x12),**kwargs)
-        if pkt is not None:
-            return pkt.getData()[0]
+        return self._query(0x12,**kwargs)
     
     def setBaudRate(self,baudrate,**kwargs):
         """ Assign a different baud rate to a reader 
@@ -228,16 +231,14 @@ class Reader:
         """
         assert baudrate in Packet.BAUDRATES.values(), "baudrate must be in %s, got %s"%(Packet.BAUDRATES.values(), baudrate)
         
-        return self.ask(CMDPacket(self,cmd=0xFE,data=Reader.BAUDRATES.index(baudrate)),**kwargs)
+        return self.ask(CMDPacket(self,0xFE,Packet.BAUDRATE_CODES[baudrate]),**kwargs)
     
     def getVersionInformation(self,**kwargs):
         """ Query the hardware / software version of a reader 
         
         This command returns the hardware and software version of the queried reader.
         """
-        pkt = self.ask(CMDPacket(self,cmd=0xFF),**kwargs)
-        if pkt is not None:
-            return pkt.getDecoding()['data']
+        return self._request(CMDPacket(self,0xFF),lambda pkt:pkt.getDecoding()['data'],**kwargs)
     
     #================================== End of Reader Commands ========================================================
     
@@ -0,0 +1,168 @@
+'''
+Created on Oct 18, 2026
+
+'''
+import sys
+import threading
+import time
+from collections import deque
+
+from rfid.decoder import PacketDecodedListener
+from rfid.timer import getTimer
+from rfid.metrics import getRegistry
+
+_timeouts = getRegistry().counter('rfid_ask_timeouts_total','Commands that got no reply within the timeout','command')
+
+class ReplyFuture(object):
+    """ The reply to a command that has been sent. The result is the reply Packet,
+    or None if the command timed out.
+    """
+    def __init__(self):
+        self._done = threading.Event()
+        self._result = None
+        self._time = None
+        self._excInfo = None
+        self._callbacks = []
+        self._lock = threading.Lock()
+        # Set by the ReplyDispatcher, here so a reply that comes before the timeout is started finds them
+        self._key = None
+        self._timeout = None
+        self._timeoutDelay = None
+
+    def done(self):
+        return self._done.is_set()
+    
+    def getTime(self):
+        """ Get time at which the reply was received or timed out """
+        return self._time
+
+    def result(self,timeout=None):
+        """ Blocks until the reply is received or timed out and returns it """
+        if not self._done.wait(timeout):
+            raise RuntimeError("Reply not received yet")
+        if self._excInfo is not None:
+            raise self._excInfo[0],self._excInfo[1],self._excInfo[2]
+        return self._result
+
+    def addDoneCallback(self,callback):
+        """ Calls callback(future) once the result is set, right away if it already is.
+        Callbacks are run on the decoder or timer thread so they should not block.
+        """
+        with self._lock:
+            if not self.done():
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+    def then(self,parse):
+        """ Returns a new ReplyFuture with the result of parse(reply). Like the blocking
+        Reader methods, parse is not called when the command timed out and the result is None.
+        """
+        future = ReplyFuture()
+        def chain(f):
+            try:
+                reply = f.result()
+                if reply is not None and parse is not None:
+                    reply = parse(reply)
+                future.setResult(reply)
+            except:
+                future.setException(sys.exc_info())
+        self.addDoneCallback(chain)
+        return future
+
+    def setResult(self,result):
+        self._result = result
+        self._finish()
+
+    def setException(self,excInfo):
+        self._excInfo = excInfo
+        self._finish()
+
+    def _finish(self):
+        self._time = time.time()
+        with self._lock:
+            self._done.set()
+            callbacks,self._callbacks = self._callbacks,[]
+        for callback in callbacks:
+            callback(self)
+
+def gather(futures,timeout=None):
+    """ Waits for all of the futures and returns a list of their results """
+    return [f.result(timeout) for f in futures]
+
+class ReplyDispatcher(PacketDecodedListener):
+    """ Delivers replies to the commands waiting on them. A Network registers one of these
+    with its decoder instead of a listener (and a thread) per command.
+    
+    Pending commands are kept in a table keyed by (network id, node id, reply command) so a
+    reply goes straight to the oldest command sent to the same node in O(1), and commands to 
+    different nodes can all be in flight at once. A node id or command of None matches any reply.
+    """
+    def __init__(self,timer=None):
+        self._pending = {} # (networkId,nodeId,replyCmd) -> deque of futures in the order they were sent
+        self._lock = threading.Lock()
+        self._timer = timer or getTimer()
+
+    def expect(self,networkId,nodeId,replyCmd,timeout=1,started=True):
+        """ Returns a ReplyFuture for the next response from the node with the replyCmd command 
+        
+        If started is False the timeout only starts counting when startTimeout(future) is called,
+        eg. once the command has actually been written.
+        """
+        future = ReplyFuture()
+        key = future._key = (networkId,nodeId,replyCmd)
+        future._timeoutDelay = timeout
+        with self._lock:
+            if key not in self._pending:
+                self._pending[key] = deque()
+            self._pending[key].append(future)
+        if started:
+            self.startTimeout(future)
+        return future
+    
+    def startTimeout(self,future,timeout=None):
+        """ Starts the timeout of a future from expect(started=False) """
+        if future.done():
+            return # The reply already came
+        if timeout is None:
+            timeout = future._timeoutDelay
+        future._timeout = self._timer.schedule(timeout,self._timedOut,future._key,future)
+
+    def getPendingCount(self):
+        with self._lock:
+            return sum(len(futures) for futures in self._pending.values())
+
+    def _pop(self,key):
+        futures = self._pending.get(key)
+        if not futures:
+            return None
+        future = futures.popleft()
+        if not futures:
+            del self._pending[key]
+        return future
+
+    def packetReady(self,event):
+        if event.getHeader()!=0x55:
+            return
+        networkId,nodeId,cmd = event.getNetworkId(),event.getNodeId(),event.getCommand()
+        with self._lock:
+            if not self._pending:
+                return
+            future = (self._pop((networkId,nodeId,cmd)) or self._pop((networkId,None,cmd)) or
+                      self._pop((networkId,nodeId,None)) or self._pop((networkId,None,None)))
+        if future is None:
+            return
+        if future._timeout is not None:
+            self._timer.cancel(future._timeout)
+        future.setResult(event.getPacket())
+
+    def _timedOut(self,key,future):
+        with self._lock:
+            futures = self._pending.get(key)
+            if not futures or future not in futures:
+                return
+            futures.remove(future)
+            if not futures:
+                del self._pending[key]
+        _timeouts.inc(label=key[2])
+        future.setResult(None)
@@ -3,21 +3,34 @@ Created on Jan 27, 2013
 
 @author: jrm5555@psu.edu & bdf5047@psu.edu
 '''
+import logging
 import threading
+import select
 import serial
 import time
 
+from rfid.helpers import monotonic
+from rfid.metrics import getRegistry
+
+log = logging.getLogger(__name__)
+_bytesRead = getRegistry().counter('rfid_serial_bytes_read_total','Bytes read from the serial ports')
+
 class SerialEvent:
     _data = None
     _serial = None
     
-    def __init__(self, eventSource, data, serial):
+    def __init__(self, eventSource, data, serial, received=None):
             self._eventSource = eventSource
             self._data = data
             self._serial = serial
+            self._time = time.time() if received is None else received
             
     def getData(self):
             return self._data
+    
+    def getTime(self):
+            """ Get time at which the data was read from the port """
+            return self._time
                                                                                                                                                                                                                                                      
     def getConnection(self):
             return self._serial
@@ -33,36 +46,93 @@ class SerialPortListener:
     def dataSent(self, event):
         raise Exception("dataSent - not implemented")
                                                                                                                                                                                                                                                          
+class IngestMode:
+    POLL = 'poll' # Check inWaiting() and sleep 10 ms in between
+    SELECT = 'select' # Block on the serial port's file descriptor until data arrives
+    BLOCKING = 'blocking' # Block in read() until data arrives (for ports without a file descriptor)
+
 class SerialPortMonitor(threading.Thread):
     _connection = None
     _monitoring = False
     _listeners = []
         
     def __init__(self,*params,**kwargs):
+        """ Takes the same arguments as serial.Serial plus:
+        
+        ingest - one of the IngestMode values, defaults to SELECT when the port has a file descriptor 
+        readTimeout - longest time in seconds to block waiting for data, this is how long stop() can take
+        capture - a rfid.capture.CaptureWriter that records everything read, it's closed when the monitor stops
+        """
         threading.Thread.__init__(self)
+        ingest = kwargs.pop('ingest',None)
+        self._readTimeout = kwargs.pop('readTimeout',0.1)
+        self._capture = kwargs.pop('capture',None)
         self._connection = serial.Serial(*params,**kwargs)
+        if ingest is None:
+            ingest = hasattr(self._connection,'fileno') and IngestMode.SELECT or IngestMode.BLOCKING
+        valid = [IngestMode.POLL,IngestMode.SELECT,IngestMode.BLOCKING]
+        assert ingest in valid,"ingest must be in %s, given %s"%(valid,ingest)
+        self._ingest = ingest
         self._listeners = []
         
     def getConnection(self):
         return self._connection
+    
+    def getIngestMode(self):
+        return self._ingest
+    
+    def getBaudRate(self):
+        return self._connection.baudrate
+    
+    def setBaudRate(self,baudrate):
+        """ Switches the open port to the baud rate and throws away anything received at the old one """
+        log.info("%s switching to %s baud",self,baudrate)
+        self._connection.flush()
+        self._connection.baudrate = baudrate
+        self._connection.flushInput()
                                                                                                                                                                                                                                                      
     def addSerialEventListener(self, listener):
             self._listeners.append( listener )
                                                                                                                                                                                                                                                      
     def removeSerialEventListener(self, listener):
             self._listeners.remove( listener )
+    
+    def _read(self):
+        """ Waits for data using the ingest mode and returns whatever is available (which may be nothing) """
+        connection = self.getConnection()
+        if self._ingest == IngestMode.SELECT:
+            if select.select([connection.fileno()],[],[],self._readTimeout)[0]:
+                return connection.read(max(1,connection.inWaiting()))
+        elif self._ingest == IngestMode.BLOCKING:
+            # Block for the first byte then take everything else that came with it
+            data = connection.read(1)
+            if data:
+                return data+connection.read(connection.inWaiting())
+        else:
+            if (connection.inWaiting()>0):
+                return connection.read(connection.inWaiting())
+            # So it doesn't consume so much CPU resources
+            time.sleep(0.01)
+        return None
             
     def run(self):
-        print self, 'starting monitor on %s'%self._connection
+        log.info("%s starting monitor on %s",self,self._connection)
+        if self._ingest == IngestMode.BLOCKING:
+            self.getConnection().timeout = self._readTimeout
         self._monitoring = True
         while self._monitoring:
-            if (self.getConnection().inWaiting()>0):
-                self._fireEvent(SerialEvent(self,bytearray(self.getConnection().read(self.getConnection().inWaiting())),self.getConnection()),'dataReceived')
-            # So it doesn't consume so much CPU resources
-            time.sleep(0.01)
+            data = self._read()
+            if data:
+                received = time.time() # Stamped here so the time doesn't include waiting in the decoder's queue
+                _bytesRead.inc(len(data))
+                if self._capture is not None:
+                    self._capture.write(data,monotonic())
+                self._fireEvent(SerialEvent(self,data,self.getConnection(),received),'dataReceived')
                                 
-        print self, 'shutting down'
+        log.info("%s shutting down",self)
         self._connection.close()
+        if self._capture is not None:
+            self._capture.close()
         return
         
         
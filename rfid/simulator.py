@@ -0,0 +1,327 @@
+'''
+Created on Oct 18, 2026
+
+Emulates a network of L-RX201 readers on a pseudo-terminal so the whole stack (Network,
+Decoder, Tracker) can be run and load tested without hardware:
+
+    sim = ReaderNetworkSimulator(numReaders=3,numTags=100)
+    sim.start()
+    nw = Network(0,None,port=sim.getPort(),baudrate=115200)
+    ...
+    nw.stop()
+    sim.stop()
+'''
+import errno
+import fcntl
+import heapq
+import itertools
+import math
+import os
+import random
+import select
+import termios
+import threading
+import tty
+
+from rfid.helpers import monotonic
+from rfid.decoder import Decoder,Packet,PacketDecodedListener
+
+# termios speed -> baud rate of the ones the readers support
+_SPEEDS = dict((getattr(termios,'B%s'%b),b) for b in Packet.BAUDRATES.values() if hasattr(termios,'B%s'%b))
+
+class SimulatedReader(object):
+    """ The settings and tag table of one emulated reader """
+    def __init__(self,nodeId,position,networkId=0,readerId=0,tableSize=256):
+        self.nodeId = nodeId
+        self.readerId = readerId
+        self.networkId = networkId
+        self.position = position
+        self.rssiValue = 0 # RSSI rejection threshold, 0 is off
+        self.siteCode = (0,0,0) # 0 is off
+        self.gain = 1
+        self.alarmFilter = 0
+        self.invalidTags = 0
+        self.voltage = 120 # In 0.1 V
+        self.noise = 0
+        self.baudRate = 0 # Code in Packet.BAUDRATES
+        self.maxBaudRate = 115200 # Fastest rate the reader will switch to
+        self.version = (11,22,23,20)
+        self.tagTable = [] # Tag packet data waiting to be sent, oldest first
+        self.tableSize = tableSize
+
+class SimulatedTag(object):
+    """ A tag that transmits every interval seconds (with some jitter) from a fixed position """
+    def __init__(self,id,position,interval=1.5,siteCode=0x000F2A,alarm=False):
+        self.id = id
+        self.position = position
+        self.interval = interval
+        self.siteCode = siteCode
+        self.alarm = alarm
+        self.counter = 0
+        self.age = 0
+
+class ReaderNetworkSimulator(threading.Thread,PacketDecodedListener):
+    """ Emulates numReaders readers (node ids 1..numReaders) on one network behind a pseudo-terminal.
+
+    The readers answer ping, reset, auto/manual polling, the RSSI/site code/gain/alarm filter
+    getters and setters, the diagnostic commands and version info. Tags transmit at their interval
+    and are heard by every reader in range with an RSSI from the log-distance path loss model
+        rssi = a - 10*n*log10(distance) + gauss(0,noise)
+    Readers drop tags below their RSSI threshold or with a different site code like the real ones.
+
+    checksumErrorRate and corruptionRate are the fraction of frames sent with a bad checksum or
+    with a random byte changed. replyDelay is how long a reader takes to answer a command.
+    A reader only hears and is heard by the host when its baud rate is the one the host set the
+    port to.
+    """
+    INTERVALS = {30:0x30,15:0x20,1.5:0x31,0.8:0x32,0.4:0x33}
+
+    def __init__(self,numReaders=3,numTags=0,networkId=0,tagInterval=1.5,area=(20,20),
+                 a=120,n=2.0,noise=2.0,sensitivity=20,checksumErrorRate=0,corruptionRate=0,
+                 replyDelay=0,autoPolling=False,seed=None):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self._random = random.Random(seed)
+        self.networkId = networkId
+        self.a = a
+        self.n = n
+        self.noise = noise
+        self.sensitivity = sensitivity
+        self.checksumErrorRate = checksumErrorRate
+        self.corruptionRate = corruptionRate
+        self.replyDelay = replyDelay
+        self.autoPolling = autoPolling # The flag in the EEPROM
+        self._suspended = False # Auto polling was broken by the host
+        self.area = area
+
+        # Readers along the edges of the area
+        self.readers = {}
+        for i in range(numReaders):
+            position = (area[0]*((i%2) and 1 or 0),area[1]*i/max(1,numReaders-1),3)
+            self.readers[i+1] = SimulatedReader(i+1,position,networkId)
+        self.tags = []
+
+        self._master,self._slave = os.openpty()
+        tty.setraw(self._slave)
+        fcntl.fcntl(self._master,fcntl.F_SETFL,fcntl.fcntl(self._master,fcntl.F_GETFL)|os.O_NONBLOCK)
+        self._port = os.ttyname(self._slave)
+        self._out = bytearray() # Bytes waiting for the pty to accept them
+        self._maxOut = 1<<16
+        self._events = [] # (due time,sequence,callback,args)
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._decoder = Decoder(inline=True)
+        self._decoder.addPacketDecodedEventListener(self)
+        self._running = False
+        self.stats = {'transmissions':0,'readings':0,'framesSent':0,'commands':0,'overruns':0,'corrupted':0,'baudMismatch':0}
+
+        for i in range(numTags):
+            self.addTag(SimulatedTag(1000+i,(self._random.uniform(0,area[0]),self._random.uniform(0,area[1]),1),tagInterval))
+
+    def getPort(self):
+        """ The device the Network should open """
+        return self._port
+
+    def getStats(self):
+        return dict(self.stats)
+
+    def addTag(self,tag):
+        self.tags.append(tag)
+        self._schedule(self._random.uniform(0,tag.interval),self._transmit,tag)
+
+    #============================ Radio =============================================================
+    def _rssi(self,reader,tag):
+        d = math.sqrt(sum((r-t)**2 for r,t in zip(reader.position,tag.position)))
+        rssi = self.a-10*self.n*math.log10(max(d,0.1))+self._random.gauss(0,self.noise)
+        if reader.gain == 0:
+            rssi -= 10
+        return int(min(255,max(0,rssi)))
+
+    def _transmit(self,tag):
+        """ The tag transmits, every reader that hears it puts it in its tag table """
+        tag.counter = (tag.counter+1)&0x7F
+        tag.age += 1
+        self.stats['transmissions'] += 1
+        site = ((tag.siteCode>>16)&0xFF,(tag.siteCode>>8)&0xFF,tag.siteCode&0xFF)
+        for reader in self.readers.values():
+            rssi = self._rssi(reader,tag)
+            if rssi<self.sensitivity or (reader.rssiValue and rssi<reader.rssiValue):
+                continue
+            if reader.siteCode != (0,0,0) and reader.siteCode != site:
+                continue
+            if (reader.alarmFilter == 1 and not tag.alarm) or (reader.alarmFilter == 2 and tag.alarm):
+                continue
+            if len(reader.tagTable)>=reader.tableSize:
+                reader.tagTable.pop(0)
+            reader.tagTable.append(self._tagData(reader,tag,rssi))
+            self.stats['readings'] += 1
+            if self._isAutoPolling():
+                self._send(reader,0x06,reader.tagTable.pop(0))
+        self._schedule(tag.interval*self._random.uniform(0.9,1.1),self._transmit,tag)
+
+    def _tagData(self,reader,tag,rssi):
+        interval = self.INTERVALS.get(tag.interval,0x31)
+        data = bytearray([0x21,0x2A,0x2A,interval,tag.counter,0x11,0x42,0x43,tag.alarm and 1 or 0])
+        data += bytearray([(tag.age>>24)&0xFF,(tag.age>>16)&0xFF,(tag.age>>8)&0xFF,tag.age&0xFF])
+        data += bytearray([(tag.siteCode>>16)&0xFF,(tag.siteCode>>8)&0xFF,tag.siteCode&0xFF])
+        data += bytearray([(tag.id>>24)&0xFF,(tag.id>>16)&0xFF,(tag.id>>8)&0xFF,tag.id&0xFF])
+        data += bytearray([0x33,reader.readerId,rssi,0x00,0x20,tag.alarm and 1 or 0,reader.nodeId,reader.networkId,rssi,0x11,0x0A,0x0D])
+        return data
+
+    def _isAutoPolling(self):
+        return self.autoPolling and not self._suspended
+
+    #============================ Serial line =======================================================
+    def _lineBaudRate(self):
+        """ The baud rate the host set the port to. 38800 isn't a standard rate, termios reports it
+        like any other custom rate
+        """
+        return _SPEEDS.get(termios.tcgetattr(self._slave)[4],38800)
+
+    def _isOnLine(self,reader):
+        return Packet.BAUDRATES.get(reader.baudRate) == self._lineBaudRate()
+
+    def _send(self,reader,cmd,data=bytearray()):
+        if not self._isOnLine(reader):
+            self.stats['baudMismatch'] += 1 # The host only sees noise
+            return
+        pkt = Packet(bytearray([0x55,len(data),reader.networkId,reader.readerId,reader.nodeId,cmd])+data)
+        if self.checksumErrorRate and self._random.random()<self.checksumErrorRate:
+            pkt[-1] ^= 0xFF
+            self.stats['corrupted'] += 1
+        if self.corruptionRate and self._random.random()<self.corruptionRate:
+            pkt[self._random.randint(0,len(pkt)-1)] = self._random.randint(0,255)
+            self.stats['corrupted'] += 1
+        if len(self._out)+len(pkt)>self._maxOut:
+            self.stats['overruns'] += 1 # Nobody is reading the port
+            return
+        self._out += pkt
+        self.stats['framesSent'] += 1
+
+    def _schedule(self,delay,callback,*args):
+        heapq.heappush(self._events,(monotonic()+delay,next(self._sequence),callback,args))
+
+    def run(self):
+        self._running = True
+        while self._running:
+            timeout = 0.05
+            if self._events:
+                timeout = min(timeout,max(0,self._events[0][0]-monotonic()))
+            r,w,x = select.select([self._master],self._out and [self._master] or [],[],timeout)
+            with self._lock:
+                if r:
+                    try:
+                        data = os.read(self._master,4096)
+                    except OSError as e:
+                        if e.errno not in (errno.EAGAIN,errno.EIO):
+                            raise
+                        data = ''
+                    if '\xff*\xff*' in data:
+                        self._suspended = True # The host broke the polling sequence
+                    self._decoder.decode(data)
+                now = monotonic()
+                while self._events and self._events[0][0]<=now:
+                    due,i,callback,args = heapq.heappop(self._events)
+                    callback(*args)
+                if self._out:
+                    try:
+                        del self._out[:os.write(self._master,self._out)]
+                    except OSError as e:
+                        if e.errno != errno.EAGAIN:
+                            raise
+
+    def stop(self):
+        self._running = False
+        if self.is_alive():
+            self.join()
+        os.close(self._master)
+        os.close(self._slave)
+
+    #============================ Commands ==========================================================
+    def packetReady(self,event):
+        if event.getHeader() != 0xAA or event.getNetworkId() != self.networkId:
+            return
+        pkt = event.getPacket()
+        self.stats['commands'] += 1
+        if pkt.getNodeId() == 0xFF:
+            readers = self.readers.values()
+        elif pkt.getNodeId() == 0x00:
+            readers = [r for r in self.readers.values() if r.readerId == pkt.getReaderId()][:1]
+        else:
+            readers = [self.readers[pkt.getNodeId()]] if pkt.getNodeId() in self.readers else []
+        readers = [r for r in readers if self._isOnLine(r)]
+        if not readers:
+            return
+        replies = [self._execute(reader,pkt.getCommand(),pkt.getData()) for reader in readers]
+        # A broadcast is only answered once
+        reader,reply = readers[0],replies[0]
+        if reply is None:
+            return
+        if self.replyDelay:
+            self._schedule(self.replyDelay,self._send,reader,pkt.getCommand(),reply)
+        else:
+            self._send(reader,pkt.getCommand(),reply)
+
+    def _execute(self,reader,cmd,data):
+        """ Runs the command on the reader and returns the data of the reply (None for no reply) """
+        if cmd == 0x00: # Reset
+            reader.tagTable = []
+            self._suspended = False
+            return bytearray()
+        elif cmd == 0x01: # Auto polling
+            self.autoPolling = True
+            self._suspended = False
+            return bytearray()
+        elif cmd == 0x02: # Manual polling
+            self.autoPolling = False
+            return bytearray()
+        elif cmd == 0x03: # Ping
+            return bytearray([0x00])
+        elif cmd == 0x04:
+            reader.networkId = data[0]
+            return bytearray(data)
+        elif cmd == 0x05:
+            reader.readerId = data[0]
+            return bytearray(data)
+        elif cmd == 0x06: # Get tag packet
+            if not reader.tagTable:
+                return bytearray([0x02]) # Tag Table underflow error
+            return reader.tagTable.pop(0)
+        elif cmd == 0x07:
+            reader.rssiValue = data[0]
+            return bytearray(data)
+        elif cmd == 0x08:
+            return bytearray([reader.rssiValue])
+        elif cmd == 0x09:
+            reader.siteCode = tuple(data[0:3])
+            return bytearray(data)
+        elif cmd == 0x0A:
+            return bytearray(reader.siteCode)
+        elif cmd == 0x0B:
+            reader.gain = data[0]
+            return bytearray(data)
+        elif cmd == 0x0C:
+            return bytearray([reader.gain])
+        elif cmd == 0x0D:
+            reader.alarmFilter = data[0]
+            return bytearray(data)
+        elif cmd == 0x0E:
+            return bytearray([reader.alarmFilter])
+        elif cmd == 0x0F:
+            count,reader.invalidTags = reader.invalidTags,0
+            return bytearray([(count>>8)&0xFF,count&0xFF])
+        elif cmd == 0x10:
+            return bytearray([reader.voltage])
+        elif cmd == 0x11:
+            reader.noise = int(max(0,self._random.gauss(30,5)))
+            return bytearray()
+        elif cmd == 0x12:
+            return bytearray([reader.noise])
+        elif cmd == 0xFE:
+            if Packet.BAUDRATES.get(data[0],float('inf'))>reader.maxBaudRate:
+                return None
+            reader.baudRate = data[0] # The reply already goes out at the new rate
+            return bytearray(data)
+        elif cmd == 0xFF:
+            return bytearray(reader.version)
+        return None
@@ -3,3 +3,61 @@ Created on Jan 3, 2013
 
 @author: jrm5555@psu.edu
 '''
+import struct
+import numpy as np
+
+# NumPy record of a TagReading, for holding many of them in one array
+READING_DTYPE = np.dtype([
+    ('tagId','<u4'),
+    ('siteCode','<u4'),
+    ('age','<u4'),
+    ('time','<f8'),
+    ('rssi','u1'),
+    ('readerRssi','u1'),
+    ('nodeId','u1'),
+    ('counter','u1'),
+    ('alarmByte','u1'),
+])
+
+class TagReading(object):
+    """ A single tag transmission reported by a reader (a Get Tag Packet response).
+    
+    Holds the integer fields the tracker needs instead of the dict of strings made by 
+    Packet.getDecoding, so it is much smaller and quicker to make.
+    """
+    __slots__ = ('tagId','siteCode','rssi','readerRssi','nodeId','counter','alarmByte','age','time')
+    
+    # Fields starting at the node id byte of the packet, see Packet._decodeTagPacket for the layout
+    _struct = struct.Struct('>B5xB4xIBHI2xB2xB2xB')
+    
+    def __init__(self,tagId,siteCode,rssi,readerRssi,nodeId,counter,alarmByte,age,time):
+        self.tagId = tagId
+        self.siteCode = siteCode
+        self.rssi = rssi
+        self.readerRssi = readerRssi
+        self.nodeId = nodeId
+        self.counter = counter
+        self.alarmByte = alarmByte
+        self.age = age
+        self.time = time
+    
+    @classmethod
+    def fromBuffer(cls,data,offset,time):
+        """ Reads the tag packet starting at data[offset] """
+        nodeId,counter,age,site1,site2,tagId,rssi,alarmByte,readerRssi = cls._struct.unpack_from(data,offset+4)
+        return cls(tagId,(site1<<16)+site2,rssi,readerRssi,nodeId,counter&0x7F,alarmByte,age,time)
+    
+    @classmethod
+    def fromPacket(cls,packet,time):
+        return cls.fromBuffer(packet,0,time)
+    
+    def toTuple(self):
+        """ Returns the fields in the order of READING_DTYPE """
+        return (self.tagId,self.siteCode,self.age,self.time,self.rssi,self.readerRssi,self.nodeId,self.counter,self.alarmByte)
+    
+    def __repr__(self):
+        return "TagReading(id=%s,node=%s,rssi=%s,counter=%s)"%(self.tagId,self.nodeId,self.rssi,self.counter)
+
+class TagReadingListener:
+    def tagRead(self, reading):
+        raise Exception("tagRead - not implemented")
@@ -0,0 +1,52 @@
+'''
+Created on Oct 18, 2026
+
+'''
+import unittest
+
+from rfid.decoder import Packet
+from rfid.network import Network
+from rfid.reader import Reader
+from rfid.simulator import ReaderNetworkSimulator
+
+class BaudRateTests(unittest.TestCase):
+
+    def setUp(self):
+        self.sim = ReaderNetworkSimulator(numReaders=3,seed=1)
+        for reader in self.sim.readers.values():
+            reader.baudRate = Packet.BAUDRATE_CODES[9600]
+        self.sim.start()
+        self.nw = Network(0,None,port=self.sim.getPort(),baudrate=9600,inlineDecoding=True)
+        assert self.nw.rescan(nodeIds=range(1,5)) == {1:0,2:0,3:0}
+
+    def tearDown(self):
+        self.nw.stop()
+        self.sim.stop()
+
+    def testReaderSetBaudRate(self):
+        Reader(self.nw,id=2).setBaudRate(57600,timeout=0.1)
+        assert self.sim.readers[2].baudRate == Packet.BAUDRATE_CODES[57600]
+        assert self.nw.pingReader(2,timeout=0.1) is None # It's on another rate now
+
+    def testNegotiate(self):
+        assert self.nw.negotiateBaudRate() == 115200
+        assert self.nw.getBaudRate() == 115200
+        assert [r.baudRate for r in self.sim.readers.values()] == [0,0,0]
+        assert self.nw.rescan(nodeIds=range(1,5)) == {1:0,2:0,3:0}
+
+    def testFallBack(self):
+        self.sim.readers[3].maxBaudRate = 38800
+        assert self.nw.negotiateBaudRate() == 38800
+        assert [Packet.BAUDRATES[r.baudRate] for r in self.sim.readers.values()] == [38800]*3
+        assert self.nw.rescan(nodeIds=range(1,5)) == {1:0,2:0,3:0}
+
+    def testStayWhenNothingIsFaster(self):
+        self.sim.readers[1].maxBaudRate = 9600
+        assert self.nw.negotiateBaudRate() == 9600
+        assert [r.baudRate for r in self.sim.readers.values()] == [4,4,4]
+        assert self.nw.rescan(nodeIds=range(1,5)) == {1:0,2:0,3:0}
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -0,0 +1,45 @@
+'''
+Created on Oct 18, 2026
+
+'''
+import unittest
+
+from rfid.benchmark import benchDecoder,benchEstimateArea,compare,percentiles
+from rfid.tracker import Tracker
+
+class BenchmarkTests(unittest.TestCase):
+
+    def testPercentiles(self):
+        p = percentiles([i/1000.0 for i in range(1,101)],'ask')
+        assert p['ask.p50Ms'] == 51 and p['ask.p99Ms'] == 100 and p['ask.maxMs'] == 100
+        assert percentiles([],'ask') == {}
+
+    def testCompare(self):
+        baseline = {'decoder.clean.bytesPerSecond':1000.0,'ask.p50Ms':1.0,'gone':1.0}
+        rows = compare({'decoder.clean.bytesPerSecond':700.0,'ask.p50Ms':0.5,'new':1.0},baseline,tolerance=0.2)
+        assert [(r[0],r[4]) for r in rows] == [('ask.p50Ms',False),('decoder.clean.bytesPerSecond',True)]
+        assert rows[0][3] == 0.5
+
+    def testDecoder(self):
+        for corruption in (0,0.1):
+            results = benchDecoder(frames=300,corruption=corruption)
+            assert results['framesPerSecond'] > 0 and results['bytesPerSecond'] > results['framesPerSecond']
+
+    def testEstimateArea(self):
+        estimated = []
+        estimateArea = Tracker.estimateArea
+        def recordingEstimateArea(tracker,tagId,rssi):
+            estimated.append(tagId)
+            return estimateArea(tracker,tagId,rssi)
+        Tracker.estimateArea = recordingEstimateArea
+        try:
+            results = benchEstimateArea(gridSizes=(5,),readerCounts=(3,),tagCounts=(2,),repeat=1)
+        finally:
+            Tracker.estimateArea = estimateArea
+        assert results.keys() == ['estimateArea.grid5.readers3.tags2.ms']
+        assert sorted(estimated) == [1000,1001] # Every tracked tag is timed
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
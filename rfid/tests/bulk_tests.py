@@ -0,0 +1,96 @@
+'''
+Created on Oct 18, 2026
+
+'''
+import os
+import random
+import tempfile
+import unittest
+
+from rfid.bulk import findFrames,getPackets,getTagReadings,mapFile
+from rfid.decoder import Decoder,Packet,PacketDecodedListener
+
+TAG_PACKET = bytearray('552000000106212a2a3101114243900069'
+                       '94a21eacac000f2aef3300683220510100'
+                       '00110a0d32'.decode('hex'))
+
+class Collector(PacketDecodedListener):
+    def __init__(self):
+        self.packets = []
+
+    def packetReady(self, event):
+        self.packets.append(event.getPacket())
+
+def makeStream(n,seed=0):
+    """ Returns n packets with some garbage and corrupted bytes mixed in """
+    rand = random.Random(seed)
+    data = bytearray()
+    for i in range(n):
+        if rand.random()<0.5:
+            pkt = bytearray(TAG_PACKET)
+        else:
+            pkt = Packet([0x55,0x01,0x00,0x00,rand.randint(1,253),0x03,rand.choice([0x00,0x55,0xAA])])
+        if rand.random()<0.05:
+            pkt[rand.randint(0,len(pkt)-1)] = rand.randint(0,255)
+        if rand.random()<0.05:
+            data.extend(rand.choice([0xAA,0x55,0x00]) for j in range(rand.randint(1,5)))
+        data.extend(pkt)
+    return data
+
+class BulkTests(unittest.TestCase):
+
+    def decode(self,data):
+        decoder = Decoder()
+        collector = Collector()
+        decoder.addPacketDecodedEventListener(collector)
+        decoder.decode(bytearray(data))
+        return collector.packets
+
+    def testMatchesDecoder(self):
+        data = makeStream(5000)
+        offsets,valid = findFrames(data)
+        assert list(getPackets(data,offsets,valid)) == self.decode(data)
+
+    def testBlocks(self):
+        data = makeStream(2000,seed=1)
+        offsets,valid = findFrames(data)
+        for blockSize in (1,39,1000):
+            o,v = findFrames(data,blockSize=blockSize)
+            assert (o == offsets).all() and (v == valid).all(),"Block size %s doesn't match"%blockSize
+
+    def testTruncated(self):
+        offsets,valid = findFrames(TAG_PACKET*2+TAG_PACKET[:20])
+        assert list(offsets) == [0,len(TAG_PACKET),2*len(TAG_PACKET)]
+        assert list(valid) == [True,True,False]
+
+    def testTagReadings(self):
+        data = makeStream(500,seed=2)
+        offsets,valid = findFrames(data)
+        readings = getTagReadings(data,offsets,valid)
+        tags = [pkt.getDecoding()['data']['tag'] for pkt in getPackets(data,offsets,valid) if pkt.isTagPacket()]
+        assert len(readings) == len(tags)
+        assert list(readings['tagId']) == [tag['id'] for tag in tags]
+        assert list(readings['rssi']) == [tag['rssi'] for tag in tags]
+        assert list(readings['siteCode']) == [tag['site code'] for tag in tags]
+        assert list(readings['age']) == [tag['age'] for tag in tags]
+
+    def testEmpty(self):
+        offsets,valid = findFrames(bytearray())
+        assert len(offsets) == 0 and len(valid) == 0
+
+    def testMappedFile(self):
+        fd,path = tempfile.mkstemp()
+        try:
+            os.write(fd,str(TAG_PACKET*10))
+            os.close(fd)
+            data = mapFile(path)
+            offsets,valid = findFrames(data)
+            assert valid.sum() == 10
+            data.close()
+        finally:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
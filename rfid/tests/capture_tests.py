@@ -0,0 +1,142 @@
+'''
+Created on Oct 18, 2026
+
+'''
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from rfid.capture import CaptureWriter,CaptureFile,CaptureReplay,CaptureNetwork,HEADER,MAGIC,RECORD
+from rfid.decoder import Packet,PacketDecodedListener
+from rfid.serial_port_monitor import SerialPortMonitor
+
+TAG_PACKET = bytearray('552000000106212a2a3101114243900069'
+                       '94a21eacac000f2aef3300683220510100'
+                       '00110a0d32'.decode('hex'))
+
+class Collector(PacketDecodedListener):
+    def __init__(self):
+        self.packets = []
+
+    def packetReady(self, event):
+        self.packets.append(event.getPacket())
+
+class CaptureTests(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir,'test.cap')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def writeCapture(self,chunks,gap=0.0):
+        w = CaptureWriter(self.path)
+        t = 100.0
+        for chunk in chunks:
+            w.write(chunk,t)
+            t += gap
+        w.close()
+
+    def testRecords(self):
+        self.writeCapture([TAG_PACKET[:10],TAG_PACKET[10:]],gap=0.5)
+        records = list(CaptureFile(self.path))
+        assert [t for t,data in records] == [100.0,100.5]
+        assert ''.join(data for t,data in records) == str(TAG_PACKET)
+
+    def testAppend(self):
+        self.writeCapture([TAG_PACKET])
+        self.writeCapture([TAG_PACKET])
+        assert len(list(CaptureFile(self.path))) == 2
+
+    def testTruncated(self):
+        self.writeCapture([TAG_PACKET,TAG_PACKET])
+        with open(self.path,'r+b') as f:
+            f.truncate(os.path.getsize(self.path)-5)
+        assert len(list(CaptureFile(self.path))) == 1
+
+    def writeSession(self,wallTime,monotonicTime,chunks,gap=0.0):
+        """ Appends a session by hand, eg. recorded after the monotonic clock was reset """
+        with open(self.path,'ab') as f:
+            f.write(HEADER.pack(MAGIC,wallTime,monotonicTime))
+            t = monotonicTime
+            for chunk in chunks:
+                f.write(RECORD.pack(t,len(chunk))+str(chunk))
+                t += gap
+
+    def testSessions(self):
+        self.writeSession(1000.0,100.0,[TAG_PACKET]*2,gap=1)
+        self.writeSession(5000.0,5.0,[TAG_PACKET]*2,gap=1) # After a reboot
+        capture = CaptureFile(self.path)
+        assert [capture.toWallTime(t) for t,data in capture] == [1000.0,1001.0,5000.0,5001.0]
+        assert [data for t,data in capture] == [str(TAG_PACKET)]*4
+        capture.close()
+
+    def testAppendStartsSession(self):
+        self.writeCapture([TAG_PACKET])
+        self.writeCapture([TAG_PACKET])
+        capture = CaptureFile(self.path)
+        sessions = [session for session,t,data in capture.records()]
+        assert len(sessions) == 2 and sessions[0] is not sessions[1]
+        capture.close()
+
+    def testAppendAfterTruncated(self):
+        self.writeCapture([TAG_PACKET,TAG_PACKET])
+        with open(self.path,'r+b') as f:
+            f.truncate(os.path.getsize(self.path)-5)
+        self.writeCapture([TAG_PACKET])
+        assert [data for t,data in CaptureFile(self.path)] == [str(TAG_PACKET)]*2
+
+    def testEmpty(self):
+        open(self.path,'w').close()
+        capture = CaptureFile(self.path)
+        assert list(capture) == [] and capture.wallTime is None
+        capture.close()
+        self.writeCapture([TAG_PACKET])
+        assert len(list(CaptureFile(self.path))) == 1
+
+    def testRealTimeReplaySkipsGapBetweenSessions(self):
+        self.writeSession(1000.0,100.0,[TAG_PACKET]*3,gap=0.05)
+        self.writeSession(9000.0,100.0,[TAG_PACKET]*3,gap=0.05)
+        replay = CaptureReplay(self.path,speed=1.0)
+        t = time.time()
+        replay.run()
+        assert 0.2 <= time.time()-t < 2
+        replay.stop()
+
+    def testReplay(self):
+        self.writeCapture([TAG_PACKET[:7],TAG_PACKET[7:]+TAG_PACKET]*100)
+        nw = CaptureNetwork(self.path)
+        collector = Collector()
+        nw.getDecoder().addPacketDecodedEventListener(collector)
+        nw.getMonitor().run()
+        assert collector.packets == [TAG_PACKET]*200
+        nw.stop()
+
+    def testRealTimeReplay(self):
+        self.writeCapture([TAG_PACKET]*3,gap=0.05)
+        replay = CaptureReplay(self.path,speed=1.0)
+        t = time.time()
+        replay.run()
+        assert time.time()-t >= 0.1
+        replay.stop()
+
+    def testMonitorCapture(self):
+        master,slave = os.openpty()
+        monitor = SerialPortMonitor(port=os.ttyname(slave),capture=CaptureWriter(self.path))
+        monitor.start()
+        try:
+            os.write(master,str(TAG_PACKET))
+            time.sleep(0.2)
+        finally:
+            monitor.stop()
+            os.close(master)
+            os.close(slave)
+        assert ''.join(data for t,data in CaptureFile(self.path)) == str(TAG_PACKET)
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
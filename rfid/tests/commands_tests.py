@@ -0,0 +1,72 @@
+'''
+Created on Oct 18, 2026
+
+'''
+import unittest
+
+from rfid.commands import COMMANDS
+from rfid.decoder import Packet
+from rfid.reader import Reader,CMDPacket
+
+class EchoNetwork(object):
+    """ Replies to every command with the given data """
+    def __init__(self,data):
+        self.data = data
+        self.sent = []
+
+    def getId(self):
+        return 0x02
+
+    def ask(self,packet,**kwargs):
+        self.sent.append(packet)
+        return Packet([0x55,len(self.data),packet.getNetworkId(),packet.getReaderId(),packet.getNodeId(),packet.getCommand()]+self.data)
+
+class CommandsTests(unittest.TestCase):
+
+    def testAllCommands(self):
+        assert sorted(COMMANDS.keys()) == sorted(Packet.CMD_MAP.keys())
+
+    def testEncode(self):
+        pkt = COMMANDS[0x09].encode(0x02,0x00,0x05,1,2,3)
+        assert pkt == Packet([0xAA,0x03,0x02,0x00,0x05,0x09,1,2,3])
+        assert COMMANDS[0x03].encode(0x00,0x00,0x01) == Packet([0xAA,0x00,0x00,0x00,0x01,0x03])
+
+    def testDecoding(self):
+        def decoding(cmd,*data):
+            return Packet([0x55,len(data),0x00,0x00,0x01,cmd]+list(data)).getDecoding()['data']
+        assert decoding(0x03,0x02) == {'Error Number':'2-Tag Table underflow error'}
+        assert decoding(0x03,0x20) == {'Error Number':'32-Unknown'}
+        assert decoding(0x06,0x02) == {'Error Number':'2-Tag Table underflow error'}
+        assert decoding(0x08,0x30) == {'RSSI':0x30}
+        assert decoding(0x0A,1,2,3) == {'Site1':1,'Site2':2,'Site3':3}
+        assert decoding(0x0C,1) == {'Gain':'1-High Gain Mode - Long range reader'}
+        assert decoding(0x0F,0x01,0x02) == {'Count':0x0102}
+        assert decoding(0x10,120) == {'Voltage':12.0}
+        assert decoding(0xFF,11,22,23,20)['RF Module Firmware Version'] == 2.2
+        assert decoding(0x11,0x00) == "Not implemented!"
+        assert decoding(0x0F,0x01).startswith("Invalid")
+        # A command packet uses the request layout
+        assert COMMANDS[0x07].encode(0,0,1,0x40).getDecoding()['data'] == {'RSSI':0x40}
+
+    def testRssiNames(self):
+        """ The Reader sets the RSSI rejection value with 0x07 and reads it with 0x08 """
+        assert COMMANDS[0x07].name == "Set RSSI Value" and COMMANDS[0x08].name == "Get RSSI Value"
+        assert COMMANDS[0x07].request.size == 1 and COMMANDS[0x08].request.size == 0
+
+    def testReader(self):
+        nw = EchoNetwork([0x01,0x02,0x03])
+        r = Reader(nw,id=5)
+        assert r.getSiteCode() == bytearray([1,2,3])
+        r.setSiteCode(4,5,6)
+        assert nw.sent[-1] == CMDPacket(r,0x09,4,5,6)
+        assert nw.sent[-1].getData() == bytearray([4,5,6])
+        assert nw.sent[-1].getNodeId() == 5 and nw.sent[-1].getNetworkId() == 0x02
+        nw.data = [0x00,0x10]
+        assert r.getNumInvalidTags() == 0x10
+        nw.data = [0x00]
+        assert r.getAlarmFilter() == 0
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -0,0 +1,189 @@
+'''
+Created on Oct 18, 2026
+
+'''
+import os
+import time
+import unittest
+
+from rfid.decoder import Decoder,FrameEvent,Packet,PacketDecodedListener
+from rfid.dispatch import Overflow
+from rfid.network import Network
+from rfid.serial_port_monitor import SerialEvent
+from rfid.tag import TagReadingListener
+
+# A tag transmission from a reader in auto polling mode
+TAG_PACKET = bytearray('552000000106212a2a3101114243900069'
+                       '94a21eacac000f2aef3300683220510100'
+                       '00110a0d32'.decode('hex'))
+
+class Collector(PacketDecodedListener):
+    def __init__(self):
+        self.packets = []
+
+    def packetReady(self, event):
+        self.packets.append(event.getPacket())
+
+class ReadingCollector(TagReadingListener):
+    def __init__(self):
+        self.readings = []
+
+    def tagRead(self, reading):
+        self.readings.append(reading)
+
+class EventCollector(PacketDecodedListener):
+    def __init__(self):
+        self.events = []
+
+    def packetReady(self, event):
+        self.events.append(event.keep())
+
+class Peeker(PacketDecodedListener):
+    """ Only looks at the event while it's fired """
+    def __init__(self):
+        self.events = set()
+        self.commands = []
+
+    def packetReady(self, event):
+        self.events.add(id(event))
+        self.commands.append((event.getNodeId(),event.getCommand()))
+
+class DecoderTests(unittest.TestCase):
+
+    def setUp(self):
+        self.decoder = Decoder()
+        self.collector = Collector()
+        self.decoder.addPacketDecodedEventListener(self.collector)
+
+    def testSinglePacket(self):
+        self.decoder.decode(bytearray(TAG_PACKET))
+        assert len(self.collector.packets) == 1
+        assert self.collector.packets[0] == TAG_PACKET
+
+    def testSplitPacket(self):
+        for b in TAG_PACKET:
+            self.decoder.decode(bytearray([b]))
+        assert self.collector.packets == [TAG_PACKET]
+
+    def testGarbageBetweenPackets(self):
+        ping = Packet([0x55,0x01,0x00,0x00,0x02,0x03,0x00])
+        data = bytearray('\xff*\xff*')+TAG_PACKET+bytearray('\x00\x13')+ping
+        self.decoder.decode(data)
+        assert self.collector.packets == [TAG_PACKET,ping]
+
+    def testChecksumFailureResyncs(self):
+        bad = bytearray(TAG_PACKET)
+        bad[-1] ^= 0xFF
+        self.decoder.decode(bad+TAG_PACKET)
+        assert self.collector.packets == [TAG_PACKET]
+
+    def testBurst(self):
+        """ The old recursive decoder dropped packets after 100 steps per chunk """
+        self.decoder.decode(TAG_PACKET*1000)
+        assert len(self.collector.packets) == 1000
+
+    def testBufferIsBounded(self):
+        for i in range(1000):
+            self.decoder.decode(TAG_PACKET*3+TAG_PACKET[:10])
+            assert len(self.decoder._buffer) < Decoder.MAX_PACKET_SIZE
+        assert len(self.collector.packets) == 3000
+
+    def testTagReadings(self):
+        readings = ReadingCollector()
+        self.decoder.addTagReadingListener(readings)
+        self.decoder.decode(TAG_PACKET+Packet([0x55,0x01,0x00,0x00,0x02,0x03,0x00]))
+        assert len(readings.readings) == 1
+        reading = readings.readings[0]
+        tag = Packet(TAG_PACKET).getDecoding()['data']['tag']
+        assert (reading.tagId,reading.rssi,reading.counter,reading.siteCode,reading.age) == (tag['id'],tag['rssi'],tag['counter'],tag['site code'],tag['age'])
+        assert (reading.alarmByte,reading.readerRssi,reading.nodeId) == (tag['alarm byte'],tag['reader RSSI'],0x01)
+        assert len(self.collector.packets) == 2
+
+    def testQueueOverflow(self):
+        decoder = Decoder(maxsize=5,overflow=Overflow.DROP_OLDEST)
+        decoder.addPacketDecodedEventListener(self.collector)
+        for i in range(8):
+            decoder.dataReceived(SerialEvent(None,bytearray(TAG_PACKET),None))
+        assert decoder.getQueueDepth() == 5 and decoder.getDroppedCount() == 3
+        decoder.start()
+        decoder.stop()
+        assert len(self.collector.packets) == 5
+
+    def testEventsHaveTheTimeTheDataWasRead(self):
+        decoder = Decoder()
+        events = EventCollector()
+        decoder.addPacketDecodedEventListener(events)
+        decoder.dataReceived(SerialEvent(None,bytearray(TAG_PACKET[:10]),None,100.0))
+        decoder.dataReceived(SerialEvent(None,bytearray(TAG_PACKET[10:]+TAG_PACKET),None,101.0))
+        time.sleep(0.05) # Queued for a while before it's decoded
+        decoder.start()
+        decoder.stop()
+        assert [e.getTime() for e in events.events] == [101.0,101.0]
+
+    def testEventIsReused(self):
+        decoder = Decoder()
+        peeker = Peeker()
+        decoder.addPacketDecodedEventListener(peeker)
+        ping = Packet([0x55,0x01,0x00,0x00,0x02,0x03,0x00])
+        decoder.decode(TAG_PACKET+ping+TAG_PACKET)
+        assert len(peeker.events) == 1
+        assert peeker.commands == [(0x01,0x06),(0x02,0x03),(0x01,0x06)]
+        assert decoder._event._packet is None # Never copied
+
+    def testKeptEventsOutliveTheBuffer(self):
+        events = EventCollector()
+        self.decoder.addPacketDecodedEventListener(events)
+        ping = Packet([0x55,0x01,0x00,0x00,0x02,0x03,0x00])
+        self.decoder.decode(TAG_PACKET+ping[:3])
+        self.decoder.decode(ping[3:]+TAG_PACKET[:20])
+        self.decoder.decode('\x00'*50) # Overwrites the buffer
+        assert [e.getPacket() for e in events.events] == [TAG_PACKET,ping]
+        assert events.events[0] is not events.events[1]
+        assert events.events[0].getTagReading().nodeId == 0x01 and events.events[1].getTagReading() is None
+        assert events.events[1].getReaderKey() == 0x02 and events.events[1].getCommand() == 0x03
+
+
+    def testKeep(self):
+        kept = []
+        class Keeper(PacketDecodedListener):
+            def packetReady(self, event):
+                kept.append(event.keep())
+        decoder = Decoder()
+        decoder.addPacketDecodedEventListener(Keeper())
+        ping = Packet([0x55,0x01,0x00,0x00,0x02,0x03,0x00])
+        decoder.decode(TAG_PACKET+ping)
+        event = decoder._event
+        decoder.decode(ping)
+        assert decoder._event is event and event._packet is None # Reused, never copied
+        assert [e.getPacket() for e in kept] == [TAG_PACKET,ping,ping]
+        assert not any(isinstance(e,FrameEvent) for e in kept)
+        assert kept[0].getTagReading().nodeId == 0x01
+
+class NetworkDecoderTests(unittest.TestCase):
+
+    def setUp(self):
+        self.master,self.slave = os.openpty()
+        self.logger = EventCollector()
+        # The logger is wrapped in a QueuedListener like the default one
+        self.nw = Network(0,self.logger,port=os.ttyname(self.slave),baudrate=115200)
+
+    def tearDown(self):
+        self.nw.stop()
+        os.close(self.master)
+        os.close(self.slave)
+
+    def testEventsAreReused(self):
+        ping = Packet([0x55,0x01,0x00,0x00,0x02,0x03,0x00])
+        os.write(self.master,str(TAG_PACKET+ping))
+        time.sleep(0.2)
+        event = self.nw.getDecoder()._event
+        os.write(self.master,str(ping+TAG_PACKET))
+        time.sleep(0.2)
+        # The queued logger keeps its own copies while the decoder reuses its event
+        assert self.nw.getDecoder()._event is event
+        assert [e.getPacket() for e in self.logger.events] == [TAG_PACKET,ping,ping,TAG_PACKET]
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -0,0 +1,79 @@
+'''
+Created on Oct 18, 2026
+
+'''
+import time
+import unittest
+
+from rfid.decoder import Decoder,Packet,PacketDecodedListener
+from rfid.dedupe import Deduplicator
+
+TAG_PACKET = bytearray('552000000106212a2a3101114243900069'
+                       '94a21eacac000f2aef3300683220510100'
+                       '00110a0d32'.decode('hex'))
+
+def tagPacket(nodeId,counter,rssi=0x60):
+    """ TAG_PACKET from another reader with another counter and RSSI """
+    data = bytearray(TAG_PACKET[:-1])
+    data[4],data[10],data[28] = nodeId,counter,rssi
+    return Packet(data)
+
+class FakeNetwork(object):
+    def __init__(self):
+        self.decoder = Decoder(inline=True)
+
+    def getDecoder(self):
+        return self.decoder
+
+class EventCollector(PacketDecodedListener):
+    def __init__(self):
+        self.events = []
+
+    def packetReady(self, event):
+        self.events.append(event.keep())
+
+class DedupeTests(unittest.TestCase):
+
+    def setUp(self):
+        self.nw = FakeNetwork()
+        self.collector = EventCollector()
+
+    def start(self,**kwargs):
+        self.dedupe = Deduplicator(self.nw,**kwargs)
+        self.dedupe.addPacketDecodedEventListener(self.collector)
+
+    def testRepeatsAreDropped(self):
+        self.start(groupWindow=0)
+        ping = Packet([0x55,0x01,0x00,0x00,0x02,0x03,0x00])
+        self.nw.decoder.decode(tagPacket(1,5)+tagPacket(1,5)+ping+tagPacket(1,6)+tagPacket(1,5))
+        assert [e.getPacket().getCommand() for e in self.collector.events] == [0x06,0x03,0x06]
+        assert [e.getTagReading().counter for e in self.collector.events[::2]] == [5,6]
+        assert self.dedupe.getDuplicateCount() == 2 and self.dedupe.getGroupCount() == 2
+
+    def testExpiry(self):
+        self.start(ttl=0.05,groupWindow=0)
+        self.nw.decoder.decode(tagPacket(1,5))
+        time.sleep(0.1)
+        self.nw.decoder.decode(tagPacket(2,6)) # Evicts the first
+        assert self.dedupe.getSeenCount() == 1
+        self.nw.decoder.decode(tagPacket(1,5))
+        assert len(self.collector.events) == 3 and self.dedupe.getDuplicateCount() == 0
+
+    def testGroups(self):
+        self.start(groupWindow=0.05)
+        self.nw.decoder.decode(tagPacket(1,5,0x60)+tagPacket(2,5,0x50)+tagPacket(2,5,0x50)+tagPacket(3,5,0x40)+tagPacket(1,6))
+        assert self.collector.events == [] # Held for the window
+        time.sleep(0.2)
+        events = self.collector.events
+        assert len(events) == 4 and self.dedupe.getDuplicateCount() == 1
+        group = events[0].getGroup()
+        assert all(e.getGroup() is group for e in events[:3])
+        assert group.getRssi() == {1:0x60,2:0x50,3:0x40}
+        assert [e.isLastInGroup() for e in events] == [False,False,True,True]
+        assert [e.getReaderKey() for e in events] == [1,2,3,1]
+        assert events[3].getGroup().counter == 6 and len(events[3].getGroup()) == 1
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -0,0 +1,140 @@
+'''
+Created on Oct 18, 2026
+
+'''
+import threading
+import time
+import unittest
+
+from rfid.decoder import Decoder,Packet,PacketDecodedListener
+from rfid.dispatch import BoundedQueue,QueuedListener,Overflow
+from rfid.network import Network
+from rfid.serial_port_monitor import SerialPortListener
+from rfid.simulator import ReaderNetworkSimulator
+
+class BlockedListener(PacketDecodedListener,SerialPortListener):
+    """ Doesn't return from an event until it's released """
+    def __init__(self):
+        self.events = []
+        self.release = threading.Event()
+
+    def packetReady(self, event):
+        self.release.wait()
+        self.events.append(event)
+
+    def dataReceived(self, event):
+        self.release.wait()
+
+class BoundedQueueTests(unittest.TestCase):
+
+    def drain(self,queue):
+        items = []
+        while queue.qsize():
+            items.append(queue.get())
+        return items
+
+    def testLatest(self):
+        queue = BoundedQueue(3,Overflow.LATEST,key=lambda item:item[0])
+        for item in [('a',1),('b',1),('a',2),('c',1),('a',3),('d',1)]:
+            queue.put(item)
+        # ('c',1) pushed out ('a',1), ('a',3) replaced ('a',2) and ('d',1) pushed out ('b',1)
+        assert self.drain(queue) == [('a',3),('c',1),('d',1)]
+        assert queue.getDroppedCount() == 3 and queue.getMaxDepth() == 3
+
+    def testLatestWithoutKey(self):
+        queue = BoundedQueue(2,Overflow.LATEST,key=lambda item:None)
+        for i in range(4):
+            queue.put(i)
+        assert self.drain(queue) == [2,3]
+
+    def testForce(self):
+        queue = BoundedQueue(1,Overflow.BLOCK)
+        queue.put(1)
+        queue.put('shutdown',force=True)
+        assert self.drain(queue) == [1,'shutdown']
+
+    def testUnbounded(self):
+        queue = BoundedQueue()
+        for i in range(5000):
+            queue.put(i)
+        assert queue.qsize() == 5000 and queue.getDroppedCount() == 0
+
+class DispatchTests(unittest.TestCase):
+
+    def fill(self,overflow,count=10):
+        listener = BlockedListener()
+        queued = QueuedListener(listener,maxsize=3,overflow=overflow)
+        queued.packetReady(0)
+        time.sleep(0.05) # Let the worker take the first one
+        for i in range(1,count):
+            queued.packetReady(i)
+        return listener,queued
+
+    def testDropOldest(self):
+        listener,queued = self.fill(Overflow.DROP_OLDEST)
+        # The worker holds the first event, the queue keeps the last 3
+        assert queued.getDroppedCount() == 6 and queued.getQueueDepth() == 3
+        listener.release.set()
+        queued.stop()
+        assert listener.events == [0,7,8,9]
+        assert queued.getDeliveredCount() == 4
+
+    def testDropNewest(self):
+        listener,queued = self.fill(Overflow.DROP_NEWEST)
+        assert queued.getDroppedCount() == 6
+        listener.release.set()
+        queued.stop()
+        assert listener.events == [0,1,2,3]
+
+    def testBlock(self):
+        listener = BlockedListener()
+        queued = QueuedListener(listener,maxsize=3,overflow=Overflow.BLOCK)
+        threading.Timer(0.1,listener.release.set).start()
+        t = time.time()
+        for i in range(10):
+            queued.packetReady(i)
+        assert time.time()-t >= 0.1
+        queued.stop()
+        assert listener.events == range(10) and queued.getDroppedCount() == 0
+
+    def testErrorsDontStopWorker(self):
+        class Failing(PacketDecodedListener):
+            events = []
+            def packetReady(self, event):
+                self.events.append(event)
+                raise ValueError(event)
+        listener = Failing()
+        queued = QueuedListener(listener)
+        queued.packetReady(1)
+        queued.packetReady(2)
+        queued.stop()
+        assert listener.events == [1,2]
+
+    def testDecoderNotStalled(self):
+        listener = BlockedListener()
+        decoder = Decoder(inline=True)
+        decoder.addPacketDecodedEventListener(QueuedListener(listener,maxsize=10))
+        pkt = Packet([0x55,0x01,0x00,0x00,0x01,0x03,0x00])
+        t = time.time()
+        decoder.decode(pkt*100)
+        assert time.time()-t < 1
+        listener.release.set()
+
+    def testAskNotDelayedByLogger(self):
+        sim = ReaderNetworkSimulator(numReaders=1)
+        sim.start()
+        logger = BlockedListener()
+        nw = Network(0,logger,port=sim.getPort(),baudrate=115200,loggerQueueSize=5)
+        try:
+            for i in range(20):
+                assert nw.pingReader(1,timeout=0.5) is not None
+            assert nw._logger.getDroppedCount() > 0
+        finally:
+            logger.release.set()
+            nw.stop()
+            sim.stop()
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -0,0 +1,93 @@
+'''
+Created on Oct 18, 2026
+
+'''
+import time
+import unittest
+
+from rfid.governor import TrafficGovernor
+from rfid.network import Network
+from rfid.simulator import ReaderNetworkSimulator
+
+class FakeQueue(object):
+    def __init__(self,depth):
+        self.depth = depth
+
+    def getQueueDepth(self):
+        return self.depth
+
+class GovernorTests(unittest.TestCase):
+
+    def setUp(self):
+        self.sim = ReaderNetworkSimulator(numReaders=2,numTags=20,tagInterval=0.4,area=(5,5),seed=1)
+        self.sim.start()
+        self.nw = Network(0,None,port=self.sim.getPort(),baudrate=115200,inlineDecoding=True)
+        self.nw.rescan(nodeIds=range(1,4))
+
+    def tearDown(self):
+        self.nw.stop()
+        self.sim.stop()
+
+    def testRaiseAndLower(self):
+        governor = TrafficGovernor(self.nw,maxRate=10,step=40,siteCode=(0x00,0x0F,0x2A))
+        self.nw.startAutoPolling()
+        time.sleep(0.5)
+        assert governor.update() > 1
+        time.sleep(0.2)
+        for reader in self.sim.readers.values():
+            assert reader.rssiValue == 40 and reader.siteCode == (0x00,0x0F,0x2A)
+        changes = governor.getChanges()
+        assert sorted((c.readerKey,c.setting,c.old,c.new) for c in changes) == [
+            (1,'rssi',0,40),(1,'siteCode',None,(0,15,42)),(2,'rssi',0,40),(2,'siteCode',None,(0,15,42))]
+        assert all(c.confirmed for c in changes)
+
+        # Without traffic the thresholds come back down
+        self.nw.stopAutoPolling()
+        governor.update() # Still counts the traffic from before
+        raised = governor.getThreshold(1)
+        for i in range(raised/40):
+            time.sleep(0.1)
+            assert governor.update() == 0
+        time.sleep(0.2)
+        assert [r.rssiValue for r in self.sim.readers.values()] == [0,0]
+        assert governor.getThreshold(1) == 0 and governor.getChanges()[-1].new == 0
+        governor.stop()
+
+    def testStartsFromReadersThreshold(self):
+        self.sim.readers[1].rssiValue = 0x40 # eg. provisioned
+        queue = FakeQueue(900)
+        governor = TrafficGovernor(self.nw,maxRate=1000,queues=[queue],maxDepth=1000,step=16)
+        governor.update()
+        time.sleep(0.2)
+        assert [r.rssiValue for r in self.sim.readers.values()] == [0x50,16]
+        queue.depth = 0
+        for i in range(3):
+            governor.update()
+        time.sleep(0.2)
+        # Never below where they started
+        assert [r.rssiValue for r in self.sim.readers.values()] == [0x40,0]
+        assert [(c.old,c.new) for c in governor.getChanges() if c.readerKey == 1] == [(0x40,0x50),(0x50,0x40)]
+        governor.stop()
+
+    def testGivenThresholds(self):
+        governor = TrafficGovernor(self.nw,maxRate=1000,queues=[FakeQueue(0)],thresholds={1:0x30,2:0x20})
+        assert governor.getThreshold(1) == 0x30
+        governor.update()
+        assert governor.getChanges() == []
+        governor.stop()
+
+    def testQueueDepth(self):
+        queue = FakeQueue(900)
+        governor = TrafficGovernor(self.nw,maxRate=1000,queues=[queue],maxDepth=1000)
+        assert governor.update() == 0.9
+        time.sleep(0.2)
+        assert [r.rssiValue for r in self.sim.readers.values()] == [5,5]
+        queue.depth = 500
+        governor.update()
+        assert governor.getThreshold(2) == 5 # In between low and high nothing changes
+        governor.stop()
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
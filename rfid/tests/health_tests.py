@@ -0,0 +1,56 @@
+'''
+Created on Oct 18, 2026
+
+'''
+import time
+import unittest
+
+import numpy as np
+
+from rfid.health import HealthPoller,HealthSeries
+from rfid.network import Network
+from rfid.simulator import ReaderNetworkSimulator
+
+class HealthSeriesTests(unittest.TestCase):
+
+    def testRingBuffer(self):
+        series = HealthSeries(size=3)
+        assert series.getLast() is None and len(series.getSamples()) == 0
+        for i in range(5):
+            series.append(i,voltage=12,invalidTags=i)
+        assert len(series) == 3
+        assert list(series.getSamples()['time']) == [2,3,4]
+        assert series.getLast()['invalidTags'] == 4 and np.isnan(series.getLast()['noise'])
+
+class HealthPollerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.sim = ReaderNetworkSimulator(numReaders=3,replyDelay=0.01,seed=1)
+        self.sim.start()
+        self.nw = Network(0,None,port=self.sim.getPort(),baudrate=115200,inlineDecoding=True)
+        self.nw.rescan(nodeIds=range(1,5))
+
+    def tearDown(self):
+        self.nw.stop()
+        self.sim.stop()
+
+    def testPoll(self):
+        self.sim.readers[2].invalidTags = 7
+        self.sim.readers[2].voltage = 118
+        poller = HealthPoller(self.nw,interval=0.2,budget=0.25)
+        poller.start()
+        time.sleep(1)
+        poller.stop()
+        samples = poller.getSeries(2).getSamples()
+        assert len(samples) >= 2
+        assert samples[0]['voltage'] == np.float32(11.8) and samples[0]['invalidTags'] == 7
+        assert samples[1]['invalidTags'] == 0 # The count is since the last query
+        assert poller.getVersion(1) == self.nw.getReaders()[0].getVersionInformation()
+        assert all(poller.getSeries(i) is not None for i in (1,2,3))
+        # Some slack for the time spent waiting for the first replies
+        assert poller.getBudgetUsed() < 0.35,poller.getBudgetUsed()
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -0,0 +1,62 @@
+'''
+Created on Oct 18, 2026
+
+'''
+import logging
+import StringIO
+import unittest
+
+from rfid.logs import QueueHandler,setup
+
+class Expensive(object):
+    """ Counts how often it's formatted """
+    count = 0
+    def __str__(self):
+        Expensive.count += 1
+        return "expensive"
+
+class LogsTests(unittest.TestCase):
+
+    def setUp(self):
+        self.stream = StringIO.StringIO()
+        self.log = logging.getLogger('rfid.tests')
+
+    def tearDown(self):
+        logger = logging.getLogger('rfid')
+        logger.removeHandler(self.handler)
+        logger.setLevel(logging.NOTSET)
+
+    def testQueued(self):
+        self.handler = setup(logging.INFO,self.stream)
+        assert isinstance(self.handler,QueueHandler)
+        args = [1]
+        self.log.info("Reader %s found tag %s",args,2)
+        args.append(3) # Changing an argument after logging doesn't change the message
+        self.log.debug("Not shown")
+        self.handler.close()
+        lines = self.stream.getvalue().splitlines()
+        assert len(lines) == 1
+        assert lines[0].endswith("[rfid.tests][INFO] Reader [1] found tag 2")
+
+    def testDisabledLevelsAreNotFormatted(self):
+        self.handler = setup(logging.INFO,self.stream,queued=False)
+        Expensive.count = 0
+        for i in range(100):
+            self.log.debug("%s",Expensive())
+        self.log.info("%s",Expensive())
+        assert Expensive.count == 1
+        assert self.stream.getvalue().strip().endswith("expensive")
+
+    def testExceptions(self):
+        self.handler = setup(logging.INFO,self.stream)
+        try:
+            raise ValueError("bad packet")
+        except ValueError:
+            self.log.exception("Failed")
+        self.handler.close()
+        assert "ValueError: bad packet" in self.stream.getvalue()
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
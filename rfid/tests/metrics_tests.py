@@ -0,0 +1,123 @@
+'''
+Created on Oct 18, 2026
+
+'''
+import gc
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+import urllib2
+
+from rfid.decoder import Decoder,Packet
+from rfid.metrics import Registry,MetricsServer,getRegistry,writeFile
+
+TAG_PACKET = bytearray('552000000106212a2a3101114243900069'
+                       '94a21eacac000f2aef3300683220510100'
+                       '00110a0d32'.decode('hex'))
+
+class MetricsTests(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = Registry()
+
+    def testCounter(self):
+        c = self.registry.counter('frames_total','Frames','command')
+        c.inc(label=6)
+        c.inc(2,label=6)
+        c.inc(label=3)
+        assert self.registry.counter('frames_total','Frames','command') is c
+        assert c.get(6) == 3 and self.registry.snapshot() == {'frames_total':{6:3,3:1}}
+        assert 'frames_total{command="6"} 3.0' in self.registry.toPrometheus()
+
+    def testHistogram(self):
+        h = self.registry.histogram('latency_seconds','Latency',buckets=(0.1,1))
+        for value in (0.05,0.5,0.5,5):
+            h.observe(value)
+        assert h.getCount() == 4 and h.getSum() == 6.05
+        assert h.getPercentile(0.5) == 1 and h.getPercentile(1) == float('inf')
+        text = self.registry.toPrometheus()
+        for line in ['# TYPE latency_seconds histogram','latency_seconds_bucket{le="0.1"} 1.0',
+                     'latency_seconds_bucket{le="1.0"} 3.0','latency_seconds_bucket{le="+Inf"} 4.0',
+                     'latency_seconds_count 4.0']:
+            assert line in text.splitlines(),line
+
+    def testConcurrentUpdates(self):
+        c = self.registry.counter('frames_total','Frames','command')
+        h = self.registry.histogram('latency_seconds','Latency')
+        interval = sys.getcheckinterval()
+        sys.setcheckinterval(1) # Switch threads as often as possible
+        def update():
+            for i in range(20000):
+                c.inc(label=i%2)
+                h.observe(0.001)
+        threads = [threading.Thread(target=update) for i in range(4)]
+        try:
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        finally:
+            sys.setcheckinterval(interval)
+        assert c.get(0)+c.get(1) == 80000 and h.getCount() == 80000
+
+    def testGauge(self):
+        depth = [5]
+        g = self.registry.gauge('depth','Depth','queue')
+        g.set(lambda:depth[0],'decoder')
+        depth[0] = 7
+        assert g.get('decoder') == 7
+        g.remove('decoder')
+        assert 'depth{' not in self.registry.toPrometheus()
+
+    def testCallbackCounter(self):
+        dropped = [3]
+        c = self.registry.callbackCounter('dropped_total','Dropped','queue')
+        c.set(lambda:dropped[0],'decoder')
+        assert c.get('decoder') == 3 and c.snapshot() == {'decoder':3}
+        assert '# TYPE dropped_total counter' in self.registry.toPrometheus()
+
+    def testMethodsAreHeldWeakly(self):
+        decoder = Decoder() # Never started or stopped
+        label = decoder._metricsLabel()
+        decoder.queue.put('data')
+        assert getRegistry().get('rfid_queue_depth').get(label) == 1
+        del decoder
+        gc.collect()
+        assert getRegistry().get('rfid_queue_depth').get(label) == 0
+        assert label not in getRegistry().snapshot()['rfid_queue_dropped_total']
+
+    def testDecoderMetrics(self):
+        before = getRegistry().snapshot()
+        decoder = Decoder(inline=True)
+        bad = bytearray(TAG_PACKET)
+        bad[-1] ^= 0xFF
+        decoder.decode(bytearray('\x00\x01')+TAG_PACKET+bad+Packet([0x55,0x01,0x00,0x00,0x01,0x03,0x00]))
+        after = getRegistry().snapshot()
+        assert after['rfid_frames_decoded_total'][0x06]-before['rfid_frames_decoded_total'].get(0x06,0) == 1
+        assert after['rfid_frames_decoded_total'][0x03]-before['rfid_frames_decoded_total'].get(0x03,0) == 1
+        assert after['rfid_checksum_failures_total']-before['rfid_checksum_failures_total'] == 1
+        assert after['rfid_decoder_resyncs_total']-before['rfid_decoder_resyncs_total'] >= 2
+
+    def testExport(self):
+        self.registry.counter('frames_total','Frames').inc()
+        server = MetricsServer(port=0,registry=self.registry)
+        server.start()
+        try:
+            body = urllib2.urlopen('http://127.0.0.1:%s/metrics'%server.getPort()).read()
+        finally:
+            server.stop()
+        assert body == self.registry.toPrometheus()
+        d = tempfile.mkdtemp()
+        try:
+            writeFile(os.path.join(d,'rfid.prom'),self.registry)
+            assert open(os.path.join(d,'rfid.prom')).read() == body
+        finally:
+            shutil.rmtree(d)
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -19,6 +19,23 @@ class PacketTests(unittest.TestCase):
         assert pkt.getNodeId() == 0x03
         assert pkt.getCommand() == 0x04
         assert pkt.getData()[0] == 0x05
+    
+    def testTagFields(self):
+        pkt = Packet(bytearray('552000000106212a2a310111424390006994a21eacac000f2aef330068322051010000110a0d32'.decode('hex')))
+        tag = pkt.getDecoding()['data']['tag']
+        assert pkt.isTagPacket()
+        assert pkt.getTagId() == tag['id']
+        assert pkt.getRssi() == tag['rssi']
+        assert pkt.getTagCounter() == tag['counter']
+        assert pkt.getTagSiteCode() == tag['site code']
+        assert pkt.getTagAge() == tag['age']
+        assert pkt.getTagAlarmByte() == tag['alarm byte']
+        assert pkt.getReaderRssi() == tag['reader RSSI']
+        assert not Packet([0xAA,0x00,0x00,0x00,0x01,0x06]).isTagPacket()
+        
+    def testDecodingIsCached(self):
+        pkt = Packet([0x55,0x01,0x00,0x00,0x01,0x03,0x00])
+        assert pkt.getDecoding() is pkt.getDecoding()
         
 
 
@@ -0,0 +1,65 @@
+'''
+Created on Oct 18, 2026
+
+'''
+import time
+import unittest
+
+from rfid.network import Network
+from rfid.polling import PollingScheduler
+from rfid.simulator import ReaderNetworkSimulator,SimulatedTag
+from rfid.tag import TagReadingListener
+
+class ReadingCollector(TagReadingListener):
+    def __init__(self):
+        self.readings = []
+
+    def tagRead(self, reading):
+        self.readings.append(reading)
+
+class PollingTests(unittest.TestCase):
+
+    def setUp(self):
+        self.sim = ReaderNetworkSimulator(numReaders=3,area=(5,5),replyDelay=0.005,seed=1)
+        self.sim.start()
+        self.nw = Network(0,None,port=self.sim.getPort(),baudrate=115200,inlineDecoding=True)
+        self.nw.stopAutoPolling()
+        self.nw.rescan(nodeIds=range(1,5))
+        self.collector = ReadingCollector()
+        self.nw.getDecoder().addTagReadingListener(self.collector)
+
+    def tearDown(self):
+        self.nw.stop()
+        self.sim.stop()
+
+    def testBacklogIsDrained(self):
+        self.sim.readers[3].rssiValue = 255 # Doesn't hear any tags
+        for i in range(20):
+            self.sim.addTag(SimulatedTag(i,(2.5,2.5,1),interval=0.4))
+        time.sleep(0.5)
+        queued = sum(len(r.tagTable) for r in self.sim.readers.values())
+        assert queued > 30
+        scheduler = PollingScheduler(self.nw,maxInterval=0.2)
+        scheduler.start()
+        time.sleep(1)
+        scheduler.stop()
+        stats = scheduler.getStats()
+        assert stats['tags'] >= queued and len(self.collector.readings) >= stats['tags']
+        # The idle reader backed off, the busy ones were polled far more
+        assert scheduler.getState(3).polls*3 < scheduler.getState(1).polls,scheduler.getStates()
+        assert scheduler.getState(3).interval > 0.1
+
+    def testIdleReadersBackOff(self):
+        scheduler = PollingScheduler(self.nw,maxInterval=0.2)
+        scheduler.start()
+        time.sleep(1)
+        scheduler.stop()
+        stats = scheduler.getStats()
+        assert stats['tags'] == 0 and stats['timeouts'] == 0
+        # 0.001 + 0.002 + ... + 0.128, then every 0.2 seconds
+        assert stats['polls'] < 3*15,stats
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -0,0 +1,128 @@
+'''
+Created on Oct 18, 2026
+
+'''
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import time
+import unittest
+
+from rfid.decoder import Decoder,Packet,PacketDecodedEvent,PacketDecodedListener
+from rfid.pool import NetworkPool,PoolEvent,ReorderBuffer
+from rfid.simulator import ReaderNetworkSimulator
+from rfid.tracker import Tracker
+
+TAG_PACKET = bytearray('552000000106212a2a3101114243900069'
+                       '94a21eacac000f2aef3300683220510100'
+                       '00110a0d32'.decode('hex'))
+
+class Collector(PacketDecodedListener):
+    def __init__(self):
+        self.events = []
+
+    def packetReady(self, event):
+        self.events.append(event.keep())
+
+class ReorderBufferTests(unittest.TestCase):
+
+    def testOrder(self):
+        released = []
+        buf = ReorderBuffer(released.append,window=0.1)
+        buf.start()
+        now = time.time()
+        for offset in (0.03,0.01,0.02,0.0):
+            buf.put(now+offset,offset)
+        time.sleep(0.05)
+        assert released == [] and buf.getPendingCount() == 4
+        time.sleep(0.15)
+        assert released == [0.0,0.01,0.02,0.03]
+        # Older than what was released already
+        buf.put(now,'late')
+        buf.stop()
+        assert released[-1] == 'late' and buf.getLateCount() == 1
+
+    def testMaxsize(self):
+        released = []
+        buf = ReorderBuffer(released.append,window=10,maxsize=2)
+        buf.start()
+        now = time.time()
+        for i in range(5):
+            buf.put(now+i,i)
+        time.sleep(0.05)
+        assert released == [0,1,2]
+        buf.stop()
+        assert released == range(5)
+
+class NetworkPoolTests(unittest.TestCase):
+
+    def testMergedStream(self):
+        sims = [ReaderNetworkSimulator(numReaders=2,numTags=10,tagInterval=0.4,area=(5,5),seed=i) for i in range(2)]
+        for sim in sims:
+            sim.start()
+        pool = NetworkPool([sim.getPort() for sim in sims],baudrate=115200)
+        collector = Collector()
+        pool.addPacketDecodedEventListener(collector)
+        try:
+            pool.startAutoPolling()
+            time.sleep(1)
+            pool.stopAutoPolling()
+        finally:
+            pool.stop()
+            for sim in sims:
+                sim.stop()
+        tags = [e for e in collector.events if e.getPacket().isTagPacket()]
+        keys = set(e.getReaderKey() for e in tags)
+        assert keys == set((sim.getPort(),node) for sim in sims for node in (1,2))
+        times = [e.getTime() for e in collector.events]
+        assert times == sorted(times) and pool.getLateCount() == 0
+
+class FakePool(object):
+    def __init__(self):
+        self.decoder = Decoder(inline=True)
+
+    def getDecoder(self):
+        return self.decoder
+
+class TrackerOnPoolTests(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def tagEvent(self,port,nodeId,tagId,rssi):
+        data = bytearray(TAG_PACKET[:-1])
+        data[4],data[28] = nodeId,rssi
+        struct.pack_into('>I',data,22,tagId)
+        return PoolEvent(PacketDecodedEvent(None,Packet(data)),port)
+
+    def testTrack(self):
+        layout = {('/dev/ttyUSB0',1):((9,11,7.5),993680),
+                  ('/dev/ttyUSB0',2):((9,19,7.5),994031),
+                  ('/dev/ttyUSB1',1):((1,19,7.5),994031)}
+        tracker = Tracker(FakePool(),readers=layout)
+        tracker.log_file = os.path.join(self.dir,'RSSI.csv')
+        tracker.tag_ids = []
+        for i in range(30):
+            for j,key in enumerate(sorted(layout)):
+                for tagId,rssi in ((994031,80),(993680,90),(12345,70+i%5)):
+                    tracker.processEvent(self.tagEvent(key[0],key[1],tagId,rssi+j))
+            # Not in the layout
+            tracker.processEvent(self.tagEvent('/dev/ttyUSB1',2,12345,60))
+        tag = tracker.getTrackedTags()[12345]
+        assert sorted(tag.getReaderIds()) == sorted(layout)
+        assert tag.getPosition() is not None
+        with open(tracker.log_file) as f:
+            rows = [line.strip().split(',') for line in f]
+        # Every measurement is logged, even from readers that aren't in the layout
+        assert len(rows) == 10 and all(len(row) == 32 for row in rows)
+        assert rows[0][:2] == ['ReaderID:/dev/ttyUSB0:1','TagID:994031']
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -0,0 +1,64 @@
+'''
+Created on Oct 18, 2026
+
+'''
+import time
+import unittest
+
+from rfid.network import Network
+from rfid.reader import Reader,GainMode
+from rfid.provisioning import ReaderConfig,provision
+from rfid.simulator import ReaderNetworkSimulator
+
+class ProvisioningTests(unittest.TestCase):
+
+    def setUp(self):
+        self.sim = ReaderNetworkSimulator(numReaders=40,replyDelay=0.02,seed=1)
+        self.sim.start()
+        self.nw = Network(0,None,port=self.sim.getPort(),baudrate=115200,inlineDecoding=True)
+        self.readers = [Reader(self.nw,id=i) for i in range(1,41)]
+
+    def tearDown(self):
+        self.nw.stop()
+        self.sim.stop()
+
+    def testProvision(self):
+        self.sim.readers[3].rssiValue = 0x40
+        config = ReaderConfig(rssi=0x40,siteCode=(1,2,3),gain=GainMode.LOW)
+        t = time.time()
+        results = provision(self.readers,config)
+        # 40 readers * 3 settings * (read+set+verify) * 20ms one at a time would take 7s
+        assert time.time()-t < 2
+        assert all(r.isOk() for r in results.values()),results
+        assert results[3].unchanged == ['rssi'] and results[3].changed == {'siteCode':(1,2,3),'gain':GainMode.LOW}
+        assert results[1].previous == {'rssi':0,'siteCode':(0,0,0),'gain':GainMode.HIGH}
+        for reader in self.sim.readers.values():
+            assert (reader.rssiValue,tuple(reader.siteCode),reader.gain) == (0x40,(1,2,3),GainMode.LOW)
+
+        # Nothing is sent the second time except the reads
+        commands = self.sim.getStats()['commands']
+        results = provision(self.readers,config)
+        assert self.sim.getStats()['commands']-commands == 40*3
+        assert all(not r.changed and len(r.unchanged)==3 for r in results.values())
+
+    def testPerReaderConfigAndFailures(self):
+        missing = Reader(self.nw,id=99)
+        configs = {1:ReaderConfig(readerId=7,rssi=0x10),self.readers[1]:ReaderConfig(rssi=0x20),
+                   missing:ReaderConfig(rssi=0x30)}
+        results = provision(self.readers[:3]+[missing],configs,timeout=0.1)
+        assert results[1].changed == {'rssi':0x10} and results[1].unverified == {'readerId':7}
+        assert self.sim.readers[1].readerId == 7 and self.readers[0].getReaderId() == 7
+        assert results[2].changed == {'rssi':0x20}
+        assert not results[3].changed and results[3].isOk()
+        assert results[99].failed == {'rssi':'No reply'}
+
+    def testReaderIdOnlyRecordedWhenConfirmed(self):
+        missing = Reader(self.nw,id=99)
+        results = provision([missing],ReaderConfig(readerId=7),timeout=0.1)
+        assert results[99].failed == {'readerId':'No reply'} and not results[99].unverified
+        assert missing.getReaderId() == 0x00
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -0,0 +1,135 @@
+'''
+Created on Oct 18, 2026
+
+'''
+import threading
+import time
+import unittest
+
+from rfid.decoder import Packet,PacketDecodedEvent
+from rfid.reply import ReplyDispatcher,gather
+from rfid.timer import TimerWheel
+
+def reply(nodeId,cmd,*data):
+    return PacketDecodedEvent(None,Packet([0x55,len(data),0x00,0x00,nodeId,cmd]+list(data)))
+
+class ReplyTests(unittest.TestCase):
+
+    def setUp(self):
+        self.replies = ReplyDispatcher()
+
+    def testReply(self):
+        f = self.replies.expect(0,1,0x08)
+        assert not f.done()
+        self.replies.packetReady(reply(1,0x08,0x20))
+        assert f.done()
+        assert f.result().getData()[0] == 0x20
+
+    def testIgnoresOtherCommands(self):
+        f = self.replies.expect(0,1,0x08,timeout=0.05)
+        self.replies.packetReady(reply(1,0x06))
+        self.replies.packetReady(PacketDecodedEvent(None,Packet([0xAA,0x00,0x00,0x00,0x01,0x08])))
+        assert f.result() is None
+
+    def testTimeout(self):
+        t = time.time()
+        assert self.replies.expect(0,1,0x03,timeout=0.05).result() is None
+        assert time.time()-t < 0.5
+
+    def testThen(self):
+        f = self.replies.expect(0,1,0x0C).then(lambda pkt:pkt.getData()[0])
+        self.replies.packetReady(reply(1,0x0C,0x00))
+        assert f.result() == 0
+        assert self.replies.expect(0,1,0x0C,timeout=0.01).then(lambda pkt:pkt.getData()[0]).result() is None
+
+    def testManyInFlight(self):
+        """ Replies are delivered in order without a thread per command """
+        threads = threading.active_count()
+        futures = [self.replies.expect(0,i,0x03) for i in range(100)]
+        assert threading.active_count() <= threads+1
+        for i in reversed(range(100)):
+            self.replies.packetReady(reply(i,0x03,0x00))
+        assert [pkt.getNodeId() for pkt in gather(futures)] == range(100)
+        assert self.replies.getPendingCount() == 0
+
+    def testSameCommandDifferentNodes(self):
+        f1 = self.replies.expect(0,1,0x08)
+        f2 = self.replies.expect(0,2,0x08)
+        self.replies.packetReady(reply(2,0x08,0x02))
+        assert not f1.done()
+        self.replies.packetReady(reply(1,0x08,0x01))
+        assert f1.result().getData()[0] == 0x01
+        assert f2.result().getData()[0] == 0x02
+
+    def testPipelinedSameNode(self):
+        futures = [self.replies.expect(0,1,0x03) for i in range(3)]
+        for i in range(3):
+            self.replies.packetReady(reply(1,0x03,i))
+        assert [pkt.getData()[0] for pkt in gather(futures)] == range(3)
+
+    def testAnyNode(self):
+        f = self.replies.expect(0,None,0x00)
+        self.replies.packetReady(reply(7,0x00))
+        assert f.result().getNodeId() == 7
+
+    def testReplyBeforeTimeoutStarts(self):
+        f = self.replies.expect(0,1,0x03,timeout=0.05,started=False)
+        self.replies.packetReady(reply(1,0x03,0x00))
+        assert f.result(1).getNodeId() == 1
+        self.replies.startTimeout(f) # Eg. the write callback running after the reply came
+        assert f._timeout is None and self.replies.getPendingCount() == 0
+
+    def testTimeoutStartsWhenToldTo(self):
+        f = self.replies.expect(0,1,0x03,timeout=0.05,started=False)
+        time.sleep(0.1)
+        assert not f.done()
+        self.replies.startTimeout(f)
+        assert f.result(1) is None
+
+class TimerWheelTests(unittest.TestCase):
+
+    def setUp(self):
+        self.timer = TimerWheel(tick=0.001,size=4)
+        self.timer.start()
+
+    def tearDown(self):
+        self.timer.stop()
+
+    def testRounds(self):
+        """ Delays longer than one turn of the wheel """
+        fired = []
+        done = threading.Event()
+        t = time.time()
+        for delay in (0.03,0.01,0.02):
+            self.timer.schedule(delay,fired.append,delay)
+        self.timer.schedule(0.04,done.set)
+        assert done.wait(1)
+        assert fired == [0.01,0.02,0.03]
+        assert time.time()-t >= 0.04
+
+    def testCancel(self):
+        fired = []
+        done = threading.Event()
+        self.timer.cancel(self.timer.schedule(0.005,fired.append,1))
+        self.timer.schedule(0.01,done.set)
+        assert done.wait(1)
+        assert fired == []
+
+    def testCancelledEntriesArentPending(self):
+        """ The thread goes back to sleep instead of ticking until a cancelled deadline """
+        entries = [self.timer.schedule(30,lambda:None) for i in range(3)]
+        assert self.timer.getPendingCount() == 3
+        for entry in entries:
+            self.timer.cancel(entry)
+            self.timer.cancel(entry) # Twice is harmless
+        assert self.timer.getPendingCount() == 0
+        assert not any(self.timer._slots)
+        time.sleep(0.01)
+        cursor = self.timer._cursor
+        time.sleep(0.02)
+        assert self.timer._cursor == cursor # Not ticking
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -0,0 +1,83 @@
+'''
+Created on Oct 18, 2026
+
+'''
+import os
+import threading
+import time
+import unittest
+
+from rfid.network import Network
+from rfid.decoder import Decoder,Packet,PacketDecodedListener
+
+class PingResponder(threading.Thread,PacketDecodedListener):
+    """ Answers pings from the other end of a pseudo-terminal """
+    def __init__(self,master,nodes,delay=0.002):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.master = master
+        self.nodes = nodes # node id -> ping error code
+        self.delay = delay # Before each reply
+        self.decoder = Decoder(inline=True)
+        self.decoder.addPacketDecodedEventListener(self)
+
+    def run(self):
+        while True:
+            try:
+                data = os.read(self.master,1024)
+            except OSError:
+                return
+            self.decoder.decode(bytearray(data))
+
+    def packetReady(self, event):
+        pkt = event.getPacket()
+        if pkt.getCommand() == 0x03 and pkt.getNodeId() in self.nodes:
+            time.sleep(self.delay)
+            os.write(self.master,str(Packet([0x55,0x01,pkt.getNetworkId(),0x00,pkt.getNodeId(),0x03,self.nodes[pkt.getNodeId()]])))
+
+class RescanTests(unittest.TestCase):
+
+    def setUp(self):
+        self.master,self.slave = os.openpty()
+        self.nw = Network(0,None,port=os.ttyname(self.slave),baudrate=115200)
+        self.responder = PingResponder(self.master,{1:0,2:0,3:0,9:2,50:0,253:0})
+        self.responder.start()
+
+    def tearDown(self):
+        self.nw.stop()
+        os.close(self.master)
+        os.close(self.slave)
+
+    def testRescan(self):
+        t = time.time()
+        results = self.nw.rescan()
+        assert time.time()-t < 10
+        assert results == {1:0,2:0,3:0,9:2,50:0,253:0}
+        assert [r.getNodeId() for r in self.nw.getReaders()] == [1,2,3,50,253]
+
+    def testStopAtGap(self):
+        self.nw.rescan(stopAtGap=True,window=1)
+        assert [r.getNodeId() for r in self.nw.getReaders()] == [1,2,3]
+
+    def testStopAtGapPipelined(self):
+        # Nodes 9 and 50 reply to pings that were in flight when node 4 timed out
+        assert self.nw.rescan(stopAtGap=True,window=8,nodeIds=range(1,60)) == {1:0,2:0,3:0}
+        assert [r.getNodeId() for r in self.nw.getReaders()] == [1,2,3]
+
+    def testTimeoutFloorOnSlowBus(self):
+        self.nw.stop()
+        master,slave = os.openpty()
+        self.nw = Network(0,None,port=os.ttyname(slave),baudrate=9600)
+        responder = PingResponder(master,{1:0,2:0,3:0},delay=0.02) # Slower than the given timeout
+        responder.start()
+        try:
+            assert self.nw.rescan(timeout=0.01,nodeIds=range(1,6)) == {1:0,2:0,3:0}
+        finally:
+            self.nw.stop()
+            os.close(master)
+            os.close(slave)
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
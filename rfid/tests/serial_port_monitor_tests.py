@@ -0,0 +1,89 @@
+'''
+Created on Oct 18, 2026
+
+'''
+import os
+import threading
+import time
+import unittest
+
+from rfid.serial_port_monitor import SerialPortMonitor,SerialPortListener,IngestMode
+from rfid.decoder import Decoder,PacketDecodedListener,Packet
+
+class Collector(SerialPortListener,PacketDecodedListener):
+    def __init__(self):
+        self.data = bytearray()
+        self.threads = set()
+        self.received = threading.Event()
+        self._condition = threading.Condition()
+
+    def dataReceived(self, event):
+        with self._condition:
+            self.data.extend(event.getData())
+            self._condition.notify_all()
+        self.received.set()
+
+    def waitForData(self,length,timeout=1):
+        """ Waits until at least length bytes were received, the pty may deliver them in several reads """
+        deadline = time.time()+timeout
+        with self._condition:
+            while len(self.data)<length and time.time()<deadline:
+                self._condition.wait(deadline-time.time())
+            return len(self.data)>=length
+
+    def packetReady(self, event):
+        self.threads.add(threading.current_thread())
+        self.received.set()
+
+class SerialPortMonitorTests(unittest.TestCase):
+    """ Uses a pseudo-terminal in place of the reader network """
+
+    def setUp(self):
+        self.master,self.slave = os.openpty()
+        self.port = os.ttyname(self.slave)
+        self.monitor = None
+
+    def tearDown(self):
+        if self.monitor is not None:
+            self.monitor.stop()
+        os.close(self.master)
+        os.close(self.slave)
+
+    def startMonitor(self,**kwargs):
+        self.monitor = SerialPortMonitor(port=self.port,baudrate=115200,**kwargs)
+        self.collector = Collector()
+        self.monitor.addSerialEventListener(self.collector)
+        self.monitor.start()
+
+    def _testIngest(self,ingest):
+        self.startMonitor(ingest=ingest)
+        assert self.monitor.getIngestMode() == ingest
+        data = '\x55\x00\x00\x00\x01\x03\x02'
+        os.write(self.master,data)
+        assert self.collector.waitForData(len(data)),"Only received %r"%self.collector.data
+        assert self.collector.data == bytearray(data)
+
+    def testSelect(self):
+        self._testIngest(IngestMode.SELECT)
+
+    def testBlocking(self):
+        self._testIngest(IngestMode.BLOCKING)
+
+    def testPoll(self):
+        self._testIngest(IngestMode.POLL)
+
+    def testInlineDecoding(self):
+        self.startMonitor()
+        decoder = Decoder(inline=True)
+        packets = Collector()
+        decoder.addPacketDecodedEventListener(packets)
+        self.monitor.addSerialEventListener(decoder)
+        os.write(self.master,str(Packet([0x55,0x00,0x00,0x00,0x01,0x03])))
+        assert packets.received.wait(1),"No packet decoded"
+        assert packets.threads == set([self.monitor])
+        decoder.stop()
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -0,0 +1,81 @@
+'''
+Created on Oct 18, 2026
+
+'''
+import time
+import unittest
+
+from rfid.network import Network
+from rfid.reader import Reader
+from rfid.simulator import ReaderNetworkSimulator,SimulatedTag
+from rfid.tag import TagReadingListener
+
+class ReadingCollector(TagReadingListener):
+    def __init__(self):
+        self.readings = []
+
+    def tagRead(self, reading):
+        self.readings.append(reading)
+
+class SimulatorTests(unittest.TestCase):
+
+    def start(self,**kwargs):
+        self.sim = ReaderNetworkSimulator(seed=1,**kwargs)
+        self.sim.start()
+        self.nw = Network(0,None,port=self.sim.getPort(),baudrate=115200,inlineDecoding=True)
+
+    def tearDown(self):
+        self.nw.stop()
+        self.sim.stop()
+
+    def testRescan(self):
+        self.start(numReaders=3)
+        assert self.nw.rescan(nodeIds=range(1,6)) == {1:0,2:0,3:0}
+        assert [r.getNodeId() for r in self.nw.getReaders()] == [1,2,3]
+
+    def testReaderSettings(self):
+        self.start(numReaders=2)
+        r = Reader(self.nw,id=2)
+        r.setRssiValue(0x40)
+        assert r.getRssiValue() == 0x40
+        r.setSiteCode(1,2,3)
+        assert r.getSiteCode() == bytearray([1,2,3])
+        assert r.getSupplyVoltage() == 120
+        assert Reader(self.nw,id=1).getRssiValue() == 0
+        assert self.sim.readers[2].rssiValue == 0x40
+
+    def testManualPolling(self):
+        self.start(numReaders=1)
+        self.nw.stopAutoPolling()
+        r = Reader(self.nw,id=1)
+        assert r.getTagPacket().getDecoding()['data'] == {'Error Number':'2-Tag Table underflow error'}
+        self.sim.addTag(SimulatedTag(1234,(1,1,1),interval=0.05))
+        time.sleep(0.2)
+        pkt = r.getTagPacket()
+        assert pkt.isTagPacket() and pkt.getTagId() == 1234
+
+    def testAutoPolling(self):
+        self.start(numReaders=3,numTags=50,tagInterval=0.4,area=(5,5))
+        collector = ReadingCollector()
+        self.nw.getDecoder().addTagReadingListener(collector)
+        self.nw.startAutoPolling()
+        time.sleep(1)
+        self.nw.stopAutoPolling()
+        assert len(collector.readings) > 50*3
+        assert set(r.tagId for r in collector.readings) == set(range(1000,1050))
+        assert set(r.nodeId for r in collector.readings) == set([1,2,3])
+
+    def testCorruption(self):
+        self.start(numReaders=2,numTags=20,tagInterval=0.4,area=(5,5),checksumErrorRate=0.1,corruptionRate=0.1)
+        collector = ReadingCollector()
+        self.nw.getDecoder().addTagReadingListener(collector)
+        self.nw.startAutoPolling()
+        time.sleep(1)
+        assert self.sim.getStats()['corrupted'] > 0
+        assert len(collector.readings) > 0
+        assert len(collector.readings) < self.sim.getStats()['framesSent']
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
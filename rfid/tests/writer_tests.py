@@ -0,0 +1,96 @@
+'''
+Created on Oct 18, 2026
+
+'''
+import os
+import threading
+import time
+import unittest
+
+from rfid.commands import COMMANDS
+from rfid.network import Network
+from rfid.writer import SerialWriter,Priority,BREAK
+
+class FakeConnection(object):
+    """ Records what's written, blocks the first write until released """
+    def __init__(self,baudrate=115200):
+        self.baudrate = baudrate
+        self.written = []
+        self.release = threading.Event()
+
+    def write(self,data):
+        self.release.wait()
+        self.written.append(data)
+
+class WriterTests(unittest.TestCase):
+
+    def setUp(self):
+        self.connection = FakeConnection()
+        self.writer = SerialWriter(self.connection,gap=0)
+        self.writer.start()
+
+    def tearDown(self):
+        self.connection.release.set()
+        self.writer.stop()
+
+    def testPriority(self):
+        self.writer.write(bytearray('first'),Priority.BULK) # Blocks the writer
+        time.sleep(0.05)
+        self.writer.write(bytearray('bulk'),Priority.BULK)
+        self.writer.write(bytearray('command'),Priority.COMMAND)
+        self.writer.write(bytearray('control'),Priority.CONTROL)
+        self.connection.release.set()
+        assert self.writer.flush(1)
+        assert [str(d) for d in self.connection.written] == ['first','control','command','bulk']
+
+    def testBreakCoalescing(self):
+        self.connection.release.set()
+        assert self.writer.writeBreak()
+        assert not self.writer.writeBreak() # Already queued or just sent
+        self.writer.flush(1)
+        assert not self.writer.writeBreak() # Nothing sent since the last one
+        self.writer.write(bytearray('ping'))
+        self.writer.flush(1)
+        assert self.writer.writeBreak()
+        self.writer.flush(1)
+        assert [d is BREAK for d in self.connection.written] == [True,False,True]
+        assert self.writer.getCoalescedCount() == 2
+
+    def testWriteAfterStop(self):
+        self.connection.release.set()
+        self.writer.stop()
+        called = []
+        assert not self.writer.write(bytearray('late'),callback=lambda:called.append(1))
+        assert called == [1] and self.connection.written == []
+        assert not self.writer.writeBreak()
+
+    def testStopRunsCallbacksOfDroppedFrames(self):
+        writer = SerialWriter(self.connection) # Never started
+        called = []
+        writer.write(bytearray('never'),callback=lambda:called.append(1))
+        writer.stop()
+        assert called == [1] and writer.getPendingCount() == 0
+
+class NetworkWriterTests(unittest.TestCase):
+
+    def setUp(self):
+        self.master,self.slave = os.openpty()
+        self.nw = Network(0,None,port=os.ttyname(self.slave),baudrate=115200)
+
+    def tearDown(self):
+        self.nw.stop()
+        os.close(self.master)
+        os.close(self.slave)
+
+    def testAskAfterStop(self):
+        self.nw.stop()
+        t = time.time()
+        assert self.nw.pingReader(1,timeout=0.2) is None
+        assert time.time()-t < 1
+        future = self.nw.ask(COMMANDS[0x03].encode(0,0x00,2),timeout=0.1,wait=False)
+        assert future.result(1) is None
+
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -0,0 +1,110 @@
+'''
+Created on Oct 18, 2026
+
+'''
+import atexit
+import logging
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+class TimerWheel(threading.Thread):
+    """ Runs callbacks after a delay. All of the callbacks share this one thread
+    instead of starting a threading.Timer for each of them, so they should be quick.
+
+    The callbacks are kept in a hashed timing wheel: a ring of size slots that is
+    advanced one slot every tick seconds. Scheduling is O(1) no matter how many timeouts
+    are pending, cancelling only has to search the entry's slot, and callbacks run within
+    one tick of their due time. The thread sleeps while nothing is scheduled.
+    """
+    def __init__(self,tick=0.01,size=512):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self._tick = tick
+        self._size = size
+        self._slots = [[] for i in range(size)] # [callback, args, rounds left, slot or None once taken out]
+        self._cursor = 0 # Slot that is run at the next tick
+        self._nextTick = 0
+        self._count = 0 # Entries in the wheel, cancelled ones are taken out
+        self._condition = threading.Condition()
+        self._running = False
+
+    def schedule(self,delay,callback,*args):
+        """ Calls callback(*args) after delay seconds. Returns a handle that can be given to cancel() """
+        with self._condition:
+            now = time.time()
+            if self._count == 0:
+                self._nextTick = now+self._tick
+            ticks = max(0,int((now+delay-self._nextTick)/self._tick+0.999999))
+            slot = (self._cursor+ticks)%self._size
+            entry = [callback,args,ticks//self._size,slot]
+            self._slots[slot].append(entry)
+            self._count += 1
+            if self._count == 1:
+                self._condition.notify()
+        return entry
+
+    def cancel(self,entry):
+        """ Stops the callback from being called if it hasn't been already """
+        with self._condition:
+            entry[0] = None
+            if entry[3] is not None:
+                # Take it out so the thread can go back to sleep when nothing else is pending
+                self._slots[entry[3]].remove(entry)
+                entry[3] = None
+                self._count -= 1
+
+    def getPendingCount(self):
+        return self._count
+
+    def run(self):
+        self._running = True
+        while self._running:
+            with self._condition:
+                if self._count == 0:
+                    self._condition.wait()
+                    continue
+                now = time.time()
+                if now<self._nextTick:
+                    self._condition.wait(self._nextTick-now)
+                    continue
+                due = []
+                waiting = []
+                for entry in self._slots[self._cursor]:
+                    if entry[2]>0:
+                        entry[2] -= 1
+                        waiting.append(entry)
+                    else:
+                        entry[3] = None
+                        due.append(entry)
+                self._slots[self._cursor] = waiting
+                self._count -= len(due)
+                self._cursor = (self._cursor+1)%self._size
+                self._nextTick += self._tick
+            for entry in due:
+                callback,args = entry[0],entry[1]
+                if callback is not None:
+                    try:
+                        callback(*args)
+                    except:
+                        log.exception("Timer callback %s failed",callback)
+
+    def stop(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        self.join()
+
+_timer = None
+_lock = threading.Lock()
+
+def getTimer():
+    """ Returns the TimerWheel shared by every Network, starting it the first time """
+    global _timer
+    with _lock:
+        if _timer is None:
+            _timer = TimerWheel()
+            _timer.start()
+            atexit.register(_timer.stop)
+        return _timer
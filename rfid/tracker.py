@@ -5,13 +5,13 @@ Created on Mar 31, 2013
 @author: jrm5555@psu.edu & bdf5047@psu.edu
 '''
 from __future__ import division
-import traceback
+import logging
 import threading
-import Queue
 from rfid.reader import Reader
 from rfid.decoder import PacketDecodedListener
+from rfid.dispatch import BoundedQueue,Overflow
+from rfid.metrics import getRegistry
 import time
-from datetime import datetime
 import fileinput
 import sys
 from collections import deque
@@ -23,6 +23,16 @@ from mpl_toolkits.mplot3d import axes3d
 import matplotlib.pyplot as plt
 from matplotlib import cm
 
+log = logging.getLogger(__name__)
+_tagLog = logging.getLogger(__name__+'.tag')
+_readerLog = logging.getLogger(__name__+'.reader')
+_monitorLog = logging.getLogger(__name__+'.monitor')
+
+_estimateTime = getRegistry().histogram('rfid_tracker_estimate_seconds','Time taken by Tracker.estimateArea for one tag')
+_positionLatency = getRegistry().histogram('rfid_tracker_position_latency_seconds','Time from a tag packet being decoded to the new position estimate')
+_queueDepth = getRegistry().gauge('rfid_queue_depth','Items waiting in a queue','queue')
+_queueDropped = getRegistry().callbackCounter('rfid_queue_dropped_total','Items dropped because a queue was full','queue')
+
 class Config(object):
     """
     6) Window_size, w: The number of observations
@@ -87,17 +97,17 @@ class Tag(object):
             self.areaWasEstimated = True
             self.predictionMap = pmap/pmap.sum()
         else:
-            self.log("[WARN ] Prediction map was empty!")
+            _tagLog.warning("Prediction map was empty!")
             
     def setInitialPredicMap(self,pmap):
         if pmap.max()>0:
             self.initialPredic = pmap/pmap.sum()
         else:
-            self.log("[WARN ] Initial prediction map was empty!")
+            _tagLog.warning("Initial prediction map was empty!")
             
     def setPerceptualPredicMaps(self,pmaps):
         self.perceptualPredic = pmaps
-        #    self.log("[WARN ] Initial prediction map was empty!")
+        #    _tagLog.warning("Initial prediction map was empty!")
         
     def getPredictionMap(self):
         return self.predictionMap
@@ -271,8 +281,6 @@ class Tag(object):
         """Returns a list of reader IDs that have reported on RSSI measurements on this Tag"""
         return self.meas.keys()
     
-    def log(self,msg,tag="RFIDTag"):
-        print "[%s][%s]%s"%(datetime.now().strftime("%H:%M:%S.%f"),tag,msg)
         
 class Reader(Reader):
     """ This is just a dummy class to hold the positions of the readers """
@@ -299,13 +307,13 @@ class Reader(Reader):
         a = 0
         # avg(RSSIj(j))
         RSSIj_j = refTags[self.refTagId].meas[self.id]['mean']
-        self.log("[DEBUG] Reader %s Reference tag %s avg(RSSIj_j) = %s"%(self.id,self.refTagId,RSSIj_j))
+        _readerLog.debug("Reader %s Reference tag %s avg(RSSIj_j) = %s",self.id,self.refTagId,RSSIj_j)
         
         # Distance from reader_j to tag_j (where tag_j has id refTagId)
         tagPos = refTags[self.refTagId].getPosition()
         readerPos = self.getPosition()
         dist_j_j =  np.sqrt((readerPos[0]-tagPos[0])**2+(readerPos[1]-tagPos[1])**2+(readerPos[2]-tagPos[2])**2)
-        self.log("[DEBUG] Reader %s distj_j = %s"%(self.id,dist_j_j))
+        _readerLog.debug("Reader %s distj_j = %s",self.id,dist_j_j)
         i = 0
         for tag in refTags.values():
             
@@ -315,10 +323,10 @@ class Reader(Reader):
                 i+=1
                 # avg(RSSIj(i))
                 RSSIj_i = tag.meas[self.id]['mean'] 
-                self.log("[DEBUG] Reader %s Tag %s RSSIj_i = %s"%(self.id,tag.id,RSSIj_i))
+                _readerLog.debug("Reader %s Tag %s RSSIj_i = %s",self.id,tag.id,RSSIj_i)
                 tagPos = tag.getPosition()
                 dist_i_j =  np.sqrt((readerPos[0]-tagPos[0])**2+(readerPos[1]-tagPos[1])**2+(readerPos[2]-tagPos[2])**2)
-                self.log("[DEBUG] Reader %s Tag %s dist_i_j = %s"%(self.id,tag.id,dist_i_j))
+                _readerLog.debug("Reader %s Tag %s dist_i_j = %s",self.id,tag.id,dist_i_j)
                 
                 # Eqn (9)
                 n_j_i = abs((RSSIj_j-RSSIj_i)/(10*np.log(dist_i_j/dist_j_j)))
@@ -337,7 +345,7 @@ class Reader(Reader):
 #            self.log("[WARN] Calibration n=%s is incorrect! Check the setup! Setting to default value of n=3"%(self.n))
 #            self.n = 3
         
-        self.log("[INFO ] Reader %s calibration: α=%s n=%s"%(self.id,self.a,self.n))
+        _readerLog.debug("Reader %s calibration: α=%s n=%s",self.id,self.a,self.n)
         
         pass
     
@@ -366,7 +374,7 @@ class Reader(Reader):
         p = np.exp(-(rssi-self.a+10*self.n*np.log(d_PHY))**2/(2*sigma**2))/(np.sqrt(2*np.pi)*sigma)
         #self.log("[DEBUG] p(RSSI't=%s|x^t=%s)=%s where d_PHY=%s, σ=%s, a=%s,n=%s"%(rssi,x,p,d_PHY,sigma,self.a,self.n))
         if not 0<=p<=1:
-            self.log("[WARN] An invalid p(RSSI't|x^t)=%s was calculated by reader!"%p)
+            _readerLog.warning("An invalid p(RSSI't|x^t)=%s was calculated by reader!",p)
         return p
         
     
@@ -380,8 +388,6 @@ class Reader(Reader):
         # I think they should be?
         pass
     
-    def log(self,msg,tag="Reader "):
-        print "[%s][%s]%s"%(datetime.now().strftime("%H:%M:%S.%f"),tag,msg)
         
     
 class Grid(object):
@@ -427,44 +433,83 @@ class Tracker(PacketDecodedListener,threading.Thread):
     
     grid = Grid()
     
-    def __init__(self,network):
+    # The reader network layout, reader key -> (position,reference tag id)
+    READERS = {
+        1:((9,11,7.5),993680),
+        2:((9,19,7.5),994031),
+        3:((1,19,7.5),994031),
+    }
+    
+    # The reference tags, tag id -> position
+    REFERENCE_TAGS = {
+        994031:(5,19,7.5),
+        993680:(5,11,7.5),
+    }
+    
+    def __init__(self,network,maxsize=1000,overflow=Overflow.LATEST,readers=None,referenceTags=None):
+        """ Up to maxsize packets are queued for estimation (0 is unbounded). When estimation 
+        falls behind and the queue fills up, overflow decides whether the decoder waits, the oldest
+        packets are dropped or a tag's queued packet from a reader is replaced by the newer one
+        (Overflow.LATEST), see Overflow.
+        
+        readers is the layout of the readers like READERS, keyed by the events' getReaderKey(), 
+        so with a NetworkPool the keys are (port,node id) eg. {('/dev/ttyUSB1',2):((9,19,7.5),994031)}.
+        referenceTags are the positions of the reference tags like REFERENCE_TAGS. Packets from 
+        readers that aren't in the layout are logged but not used.
+        """
         threading.Thread.__init__(self)
-        self.queue = Queue.Queue() # Holds all of the incoming data until this thread can decode it
+        self.queue = BoundedQueue(maxsize,overflow,key=self._queueKey) # Holds all of the incoming data until this thread can decode it
+        _queueDepth.set(self.getQueueDepth,"tracker-%s"%self.getName())
+        _queueDropped.set(self.getDroppedCount,"tracker-%s"%self.getName())
         # TODO: Setup and run the tracking/localization system here
         self.network = network
         self.network.getDecoder().addPacketDecodedEventListener(self)
         
         # Define the reader network layout
-        self.readers = {
-                1:Reader(tracker=self,network=network,id=1,position=(9,11,7.5),refTagId=993680),
-                2:Reader(tracker=self,network=network,id=2,position=(9,19,7.5),refTagId=994031),
-                3:Reader(tracker=self,network=network,id=3,position=(1,19,7.5),refTagId=994031)
-            }
+        self.readers = {}
+        for key,(position,refTagId) in (readers or self.READERS).items():
+            self.readers[key] = Reader(tracker=self,network=network,id=key,position=position,refTagId=refTagId)
+        self._unknownReaders = set()
         
         # Define the reference tags
-        self.tags = {
-                994031:Tag(tracker=self,id=994031,reference=True,position=(5,19,7.5)),
-                993680:Tag(tracker=self,id=993680,reference=True,position=(5,11,7.5))
-        } # 994031
+        self.tags = {}
+        for tagId,position in (referenceTags or self.REFERENCE_TAGS).items():
+            self.tags[tagId] = Tag(tracker=self,id=tagId,reference=True,position=position)
         
     def run(self):
-        self.log("Starting Tracker %s"%self)
+        log.info("Starting Tracker %s",self)
         self.network.startAutoPolling()
         while True:
             event = self.queue.get(block=True)
             if event == 'shutdown':
-                self.log('shutting down')
+                log.info('shutting down')
                 return
             try:
                 self.processEvent(event)
             except:
-                self.log("[FATAL] %s"%traceback.format_exc())
+                log.exception("Failed to process %s",event.getPacket())
             
             
     def stop(self):
         self.network.stopAutoPolling()
-        self.queue.put("shutdown")
+        self.queue.put("shutdown",force=True)
         self.join()
+        _queueDepth.remove("tracker-%s"%self.getName())
+        _queueDropped.remove("tracker-%s"%self.getName())
+    
+    def getQueueDepth(self):
+        """ Number of packets waiting to be processed """
+        return self.queue.qsize()
+    
+    def getDroppedCount(self):
+        """ Number of packets dropped or replaced because the queue was full """
+        return self.queue.getDroppedCount()
+    
+    def _queueKey(self,event):
+        """ Packets from the same tag and reader can replace each other in the queue """
+        if event == "shutdown" or not event.getPacket().isTagPacket():
+            return None
+        return (event.getPacket().getTagId(),event.getReaderKey())
     
     
     def getReferenceTags(self):
@@ -478,7 +523,7 @@ class Tracker(PacketDecodedListener,threading.Thread):
     def getTrackedTags(self):
         """ Returns the tracked tags (ie non reference tags) """
         tags = {}
-        self.log(self.tags)
+        log.debug("%s",self.tags)
         for tag in self.tags.values():
             if not tag.reference:
                 tags[tag.id] = tag
@@ -488,39 +533,44 @@ class Tracker(PacketDecodedListener,threading.Thread):
         """ When new measurements come in recalculate the position """
         # Log the message/command
         # Use a queue because otherwise measurements get missed while we're calculating!
-        self.queue.put(event,False)
+        self.queue.put(event.keep())
         
         
     def processEvent(self,event):
-        if event.getPacket().getCommand()!=0x06:
-            self.log(event.getPacket().pretty())
+        pkt = event.getPacket()
+        if pkt.getCommand()!=0x06 and log.isEnabledFor(logging.INFO):
+            log.info(pkt.pretty())
         self._logMeasurment(event)
-        tag = None
-        try: 
-            # Decoding from a RFID tag
-            tag = event.getPacket().getDecoding()['data']['tag']
-            # If the event doesn't contain a getTagPacket cmd with a decoded value it will throw a KeyError
-        except KeyError:
-            return    
-        
-        if tag is not None:
-            readerId = event.getPacket().getNodeId()
-            
-            # We found a new RFID tag, add it to the tracked list!
-            if tag['id'] not in self.tags.keys():
-                self.tags[tag['id']] = Tag(id=tag['id'],tracker=self)
-                self.log("[INFO ] Tracking new tag with ID=%s!"%tag['id'])
-                
-            self.readers[readerId].addTag(tag['id'])
-            
-            # Add the measurement from the reader
-            self.tags[tag['id']].addMeas(rssi=tag['rssi'],readerId=readerId)
+        
+        # Only a getTagPacket response from a RFID tag has a measurement
+        if not pkt.isTagPacket():
+            return
+        
+        tagId = pkt.getTagId()
+        rssi = pkt.getRssi()
+        readerId = event.getReaderKey()
+        if readerId not in self.readers:
+            if readerId not in self._unknownReaders:
+                self._unknownReaders.add(readerId)
+                log.warning("Reader %s isn't in the layout, ignoring its packets",readerId)
+            return
+        
+        # We found a new RFID tag, add it to the tracked list!
+        if tagId not in self.tags:
+            self.tags[tagId] = Tag(id=tagId,tracker=self)
+            log.info("Tracking new tag with ID=%s!",tagId)
             
-            if (not self.tags[tag['id']].reference) and self.tags[tag['id']].isReady(): #and (self.tags[tag['id']].numMeas%2==0):
-                self.estimateArea(tagId=tag['id'],rssi=tag['rssi'])
-                
+        self.readers[readerId].addTag(tagId)
         
+        # Add the measurement from the reader
+        self.tags[tagId].addMeas(rssi=rssi,readerId=readerId)
         
+        # With a Deduplicator the other readers' copies of the transmission come first, only estimate once they're all in
+        if (not self.tags[tagId].reference) and self.tags[tagId].isReady() and event.isLastInGroup(): #and (self.tags[tagId].numMeas%2==0):
+            start = time.time()
+            self.estimateArea(tagId=tagId,rssi=rssi)
+            _estimateTime.observe(time.time()-start)
+            _positionLatency.observe(time.time()-event.getTime())
             
     def _logMeasurment(self,event):
         """
@@ -532,37 +582,42 @@ class Tracker(PacketDecodedListener,threading.Thread):
         
         Note: These are sorted by which unique readerID/tagID combination comes first
         """
-        try:
-            tag = event.getPacket().getDecoding()['data']['tag']
-            new_id = False
-            # Unique id for each reader/tag combination
-            uid = 'R%sT%s'%(event.getPacket().getNodeId(),tag['id']) 
-            if uid not in self.tag_ids:
-                self.tag_ids.append(uid)
-                new_id = True
-            
-            # Determine which line to write to/update:
-            i = self.tag_ids.index(uid)
-            if new_id: # Append a new row
-                self.log(tag="Monitor",msg="[INFO ] Reader ID %s found new Tag with ID %s"%(event.getPacket().getNodeId(),tag['id']))
-                with open(self.log_file, (i==0 and 'w') or 'a') as csv:
-                    csv.write("%sReaderID:%s,TagID:%s,%s"%(i>0 and '\n' or '',event.getPacket().getNodeId(),tag['id'],tag['rssi']))
-            else:
-                # Append to the end of the row
-                for line in fileinput.input(self.log_file,inplace=1):
-                    if fileinput.lineno()-1 == i:
-                        line="%s,%s\n"%(line.rstrip(),tag['rssi']) # Append the new rssi value
-                    if len(line.strip())>0:
-                        sys.stdout.write(line)
-            #self.log(event.getPacket().__repr__())
-            self.log(tag="Monitor",msg="[DEBUG] UID=%s RSSI=%s "%(uid,tag['rssi']))
-        except KeyError:
-            pass
-
-    def log(self,msg,tag="Tracker"):
-        print "[%s][%s]%s"%(datetime.now().strftime("%H:%M:%S.%f"),tag,msg)
+        pkt = event.getPacket()
+        if not pkt.isTagPacket():
+            return
+        tagId = pkt.getTagId()
+        rssi = pkt.getRssi()
+        new_id = False
+        # Unique id for each reader/tag combination
+        readerId = self._formatReaderKey(event.getReaderKey())
+        uid = 'R%sT%s'%(readerId,tagId) 
+        if uid not in self.tag_ids:
+            self.tag_ids.append(uid)
+            new_id = True
+        
+        # Determine which line to write to/update:
+        i = self.tag_ids.index(uid)
+        if new_id: # Append a new row
+            _monitorLog.info("Reader ID %s found new Tag with ID %s",readerId,tagId)
+            with open(self.log_file, (i==0 and 'w') or 'a') as csv:
+                csv.write("%sReaderID:%s,TagID:%s,%s"%(i>0 and '\n' or '',readerId,tagId,rssi))
+        else:
+            # Append to the end of the row
+            for line in fileinput.input(self.log_file,inplace=1):
+                if fileinput.lineno()-1 == i:
+                    line="%s,%s\n"%(line.rstrip(),rssi) # Append the new rssi value
+                if len(line.strip())>0:
+                    sys.stdout.write(line)
+        #self.log(event.getPacket().__repr__())
+        _monitorLog.debug("UID=%s RSSI=%s ",uid,rssi)
 
     
+    def _formatReaderKey(self,key):
+        """ A NetworkPool's (port,node id) keys as port:node id so they don't add CSV columns """
+        if isinstance(key,tuple):
+            return ':'.join(str(k) for k in key)
+        return key
+    
     def _waitForCalibration(self):
         """ Waits until all the readers get a full window of measurements on the reference tags"""
         pass
@@ -642,7 +697,8 @@ class Tracker(PacketDecodedListener,threading.Thread):
             
         #if self.tags[tagId].getPositionBelief() is np.nan:
         #    self.tags[tagId].getPositionBelief()
-        self.log("[INFO ] Tags last position is %s with belief %s"%(self.tags[tagId].getPosition(), self.tags[tagId].getPositionBelief()))
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Tags last position is %s with belief %s",self.tags[tagId].getPosition(),self.tags[tagId].getPositionBelief())
         
 #        for cell in self.grid.getCells():
 #            # The server first predicts state at time t according to the state at time t-1
@@ -714,7 +770,8 @@ class Tracker(PacketDecodedListener,threading.Thread):
         self.tags[tagId].setPredictionMap(predic) # Note; this will update the Tag.getPosition()
         self.tags[tagId].setInitialPredicMap(initialPredic)
         self.tags[tagId].setPerceptualPredicMaps(perceptualPredic)
-        self.log("[INFO ] Tag %s estimated at cell %s with %s belief"%(tagId,self.tags[tagId].getPosition(),self.tags[tagId].getPredictionMap().max()))
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Tag %s estimated at cell %s with %s belief",tagId,self.tags[tagId].getPosition(),self.tags[tagId].getPredictionMap().max())
         
         # Update the position of the tag if it's above the threshold or better than the previous
         #if (self.tags[tagId].positionBelief is None) or  (belmax>self.tags[tagId].positionBelief):
@@ -748,7 +805,7 @@ class Tracker(PacketDecodedListener,threading.Thread):
                     data = np.concatenate((data,row['data']))
         q = data.std()
         self.stdOfDetectionArea = q#data.std()
-        self.log(msg="[INFO ] Detection area σ=%s"%q)
+        log.debug("Detection area σ=%s",q)
         return q
         
     
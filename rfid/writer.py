@@ -0,0 +1,188 @@
+'''
+Created on Oct 18, 2026
+
+Every write to a network's serial port goes through one SerialWriter thread so frames from
+different threads (the tracker, a polling scheduler, a health poller...) can't interleave or
+be sent back to back faster than the RS-485 readers can turn the bus around. Waiting frames
+are sent in Priority order, so control commands and the ones a caller is blocked on go before
+background polls, and a break burst that wouldn't change anything isn't sent again.
+'''
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+from rfid.metrics import getRegistry
+
+log = logging.getLogger(__name__)
+
+_framesWritten = getRegistry().counter('rfid_frames_written_total','Frames written to the serial ports by priority','priority')
+_breaksCoalesced = getRegistry().counter('rfid_breaks_coalesced_total','Break bursts not sent because one was already queued or just sent')
+
+class Priority:
+    CONTROL = 0 # Reset, polling mode, baud rate and break bursts
+    COMMAND = 1 # Settings and pings that a caller is usually waiting on
+    BULK = 2 # Tag table polls and diagnostics sent in the background
+
+    # Command -> priority, the rest are COMMAND
+    COMMANDS = {0x00:CONTROL,0x01:CONTROL,0x02:CONTROL,0xFE:CONTROL,
+                0x06:BULK,0x0F:BULK,0x10:BULK,0x12:BULK,0xFF:BULK}
+
+    @classmethod
+    def forPacket(cls,data):
+        if len(data)<6:
+            return cls.COMMAND
+        return cls.COMMANDS.get(data[5],cls.COMMAND)
+
+# Breaks the auto polling sequence, see Network.breakAutoPolling
+BREAK = bytearray(400*[0xFF,'*'])
+
+class SerialWriter(threading.Thread):
+    """ Writes the queued frames to connection (a serial.Serial) one at a time.
+
+    After each frame the writer waits for it to go out on the wire at the connection's baud rate
+    plus gap seconds for the readers to turn the bus around. A break that is queued while another
+    one is waiting, or right after one was sent with nothing else written since (within
+    breakHold seconds), is dropped.
+    """
+    def __init__(self,connection,gap=0.002,breakHold=5):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self._connection = connection
+        self._gap = gap
+        self._breakHold = breakHold
+        self._heap = [] # (priority,sequence,data,callback)
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._breakQueued = False
+        self._lastBreak = None # When the last frame written was a break
+        self._writing = False
+        self._running = True
+        self._written = 0
+        self._coalesced = 0
+
+    def getPendingCount(self):
+        return len(self._heap)
+
+    def getWrittenCount(self):
+        return self._written
+
+    def getCoalescedCount(self):
+        return self._coalesced
+
+    def isStopped(self):
+        """ True once stop() was called or the thread died, nothing is written after that """
+        return not self._running or (self.ident is not None and not self.is_alive())
+
+    def write(self,data,priority=None,callback=None):
+        """ Queues the frame, priority defaults to the one of its command (see Priority.forPacket).
+        callback() is called on the writer's thread once the frame has been written. If the writer
+        is stopped the frame is dropped and callback() is called right away, so whoever waits on it
+        (eg. a reply timeout) isn't left waiting forever. Returns False if the frame was dropped.
+        """
+        if priority is None:
+            priority = Priority.forPacket(data)
+        with self._condition:
+            if not self.isStopped():
+                heapq.heappush(self._heap,(priority,next(self._sequence),data,callback))
+                self._condition.notify_all()
+                return True
+        log.warning("Writer is stopped, dropped %s",str(data).encode('hex'))
+        self._runCallback(callback)
+        return False
+
+    def _runCallback(self,callback):
+        if callback is not None:
+            try:
+                callback()
+            except:
+                log.exception("Write callback failed")
+
+    def _drop(self):
+        """ Empties the queue, calling the callbacks of the frames that weren't written """
+        with self._condition:
+            dropped,self._heap = self._heap,[]
+            self._breakQueued = False
+            self._writing = False
+            self._condition.notify_all()
+        if dropped:
+            log.warning("Dropped %s frames that weren't written",len(dropped))
+        for priority,i,data,callback in sorted(dropped):
+            self._runCallback(callback)
+
+    def writeBreak(self):
+        """ Queues a break burst unless it would be redundant. Returns True if it was queued """
+        with self._condition:
+            if self.isStopped():
+                return False
+            recent = self._lastBreak is not None and time.time()-self._lastBreak<self._breakHold
+            if self._breakQueued or recent:
+                self._coalesced += 1
+                _breaksCoalesced.inc()
+                return False
+            self._breakQueued = True
+            heapq.heappush(self._heap,(Priority.CONTROL,next(self._sequence),BREAK,None))
+            self._condition.notify_all()
+            return True
+
+    def flush(self,timeout=None):
+        """ Waits until everything queued has been written. Returns False if it timed out """
+        deadline = None if timeout is None else time.time()+timeout
+        with self._condition:
+            while (self._heap or self._writing) and self.is_alive():
+                if deadline is None:
+                    self._condition.wait()
+                else:
+                    remaining = deadline-time.time()
+                    if remaining<=0:
+                        return False
+                    self._condition.wait(remaining)
+        return True
+
+    def run(self):
+        try:
+            self._run()
+        finally:
+            # Whether stopped or dying, nothing queued is going to be written
+            self._running = False
+            self._drop()
+
+    def _run(self):
+        ready = 0 # When the bus is free again
+        while True:
+            with self._condition:
+                while not self._heap and self._running:
+                    self._condition.wait()
+                if not self._heap:
+                    return
+                priority,i,data,callback = heapq.heappop(self._heap)
+                isBreak = data is BREAK
+                if isBreak:
+                    self._breakQueued = False
+                self._writing = True
+            wait = ready-time.time()
+            if wait>0:
+                time.sleep(wait)
+            try:
+                self._connection.write(data)
+            except:
+                log.exception("Failed to write %s",str(data).encode('hex'))
+            # Writes return once the data is buffered, wait for it to be sent before the next frame
+            ready = time.time()+len(data)*10.0/self._connection.baudrate+self._gap
+            self._written += 1
+            _framesWritten.inc(label=priority)
+            self._runCallback(callback)
+            with self._condition:
+                self._lastBreak = isBreak and time.time() or None
+                self._writing = False
+                self._condition.notify_all()
+
+    def stop(self):
+        """ Writes what's queued and stops, frames written after this are dropped """
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self.is_alive():
+            self.join()
+        self._drop() # In case the thread never ran or died